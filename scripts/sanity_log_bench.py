@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the Andromeda Sanity Log Viewer.
+
+Measures throughput of sanity_log_viewer.py building blocks on synthetic
+andromeda logs so performance changes can be judged with numbers. The
+generator writes complete synthetic sanity directories, which the viewer
+benchmark then runs the command line against.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import random
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from sanity_log_viewer import LogParser  # noqa: E402
+
+VIEWER = Path(__file__).resolve().parent / "sanity_log_viewer.py"
+
+LEVELS = [("INFO", 32), ("DEBUG", 36), ("WARNING", 33), ("ERROR", 31)]
+MESSAGES = [
+    "Flashing image build/out/fw_{n}.bin to device",
+    "Received {n} bytes from /dev/ttyUSB0",
+    "Timeout waiting for response from 0x{n:08x}",
+    "Test case test_{n} finished",
+    "Compiling src/module_{n}.c",
+]
+STEP_NAMES = [
+    "build",
+    "flash",
+    "dmtx_simple",
+    "audio_loopback",
+    "ble_pairing",
+    "battery_drain",
+    "firmware_update",
+    "sensor_calibration",
+]
+COMPONENTS = ["andromeda", "toolchain", "bootloader", "dsp_firmware", "ble_stack"]
+SIZE_UNITS = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+
+
+def synthetic_lines(count: int, seed: int = 0) -> List[str]:
+    """Generate andromeda-style log lines (timestamp, ANSI level, message)."""
+    rng = random.Random(seed)
+    lines = []
+    for timestamp in range(count):
+        roll = rng.random()
+        message = rng.choice(MESSAGES).format(n=rng.randrange(1 << 20))
+        if roll < 0.85:
+            level, color = rng.choice(LEVELS)
+            lines.append(f"{timestamp} \x1b[1;{color}m{level}\x1b[0m {message}\n")
+        elif roll < 0.95:
+            lines.append(f"{timestamp} {message}\n")
+        else:
+            lines.append(f"    continuation of {message}\n")
+    return lines
+
+
+def parse_size(text: str) -> int:
+    """Parse a byte count such as "10M" or "1G" (binary units)."""
+    text = text.strip().upper().rstrip("B")
+    if text and text[-1] in SIZE_UNITS:
+        return int(float(text[:-1]) * SIZE_UNITS[text[-1]])
+    return int(text)
+
+
+def format_size(size: int) -> str:
+    for unit in ("G", "M", "K"):
+        if size >= SIZE_UNITS[unit] and size % SIZE_UNITS[unit] == 0:
+            return f"{size // SIZE_UNITS[unit]}{unit}"
+    return str(size)
+
+
+def write_log(path: Path, size: int, rng: random.Random, tail: List[str]) -> None:
+    """Write about size bytes of synthetic log lines to path, then tail.
+
+    Line bodies come from a pool generated once, so multi-GB logs are
+    written at disk speed while timestamps keep increasing.
+    """
+    bodies = [
+        line.split(" ", 1)[1] if line[0].isdigit() else None
+        for line in synthetic_lines(4096, rng.randrange(1 << 30))
+    ]
+    pool = itertools.cycle(bodies)
+    timestamp = 0
+    written = 0
+    with open(path, "w") as f:
+        while written < size:
+            batch = []
+            for body in itertools.islice(pool, 8192):
+                timestamp += 1
+                if body is None:
+                    batch.append(f"    continuation of step output {timestamp}\n")
+                else:
+                    batch.append(f"{timestamp} {body}")
+            data = "".join(batch)
+            f.write(data)
+            written += len(data)
+        f.write("".join(f"{timestamp + 1} {line}\n" for line in tail[:-1]))
+        f.write(tail[-1] + "\n")
+
+
+def generate_run(
+    sanity_dir: Path, name: str, size: int, steps: int = 24, seed: int = 0
+) -> Path:
+    """Write one synthetic andromeda run of about size bytes of logs.
+
+    The run has a components.txt, a master log with step headers and
+    "steps" step logs ending in "Overall result:" and "Total duration:"
+    lines; some steps fail with ERROR lines. The master log and every step
+    log get an equal share of size.
+    """
+    rng = random.Random(seed)
+    run_dir = sanity_dir / name
+    run_dir.mkdir(parents=True, exist_ok=True)
+    with open(run_dir / "components.txt", "w") as f:
+        for component in COMPONENTS:
+            revision = "%040x" % rng.getrandbits(160)
+            f.write(f"{component} [type=src, remote=origin, revision={revision}]\n")
+        f.write(f"hardware=rev{rng.randrange(1, 6)}\n")
+
+    share = size // (steps + 1)
+    step_names = []
+    for i in range(steps):
+        base = STEP_NAMES[i % len(STEP_NAMES)]
+        step = base if i < len(STEP_NAMES) else f"{base}_{i // len(STEP_NAMES)}"
+        step_names.append(step)
+        failures = rng.randrange(1, 4) if rng.random() < 0.15 else 0
+        total = rng.randrange(10, 200)
+        tail = [
+            f"\x1b[1;31mERROR\x1b[0m Test case test_{rng.randrange(total)} failed"
+            for _ in range(failures)
+        ]
+        tail.append(
+            f"\x1b[1;32mINFO\x1b[0m Overall result: {'FAIL' if failures else 'PASS'} "
+            f"total={total} failures={failures} errors=0 skipped={rng.randrange(3)}, "
+            f"not_applicable=0, soundCardFailures=0"
+        )
+        tail.append(f"Total duration: {rng.uniform(10, 900):.2f}s")
+        write_log(run_dir / f"{step}_log.txt", share, rng, tail)
+
+    headers = [f"{step} : $PYTHON310_EXE build.py {step}" for step in step_names]
+    write_log(run_dir / "master_log.txt", share, rng, headers + ["done"])
+    return run_dir
+
+
+def generate_sanity_dir(
+    sanity_dir: Path, size: int, runs: int, steps: int, seed: int = 0
+) -> List[str]:
+    """Write runs hourly-spaced runs sharing size bytes, return their names.
+
+    A marker file records the parameters, so an existing identical data
+    set is reused instead of written again.
+    """
+    marker = sanity_dir / ".bench.json"
+    params = {"size": size, "runs": runs, "steps": steps, "seed": seed}
+    names = [f"20250825_{hour:02d}0000" for hour in range(runs)]
+    try:
+        if json.loads(marker.read_text()) == params:
+            return names
+    except (OSError, ValueError):
+        pass
+    for i, name in enumerate(names):
+        generate_run(sanity_dir, name, size // runs, steps, seed + i)
+    marker.write_text(json.dumps(params))
+    return names
+
+
+def legacy_parse(line: str) -> Tuple[Optional[int], Optional[str], str]:
+    """The original per-line parser: uncompiled patterns and two regex passes."""
+    line = line.rstrip("\n")
+    match = re.match(r"^(\d+)\s+(.*)$", line)
+    if match:
+        timestamp, content = int(match.group(1)), match.group(2)
+    else:
+        timestamp, content = None, line
+    level_match = re.search(r"\x1b\[1;\d+m(\w+)\x1b\[0m", content)
+    return timestamp, level_match.group(1) if level_match else None, content
+
+
+def time_parser(parse: Callable, lines: List[str], repeat: int) -> float:
+    """Return the best lines/sec of parse over lines."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for line in lines:
+            parse(line)
+        best = min(best, time.perf_counter() - start)
+    return len(lines) / best
+
+
+def bench_parser(args: argparse.Namespace) -> None:
+    lines = synthetic_lines(args.lines)
+    mismatches = sum(1 for line in lines if legacy_parse(line) != LogParser.parse(line))
+    if mismatches:
+        print(f"LogParser.parse disagrees with the legacy parser on {mismatches} lines")
+        sys.exit(1)
+
+    before = time_parser(legacy_parse, lines, args.repeat)
+    after = time_parser(LogParser.parse, lines, args.repeat)
+    print(
+        f"Parsing {len(lines):,} synthetic andromeda log lines (best of {args.repeat})"
+    )
+    print(f"  legacy parser:     {before:12,.0f} lines/sec")
+    print(f"  LogParser.parse:   {after:12,.0f} lines/sec")
+    print(f"  speedup:           {after / before:12.2f}x")
+
+
+def viewer_commands(run: str, step: str, log_lines: int) -> List[Tuple[str, List[str]]]:
+    """(label, arguments) of the viewer commands timed by bench_viewer."""
+    middle = max(1, log_lines // 2)
+    return [
+        ("list", ["list"]),
+        ("summary", ["summary", run]),
+        ("search", ["search", run, r"test_\d+ failed", "--no-index"]),
+        ("filter", ["filter", run, "ERROR", "--all-steps"]),
+        (
+            "view --lines",
+            ["view", run, "--step", step, "--lines", f"{middle}:{middle + 99}"],
+        ),
+    ]
+
+
+def time_command(arguments: List[str], repeat: int, env: Dict[str, str]) -> float:
+    """Return the median wall time of running the viewer with arguments."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, str(VIEWER), *arguments],
+            stdout=subprocess.DEVNULL,
+            env=env,
+            check=True,
+        )
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def bench_viewer(args: argparse.Namespace) -> None:
+    env = dict(os.environ, XDG_CACHE_HOME=str(args.workdir / "cache"))
+    for size in [parse_size(size) for size in args.sizes.split(",")]:
+        sanity_dir = args.workdir / f"sanity_{format_size(size)}"
+        start = time.perf_counter()
+        names = generate_sanity_dir(sanity_dir, size, args.runs, args.steps)
+        print(
+            f"\n{format_size(size)} in {args.runs} runs x {args.steps} steps "
+            f"({sanity_dir}, ready in {time.perf_counter() - start:.1f}s)"
+        )
+
+        run = names[-1]
+        step = STEP_NAMES[0]
+        with open(sanity_dir / run / f"{step}_log.txt", "rb") as f:
+            log_lines = sum(
+                block.count(b"\n") for block in iter(lambda: f.read(1 << 20), b"")
+            )
+        run_size = sum(entry.stat().st_size for entry in os.scandir(sanity_dir / run))
+        cache_options = ["--no-cache"] if args.no_cache else []
+        for label, arguments in viewer_commands(run, step, log_lines):
+            arguments = ["--sanity-dir", str(sanity_dir), *cache_options, *arguments]
+            if not args.no_cache:
+                # Warm the run catalog and line indexes like a second invocation
+                time_command(arguments, 1, env)
+            seconds = time_command(arguments, args.repeat, env)
+            throughput = ""
+            if label in ("search", "filter"):
+                throughput = f"{run_size / seconds / (1 << 20):10,.0f} MB/s"
+            print(f"  {label:14s} {seconds * 1000:10,.1f} ms {throughput}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmarks for the Andromeda Sanity Log Viewer",
+    )
+    subparsers = parser.add_subparsers(dest="command", help="Available benchmarks")
+
+    parser_parser = subparsers.add_parser(
+        "parser",
+        help="Micro-benchmark LogParser",
+        description="Compare LogParser.parse against the original regex-per-call parser",
+    )
+    parser_parser.add_argument(
+        "--lines",
+        type=int,
+        default=1_000_000,
+        help="Number of synthetic log lines (default: 1000000)",
+    )
+    parser_parser.add_argument(
+        "--repeat", type=int, default=3, help="Repetitions, best is kept (default: 3)"
+    )
+
+    generate_parser = subparsers.add_parser(
+        "generate",
+        help="Write a synthetic sanity directory",
+        description="Write synthetic andromeda runs: components.txt, a master log "
+        "and step logs with ANSI levels, Overall result and Total duration lines",
+    )
+    generate_parser.add_argument("sanity_dir", type=Path, help="Directory to write")
+    generate_parser.add_argument(
+        "--size", default="10M", help="Total log size, e.g. 10M or 1G (default: 10M)"
+    )
+    generate_parser.add_argument(
+        "--runs", type=int, default=4, help="Number of runs (default: 4)"
+    )
+    generate_parser.add_argument(
+        "--steps", type=int, default=24, help="Step logs per run (default: 24)"
+    )
+    generate_parser.add_argument(
+        "--seed", type=int, default=0, help="Random seed (default: 0)"
+    )
+
+    viewer_parser = subparsers.add_parser(
+        "viewer",
+        help="Time viewer commands on generated runs",
+        description="Time list, summary, search, filter and view --lines of "
+        "sanity_log_viewer.py on synthetic sanity directories of several sizes",
+    )
+    viewer_parser.add_argument(
+        "--sizes",
+        default="10M,1G,10G",
+        help="Comma separated total log sizes (default: 10M,1G,10G)",
+    )
+    viewer_parser.add_argument(
+        "--runs", type=int, default=4, help="Runs per data set (default: 4)"
+    )
+    viewer_parser.add_argument(
+        "--steps", type=int, default=24, help="Step logs per run (default: 24)"
+    )
+    viewer_parser.add_argument(
+        "--workdir",
+        type=Path,
+        default=Path(tempfile.gettempdir()) / "sanity_log_bench",
+        help="Where data sets are generated and kept for reuse "
+        "(default: $TMPDIR/sanity_log_bench)",
+    )
+    viewer_parser.add_argument(
+        "--repeat", type=int, default=3, help="Repetitions, median is kept (default: 3)"
+    )
+    viewer_parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Time cold invocations without the run catalog and line indexes",
+    )
+
+    args = parser.parse_args()
+
+    if args.command == "parser":
+        bench_parser(args)
+    elif args.command == "generate":
+        names = generate_sanity_dir(
+            args.sanity_dir, parse_size(args.size), args.runs, args.steps, args.seed
+        )
+        print(f"Wrote {len(names)} run(s) to {args.sanity_dir}")
+    elif args.command == "viewer":
+        bench_viewer(args)
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -6,137 +6,2376 @@ A comprehensive tool for viewing and analyzing sanity test logs from the androme
 """
 
 import argparse
+import bisect
+import concurrent.futures
+import contextlib
+import cProfile
+import ctypes
+import ctypes.util
 import datetime
+import functools
+import gzip
+import hashlib
+import http.server
+import io
+import itertools
+import json
+import math
+import mmap
+import operator
 import os
+import pstats
 import re
+import select
+import shutil
+import statistics
+import struct
 import subprocess
 import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+import zlib
+from array import array
+from collections import OrderedDict
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple, Iterator
+from typing import (
+    BinaryIO,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    TextIO,
+    Tuple,
+    Union,
+)
+
+try:
+    import zstandard
+except ImportError:  # Only needed for .zst logs
+    zstandard = None
+
+CACHE_DIR = (
+    Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache")
+    / "sanity_log_viewer"
+)
+
+
+def cache_file(kind: str, key_path: Path, suffix: str) -> Path:
+    """Location of a cache file of the given kind for key_path."""
+    digest = hashlib.sha1(str(key_path.resolve()).encode()).hexdigest()
+    return CACHE_DIR / kind / f"{digest}{suffix}"
+
+
+def write_atomically(path: Path, *parts: Union[bytes, BinaryIO]) -> None:
+    """Replace path with parts so concurrent readers never see partial files.
+
+    Each part is bytes or a binary file, which is copied from its start.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}")
+    with open(tmp_path, "wb") as f:
+        for part in parts:
+            if isinstance(part, bytes):
+                f.write(part)
+            else:
+                part.seek(0)
+                shutil.copyfileobj(part, f, 1 << 20)
+    os.replace(tmp_path, path)
+
+
+class FileCounters:
+    """Work done on one log file, filled in by the code reading it."""
+
+    __slots__ = ("bytes_read", "lines", "regex")
+
+    def __init__(self):
+        self.bytes_read = 0
+        self.lines = 0
+        self.regex = 0
+
+
+class Timings:
+    """Wall time per phase and work counters per file, for --timings.
+
+    Nothing is collected unless Timings.active holds an instance; the hooks
+    then only hand out a throwaway FileCounters per file. Readers add to
+    their counters in bulk where they can, so collection barely changes the
+    timings it reports. Phase times exclude nested phases (building a line
+    index while viewing counts as "line index", not "view"); file times
+    include them. Work done in process pool workers is not counted.
+    """
+
+    active: Optional["Timings"] = None
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+        self.files: List[Tuple[str, Path, float, FileCounters]] = []
+        self._stack: List[list] = []  # [phase, time its current slice began]
+
+    def _enter(self, name: str) -> float:
+        now = time.perf_counter()
+        if self._stack:
+            self._add(self._stack[-1][0], now - self._stack[-1][1])
+        self._stack.append([name, now])
+        return now
+
+    def _exit(self) -> float:
+        now = time.perf_counter()
+        name, began = self._stack.pop()
+        self._add(name, now - began)
+        if self._stack:
+            self._stack[-1][1] = now
+        return now
+
+    def _add(self, name: str, seconds: float) -> None:
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    @classmethod
+    @contextlib.contextmanager
+    def phase(cls, name: str) -> Iterator[None]:
+        """Add the wall time of the block to phase name."""
+        timings = cls.active
+        if timings is None:
+            yield
+            return
+        timings._enter(name)
+        try:
+            yield
+        finally:
+            timings._exit()
+
+    @classmethod
+    @contextlib.contextmanager
+    def file(cls, phase: str, log_file: Path) -> Iterator[FileCounters]:
+        """Time work on log_file as part of phase, yielding its counters."""
+        counters = FileCounters()
+        timings = cls.active
+        if timings is None:
+            yield counters
+            return
+        start = timings._enter(phase)
+        try:
+            yield counters
+        finally:
+            elapsed = timings._exit() - start
+            timings.files.append((phase, log_file, elapsed, counters))
+
+    def report(self, stream: TextIO) -> None:
+        total = time.perf_counter() - self.start
+        totals: Dict[str, List[int]] = {}
+        for phase, _, _, counters in self.files:
+            sums = totals.setdefault(phase, [0, 0, 0, 0])
+            sums[0] += 1
+            sums[1] += counters.bytes_read
+            sums[2] += counters.lines
+            sums[3] += counters.regex
+
+        header = f"{'':14s} {'seconds':>9s} {'files':>6s} {'bytes read':>14s} {'lines':>12s} {'regex':>12s}"
+        print(f"\nTimings ({total:.3f}s wall)", file=stream)
+        print(f"{'phase':14s}{header[14:]}", file=stream)
+        for phase, seconds in sorted(self.phases.items(), key=lambda item: -item[1]):
+            files, bytes_read, lines, regex = totals.get(phase, ("", "", "", ""))
+            print(
+                (
+                    f"{phase:14s} {seconds:9.3f} {files:>6} {bytes_read:>14,} {lines:>12,} {regex:>12,}"
+                    if files
+                    else f"{phase:14s} {seconds:9.3f}"
+                ),
+                file=stream,
+            )
+        other = total - sum(self.phases.values())
+        print(f"{'other':14s} {other:9.3f}  (argument parsing, output)", file=stream)
+
+        if self.files:
+            print(f"\n{'file':14s}{header[14:]}", file=stream)
+            for phase, log_file, seconds, counters in sorted(
+                self.files, key=lambda entry: -entry[2]
+            ):
+                print(
+                    f"{phase:14s} {seconds:9.3f} {'':>6s} {counters.bytes_read:>14,} "
+                    f"{counters.lines:>12,} {counters.regex:>12,}  {log_file}",
+                    file=stream,
+                )
+
+
+# Archived logs may be compressed, e.g. build_log.txt.gz
+LOG_COMPRESSION_SUFFIXES = (".gz", ".zst")
+# Uncompressed size of the independent members written by compress_log()
+COMPRESSED_MEMBER_SIZE = 1024 * 1024
+
+
+def is_compressed(log_file: Path) -> bool:
+    return log_file.suffix in LOG_COMPRESSION_SUFFIXES
+
+
+def find_log(log_file: Path) -> Path:
+    """Return log_file, or its compressed variant if only that exists."""
+    if log_file.exists():
+        return log_file
+    for suffix in LOG_COMPRESSION_SUFFIXES:
+        candidate = log_file.with_name(log_file.name + suffix)
+        if candidate.exists():
+            return candidate
+    return log_file
+
+
+def open_log(
+    log_file: Path, checkpoints: Optional[List[Tuple[int, int]]] = None
+) -> BinaryIO:
+    """Open a log for binary reading, decompressing .gz/.zst logs transparently.
+
+    checkpoints are (compressed offset, offset) pairs of a compressed log,
+    see LineIndex.checkpoints_for(), that make seeking cheap.
+    """
+    if is_compressed(log_file):
+        return io.BufferedReader(
+            CompressedLogReader(log_file, checkpoints), CompressedLogReader.READ_SIZE
+        )
+    return open(log_file, "rb")
+
+
+def open_log_text(log_file: Path) -> TextIO:
+    """Open a (possibly compressed) log like open(log_file, "r") would."""
+    return io.TextIOWrapper(open_log(log_file), encoding="utf-8", errors="replace")
+
+
+def compress_log(
+    log_file: Path, compression: str = ".gz", member_size: Optional[int] = None
+) -> Path:
+    """Write a seekable compressed copy of log_file next to it and return its path.
+
+    The log is split at line ends into independent gzip members or zstd
+    frames of about member_size (default COMPRESSED_MEMBER_SIZE) bytes. The result is a regular
+    .gz/.zst file, but each member start is a checkpoint where
+    decompression can begin, so random access never decompresses more than
+    one member.
+    """
+    if compression == ".zst":
+        if zstandard is None:
+            raise OSError("writing .zst logs requires the zstandard package")
+        compress = zstandard.ZstdCompressor().compress
+    else:
+        compress = functools.partial(gzip.compress, mtime=0)
+
+    target = log_file.with_name(log_file.name + compression)
+    tmp_path = target.with_name(f"{target.name}.{os.getpid()}")
+    with open(log_file, "rb") as source, open(tmp_path, "wb") as f:
+        while True:
+            chunk = source.read(member_size or COMPRESSED_MEMBER_SIZE)
+            if not chunk:
+                break
+            if not chunk.endswith(b"\n"):
+                chunk += source.readline()
+            f.write(compress(chunk))
+    shutil.copystat(log_file, tmp_path)
+    os.replace(tmp_path, target)
+    return target
+
+
+class CompressedLogReader(io.RawIOBase):
+    """Seekable, read-only view of the decompressed contents of a .gz or .zst log.
+
+    A seek restarts decompression at the closest checkpoint before its
+    target instead of at the start of the file. Checkpoints are the starts
+    of gzip members and zstd frames, which need no decompressor state and
+    can be stored (see LineIndex), plus, for gzip, in-memory snapshots of
+    the decompressor taken every SNAPSHOT_SPACING bytes of output.
+    """
+
+    READ_SIZE = 256 * 1024
+    SNAPSHOT_SPACING = 4 * 1024 * 1024
+    MAX_SNAPSHOTS = 512
+
+    def __init__(
+        self, log_file: Path, checkpoints: Optional[List[Tuple[int, int]]] = None
+    ):
+        super().__init__()
+        if log_file.suffix == ".zst" and zstandard is None:
+            raise OSError(
+                f"{log_file.name}: reading .zst logs requires the zstandard package"
+            )
+        self.log_file = log_file
+        self.compression = log_file.suffix
+        self._file = open(log_file, "rb")
+        # offset -> (compressed offset, decompressor snapshot or None at a member start)
+        self._checkpoints: Dict[int, Tuple[int, object]] = {0: (0, None)}
+        for compressed_offset, offset in checkpoints or []:
+            self._checkpoints[offset] = (compressed_offset, None)
+        self._offsets = sorted(self._checkpoints)
+        self._snapshot_spacing = self.SNAPSHOT_SPACING
+        self._size: Optional[int] = None
+        self._restart(0)
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def close(self) -> None:
+        if not self.closed:
+            self._file.close()
+        super().close()
+
+    def member_checkpoints(self) -> List[Tuple[int, int]]:
+        """(compressed offset, offset) of every member start seen so far."""
+        return [
+            (compressed_offset, offset)
+            for offset, (compressed_offset, snapshot) in sorted(
+                self._checkpoints.items()
+            )
+            if offset and snapshot is None
+        ]
+
+    def readinto(self, buffer) -> int:
+        while self._position >= self._buffer_start + len(self._buffer):
+            if self._eof or not self._fill():
+                return 0
+        start = self._position - self._buffer_start
+        data = self._buffer[start : start + len(buffer)]
+        buffer[: len(data)] = data
+        self._position += len(data)
+        return len(data)
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += self._total_size()
+        if offset < 0:
+            raise ValueError(f"negative seek position {offset}")
+
+        checkpoint = self._offsets[bisect.bisect_right(self._offsets, offset) - 1]
+        if offset < self._buffer_start or checkpoint > self._buffer_start + len(
+            self._buffer
+        ):
+            self._restart(checkpoint)
+        # Decompress forward, dropping output, until the target is buffered
+        while offset > self._buffer_start + len(self._buffer) and not self._eof:
+            self._position = self._buffer_start + len(self._buffer)
+            self._fill()
+        self._position = offset
+        return offset
+
+    def _total_size(self) -> int:
+        if self._size is None:
+            last_checkpoint = self._offsets[-1]
+            if last_checkpoint > self._buffer_start + len(self._buffer):
+                self._restart(last_checkpoint)
+            while not self._eof:
+                self._position = self._buffer_start + len(self._buffer)
+                self._fill()
+            self._size = self._buffer_start + len(self._buffer)
+        return self._size
+
+    def _restart(self, offset: int) -> None:
+        """Resume decompression at the checkpoint for offset."""
+        compressed_offset, snapshot = self._checkpoints[offset]
+        self._file.seek(compressed_offset)
+        self._decompressor = snapshot.copy() if snapshot is not None else None
+        self._pending = b""
+        self._buffer = b""
+        self._buffer_start = offset
+        self._position = offset
+        self._eof = False
+
+    def _new_decompressor(self):
+        if self.compression == ".zst":
+            return zstandard.ZstdDecompressor().decompressobj()
+        return zlib.decompressobj(wbits=31)  # One gzip member
+
+    def _fill(self) -> bool:
+        """Decompress the next piece of input into the buffer; False at EOF.
+
+        Output before the current position is dropped from the buffer.
+        """
+        data = self._pending or self._file.read(self.READ_SIZE)
+        self._pending = b""
+        if self._decompressor is None and not data.strip(b"\0"):
+            # End of file, possibly after zero padding
+            self._eof = True
+            return False
+        if self._decompressor is None:
+            self._decompressor = self._new_decompressor()
+        output = self._decompressor.decompress(data)
+
+        consumed = self._position - self._buffer_start
+        if consumed > 0:
+            self._buffer = self._buffer[consumed:]
+            self._buffer_start = self._position
+        self._buffer += output
+        end = self._buffer_start + len(self._buffer)
+
+        if self._decompressor.eof:
+            # The next member starts with the unused input
+            self._pending = self._decompressor.unused_data
+            self._decompressor = None
+            self._add_checkpoint(end, self._file.tell() - len(self._pending), None)
+        elif not data:
+            # Truncated file: return what could be decompressed
+            self._eof = True
+        elif (
+            self.compression == ".gz"
+            and end - self._offsets[bisect.bisect_right(self._offsets, end) - 1]
+            >= self._snapshot_spacing
+        ):
+            self._add_checkpoint(end, self._file.tell(), self._decompressor.copy())
+        return True
+
+    def _add_checkpoint(self, offset: int, compressed_offset: int, snapshot) -> None:
+        if offset in self._checkpoints:
+            return
+        self._checkpoints[offset] = (compressed_offset, snapshot)
+        bisect.insort(self._offsets, offset)
+        snapshots = [o for o in self._offsets if self._checkpoints[o][1] is not None]
+        if len(snapshots) > self.MAX_SNAPSHOTS:
+            # Keep memory bounded on huge single-member files
+            for o in snapshots[1::2]:
+                del self._checkpoints[o]
+            self._offsets = sorted(self._checkpoints)
+            self._snapshot_spacing *= 2
 
 
 class SanityRun:
-    """Represents a single sanity test run with its logs and metadata."""
+    """Represents a single sanity test run with its logs and metadata.
+
+    Only the name and timestamp are known up front. Components, step logs
+    and step analyses are loaded on first access and memoized; with a
+    catalog, components and step logs come from it while the run directory
+    is unchanged.
+    """
+
+    def __init__(self, run_path: Path, catalog: Optional["RunCatalog"] = None):
+        self.path = run_path
+        self.name = run_path.name
+        self.timestamp = self._parse_timestamp()
+        self._catalog = catalog
+        self._step_analyses: Dict[str, Tuple[tuple, "StepAnalysis"]] = {}
+
+    @functools.cached_property
+    def master_log(self) -> Path:
+        return find_log(self.path / "master_log.txt")
+
+    @functools.cached_property
+    def components(self) -> Dict[str, str]:
+        return self._cached_metadata("components", self._load_components)
+
+    @functools.cached_property
+    def step_logs(self) -> List[str]:
+        return self._cached_metadata("step_logs", self._discover_step_logs)
+
+    @functools.cached_property
+    def mtime_ns(self) -> Optional[int]:
+        """Run directory mtime, taken once before any metadata is loaded."""
+        try:
+            return self.path.stat().st_mtime_ns
+        except OSError:
+            return None
+
+    def _cached_metadata(self, field: str, loader):
+        """Return a metadata field from the catalog, loading it on a miss."""
+        if self._catalog is None or self.mtime_ns is None:
+            with Timings.phase("run metadata"):
+                return loader()
+        entry = self._catalog.get(self.name, self.mtime_ns)
+        if entry is not None and field in entry:
+            return entry[field]
+        with Timings.phase("run metadata"):
+            value = loader()
+        self._catalog.update(self, self.mtime_ns, field, value)
+        return value
+
+    def step_analysis(self, step_name: str) -> Optional["StepAnalysis"]:
+        """Return the analysis of a step log, or None if it is missing.
+
+        Analyses are memoized while the log's size and mtime are unchanged,
+        so a long-lived run (see RunCache) picks up logs that still grow.
+        """
+        log_file = self.get_step_log_path(step_name)
+        try:
+            stat = log_file.stat()
+        except OSError:
+            return None
+        state = (log_file.name, stat.st_size, stat.st_mtime_ns)
+        cached = self._step_analyses.get(step_name)
+        if cached is None or cached[0] != state:
+            cached = self._step_analyses[step_name] = (
+                state,
+                StepAnalysis.from_log(log_file),
+            )
+        return cached[1]
+
+    def _parse_timestamp(self) -> Optional[datetime.datetime]:
+        """Parse timestamp from directory name (YYYYMMDD_HHMMSS format)."""
+        match = re.match(r"(\d{8})_(\d{6})", self.name)
+        if match:
+            date_str, time_str = match.groups()
+            return datetime.datetime.strptime(f"{date_str}_{time_str}", "%Y%m%d_%H%M%S")
+        return None
+
+    def _load_components(self) -> Dict[str, str]:
+        """Load component versions from components.txt."""
+        components = {}
+        components_file = self.path / "components.txt"
+        if components_file.exists():
+            with open(components_file, "r") as f:
+                for line in f:
+                    line = line.strip()
+                    if line and not line.startswith("#"):
+                        if "=" in line:
+                            key, value = line.split("=", 1)
+                            components[key.strip()] = value.strip()
+                        elif "[" in line and "revision=" in line:
+                            # Parse git repo info: name [type=src, remote=origin, ...]
+                            parts = line.split("[", 1)
+                            if len(parts) == 2:
+                                name = parts[0].strip()
+                                attrs = parts[1].rstrip("]")
+                                # Extract revision
+                                rev_match = re.search(r"revision=([^,\]]+)", attrs)
+                                if rev_match:
+                                    components[name] = rev_match.group(1).strip()
+        return components
+
+    def _discover_step_logs(self) -> List[str]:
+        """Discover all step log files (*_log.txt[.gz|.zst] except the master log)."""
+        step_logs = set()
+        for log_file in self.path.glob("*_log.txt*"):
+            step_name, _, suffix = log_file.name.partition("_log.txt")
+            if (
+                step_name
+                and step_name != "master"
+                and suffix in ("",) + LOG_COMPRESSION_SUFFIXES
+            ):
+                step_logs.add(step_name)
+        return sorted(step_logs)
+
+    def get_step_log_path(self, step_name: str) -> Path:
+        """Get the path to a specific step log, which may be compressed."""
+        return find_log(self.path / f"{step_name}_log.txt")
+
+    def log_states(self) -> List[list]:
+        """[step, file name, size, mtime_ns] of every step log and the master log."""
+        logs = [(step, self.get_step_log_path(step)) for step in self.step_logs]
+        logs.append(("master", self.master_log))
+        states = []
+        for step, log_file in logs:
+            try:
+                stat = log_file.stat()
+            except OSError:
+                continue
+            states.append([step, log_file.name, stat.st_size, stat.st_mtime_ns])
+        return states
+
+    @functools.cached_property
+    def error_signatures(self) -> Dict[str, Dict[str, list]]:
+        """Per step, {signature: [template, count]} of its ERROR/FATAL lines.
+
+        Step logs are scanned, or the master log for runs without any. The
+        result is kept in the catalog while every scanned log is unchanged.
+        """
+        states = [state for state in self.log_states() if state[0] != "master"]
+        if not states:
+            states = self.log_states()
+
+        entry = None
+        if self._catalog is not None and self.mtime_ns is not None:
+            entry = self._catalog.get(self.name, self.mtime_ns)
+        cached = (entry or {}).get("error_signatures")
+        if cached and cached["logs"] == states:
+            return cached["steps"]
+
+        steps = {
+            step: ErrorSignatures.scan(self.path / file_name)
+            for step, file_name, _, _ in states
+        }
+        if self._catalog is not None and self.mtime_ns is not None:
+            self._catalog.update(
+                self,
+                self.mtime_ns,
+                "error_signatures",
+                {"logs": states, "steps": steps},
+            )
+        return steps
+
+    def __str__(self) -> str:
+        timestamp_str = (
+            self.timestamp.strftime("%Y-%m-%d %H:%M:%S")
+            if self.timestamp
+            else "Unknown"
+        )
+        return f"{self.name} ({timestamp_str}) - {len(self.step_logs)} steps"
+
+
+class RunCatalog:
+    """On-disk catalog of run metadata (components and step list).
+
+    One JSON file per sanity directory lives under the cache directory.
+    Entries are keyed by run name and validated against the run directory's
+    mtime, so only runs that changed since the last invocation are parsed.
+    Access is locked, since the serve command shares one catalog between
+    request threads.
+    """
+
+    VERSION = 2
+
+    def __init__(self, sanity_dir: Path, catalog_file: Optional[Path] = None):
+        self.sanity_dir = sanity_dir
+        self.catalog_file = catalog_file or cache_file("catalog", sanity_dir, ".json")
+        self.entries: Dict[str, dict] = {}
+        self.dirty = False
+        self._lock = threading.RLock()
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self.catalog_file, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") == self.VERSION:
+            self.entries = data.get("runs", {})
+
+    def get(self, name: str, mtime_ns: int) -> Optional[dict]:
+        """Return the cached entry for a run if its directory is unchanged."""
+        with self._lock:
+            entry = self.entries.get(name)
+        if entry and entry.get("mtime_ns") == mtime_ns:
+            return entry
+        return None
+
+    def update(self, run: "SanityRun", mtime_ns: int, field: str, value) -> None:
+        """Record one metadata field, starting a fresh entry if the run changed."""
+        timestamp = run.timestamp.isoformat() if run.timestamp else None
+        with self._lock:
+            entry = self.get(run.name, mtime_ns)
+            if entry is None:
+                entry = self.entries[run.name] = {
+                    "mtime_ns": mtime_ns,
+                    "timestamp": timestamp,
+                }
+            entry[field] = value
+            self.dirty = True
+
+    def prune(self, names: set) -> None:
+        """Forget runs that no longer exist."""
+        with self._lock:
+            for name in set(self.entries) - names:
+                del self.entries[name]
+                self.dirty = True
+
+    def save(self) -> None:
+        """Write the catalog back if it changed; failures only cost speed."""
+        with self._lock:
+            if not self.dirty:
+                return
+            data = json.dumps({"version": self.VERSION, "runs": self.entries})
+            self.dirty = False
+        try:
+            write_atomically(self.catalog_file, data.encode())
+        except OSError:
+            with self._lock:
+                self.dirty = True
+
+
+class LogParser:
+    """Parser for andromeda log files."""
+
+    LINE_PATTERN = re.compile(r"^(\d+)\s+(.*)$")
+    # ANSI colored log levels like: "194 \x1b[1;32mINFO\x1b[0m"
+    LEVEL_PATTERN = re.compile(r"\x1b\[1;\d+m(\w+)\x1b\[0m")
+    LEVEL_MARKER = "\x1b[1;"
+
+    @classmethod
+    def parse(cls, line: str) -> Tuple[Optional[int], Optional[str], str]:
+        """Split a log line into (timestamp, log level, content) in one call.
+
+        Equivalent to parse_log_line() followed by extract_log_level() on the
+        content, but splits the common "<digits> <content>" shape with
+        str.partition and skips the level regex on lines without an ANSI
+        level marker.
+        """
+        line = line.rstrip("\n")
+        timestamp, content = None, line
+        if line[:1].isdecimal():
+            head, separator, rest = line.partition(" ")
+            if separator and head.isdecimal():
+                # Common case "<digits> <content>": no regex needed
+                timestamp, content = int(head), rest.lstrip()
+            else:
+                match = cls.LINE_PATTERN.match(line)
+                if match:
+                    timestamp, content = int(match.group(1)), match.group(2)
+
+        level = None
+        if cls.LEVEL_MARKER in content:
+            level_match = cls.LEVEL_PATTERN.search(content)
+            if level_match:
+                level = level_match.group(1)
+        return timestamp, level, content
+
+    @classmethod
+    def parse_log_line(cls, line: str) -> Tuple[Optional[int], str]:
+        """Parse a log line and extract line number and content."""
+        line = line.rstrip("\n")
+        # Check if line starts with a number (timestamp) followed by log content
+        match = cls.LINE_PATTERN.match(line)
+        if match:
+            timestamp = int(match.group(1))
+            content = match.group(2)
+            return timestamp, content
+        return None, line
+
+    @classmethod
+    def extract_log_level(cls, content: str) -> Optional[str]:
+        """Extract log level from content (INFO, DEBUG, ERROR, etc.)."""
+        match = cls.LEVEL_PATTERN.search(content)
+        if match:
+            return match.group(1)
+        return None
+
+    @staticmethod
+    def split_universal_newlines(line: str) -> List[str]:
+        """Split a newline-free line on carriage returns like text-mode reading does."""
+        if "\r" not in line:
+            return [line]
+        if line.endswith("\r"):
+            line = line[:-1]
+        return line.split("\r")
+
+    @staticmethod
+    def extract_step_header(content: str) -> Optional[str]:
+        """Extract step name from step header lines."""
+        # Match lines like: "CortiUpdate : $PYTHON310_EXE build.py ..."
+        if ":" in content and not content.startswith(" "):
+            step_name = content.split(":", 1)[0].strip()
+            if step_name and not any(
+                char in step_name for char in ["/", "\\", "[", "]"]
+            ):
+                return step_name
+        return None
+
+
+class ReverseLineReader:
+    """Iterate over the lines of a log file from last to first.
+
+    The file is read backwards in fixed-size blocks, so only one block and
+    the current partial line are held in memory. Lines are decoded and split
+    the same way text-mode reading splits them, without line terminators.
+    Compressed logs are read in larger blocks, starting from their stored
+    decompression checkpoints.
+    """
+
+    BLOCK_SIZE = 64 * 1024
+
+    def __init__(self, log_file: Path, block_size: Optional[int] = None):
+        self.log_file = log_file
+        self.block_size = block_size or self.BLOCK_SIZE
+        self.bytes_read = 0
+
+    def __iter__(self) -> Iterator[str]:
+        block_size = self.block_size
+        checkpoints = None
+        if is_compressed(self.log_file):
+            # Every backward seek decompresses from the previous checkpoint
+            block_size = max(block_size, CompressedLogReader.SNAPSHOT_SPACING)
+            checkpoints = LineIndex.checkpoints_for(self.log_file)
+        with open_log(self.log_file, checkpoints) as f:
+            position = f.seek(0, os.SEEK_END)
+            partial = b""
+            at_end = True
+            while position > 0:
+                read_size = min(block_size, position)
+                position -= read_size
+                self.bytes_read += read_size
+                f.seek(position)
+                pieces = (f.read(read_size) + partial).split(b"\n")
+                partial = pieces[0]
+                for raw in reversed(pieces[1:]):
+                    if at_end:
+                        at_end = False
+                        if not raw:
+                            # A trailing newline does not start another line
+                            continue
+                    yield from self._decode(raw)
+            if partial or not at_end:
+                yield from self._decode(partial)
+
+    @staticmethod
+    def _decode(raw: bytes) -> Iterator[str]:
+        lines = LogParser.split_universal_newlines(raw.decode("utf-8", "replace"))
+        return reversed(lines)
+
+
+class StepAnalysis:
+    """Duration, test result and status of a step, gathered in one pass over its log."""
+
+    TAIL_LINES = 10
+    # The backward pass stops here; markers further up are found by a forward scan
+    MAX_TAIL_BYTES = 1024 * 1024
+    FORWARD_BLOCK_SIZE = 1024 * 1024
+    FAILURE_PHRASES = ("build failed", "compilation failed", "step failed")
+    SUCCESS_PHRASES = ("done", "success", "completed successfully")
+    DURATION_PATTERN = re.compile(r"Total duration:\s*([0-9]+\.?[0-9]*s)")
+    RESULT_PATTERN = re.compile(
+        r"Overall result:\s*(\w+)\s+total=(\d+)\s+failures=(\d+)\s+errors=(\d+)\s+skipped=(\d+),?\s*not_applicable=(\d+),?\s*soundCardFailures=(\d+)"
+    )
+
+    def __init__(
+        self,
+        duration: Optional[str] = None,
+        test_result: Optional[dict] = None,
+        log_status: str = "UNKNOWN",
+    ):
+        self.duration = duration
+        self.test_result = test_result
+        self.log_status = log_status
+
+    @property
+    def status(self) -> str:
+        """Status from test results if available, otherwise from log analysis."""
+        if self.test_result:
+            if self.test_result["failures"] > 0 or self.test_result["errors"] > 0:
+                return "FAILED"
+            return "PASSED"
+        return self.log_status
+
+    @property
+    def duration_seconds(self) -> Optional[float]:
+        """Duration like "364.01s" as a float, or None."""
+        if not self.duration:
+            return None
+        try:
+            return float(self.duration.rstrip("s"))
+        except ValueError:
+            return None
+
+    @classmethod
+    def from_log(cls, log_file: Path) -> "StepAnalysis":
+        """Analyze log_file from its end, in a single pass.
+
+        The markers normally sit in the last lines of a log, so the scan
+        stops as soon as the tail, the duration and the test result have
+        been seen. Decoding stops after the last MAX_TAIL_BYTES; a marker
+        not found by then (build and flash steps have no test result) is
+        looked for by a forward byte search over the log, which decodes only
+        the lines holding it. As with reading the whole log, that yields the
+        last duration and the first test result; a test result found in the
+        tail is the last one, logs normally hold a single one. Memory use
+        does not depend on the log size.
+        """
+        duration = None
+        test_result = None
+        tail: List[str] = []
+        reader = ReverseLineReader(log_file)
+        with Timings.file("step analysis", log_file) as counters:
+            try:
+                truncated = False
+                for line in reader:
+                    counters.lines += 1
+                    if len(tail) < cls.TAIL_LINES:
+                        tail.append(line)
+                    # Cheap substring checks first; the regexes only run on candidates
+                    if (
+                        duration is None
+                        and "Total duration:" in line
+                        and line.strip().startswith("Total duration:")
+                    ):
+                        counters.regex += 1
+                        match = cls.DURATION_PATTERN.search(line)
+                        if match:
+                            duration = match.group(1)
+                    elif test_result is None and "Overall result:" in line:
+                        counters.regex += 1
+                        test_result = cls._parse_test_result(line)
+
+                    if len(tail) >= cls.TAIL_LINES and (
+                        (duration is not None and test_result is not None)
+                        or reader.bytes_read >= cls.MAX_TAIL_BYTES
+                    ):
+                        truncated = True
+                        break
+                if truncated and (duration is None or test_result is None):
+                    duration, test_result = cls._scan_forward(
+                        log_file, duration, test_result, counters
+                    )
+            except Exception:
+                return cls(log_status="ERROR")
+            finally:
+                counters.bytes_read += reader.bytes_read
+
+        return cls(
+            duration, test_result, cls._status_from_tail("\n".join(reversed(tail)))
+        )
+
+    @classmethod
+    def _scan_forward(
+        cls,
+        log_file: Path,
+        duration: Optional[str],
+        test_result: Optional[dict],
+        counters: FileCounters,
+    ) -> Tuple[Optional[str], Optional[dict]]:
+        """Fill in the missing markers: the last duration, the first test result."""
+        find_duration = duration is None
+        partial = b""
+        with open_log(log_file) as f:
+            while True:
+                block = f.read(cls.FORWARD_BLOCK_SIZE)
+                counters.bytes_read += len(block)
+                data = partial + block
+                cut = data.rfind(b"\n") + 1 if block else len(data)
+                data, partial = data[:cut], data[cut:]
+                markers = [b"Overall result:"] if test_result is None else []
+                if find_duration:
+                    markers.append(b"Total duration:")
+                # Only the lines holding a marker are decoded
+                for raw in cls._lines_with(data, markers):
+                    for line in LogParser.split_universal_newlines(
+                        raw.decode("utf-8", "replace")
+                    ):
+                        counters.lines += 1
+                        if find_duration and line.strip().startswith("Total duration:"):
+                            counters.regex += 1
+                            match = cls.DURATION_PATTERN.search(line)
+                            if match:
+                                duration = match.group(1)
+                        elif test_result is None and "Overall result:" in line:
+                            counters.regex += 1
+                            test_result = cls._parse_test_result(line)
+                if not block or (test_result is not None and not find_duration):
+                    return duration, test_result
+
+    @staticmethod
+    def _lines_with(data: bytes, markers: List[bytes]) -> Iterator[bytes]:
+        """The newline-separated lines of data that contain one of markers."""
+        if not any(marker in data for marker in markers):
+            return
+        for raw in data.split(b"\n"):
+            if any(marker in raw for marker in markers):
+                yield raw
+
+    @classmethod
+    def _parse_test_result(cls, line: str) -> Optional[dict]:
+        match = cls.RESULT_PATTERN.search(line)
+        if not match:
+            return None
+        return {
+            "status": match.group(1),
+            "total": int(match.group(2)),
+            "failures": int(match.group(3)),
+            "errors": int(match.group(4)),
+            "skipped": int(match.group(5)),
+            "not_applicable": int(match.group(6)),
+            "soundcard_failures": int(match.group(7)),
+        }
+
+    @classmethod
+    def _status_from_tail(cls, tail: str) -> str:
+        """Classify a step from the last lines of its log."""
+        last_lines = tail.lower()
+
+        # If we have a Total duration line, the step likely completed
+        if "total duration:" in last_lines:
+            # Look for explicit failure indicators near the end
+            if any(phrase in last_lines for phrase in cls.FAILURE_PHRASES):
+                return "FAILED"
+            return "COMPLETED"
+
+        # Look for explicit completion/success indicators
+        if any(phrase in last_lines for phrase in cls.SUCCESS_PHRASES):
+            return "COMPLETED"
+
+        # Look for explicit failure indicators at the end
+        if any(phrase in last_lines for phrase in cls.FAILURE_PHRASES):
+            return "FAILED"
+
+        # Default to unknown if we can't determine
+        return "UNKNOWN"
+
+
+class StepStatsStore:
+    """Columnar store of per-step statistics, one row per run x step.
+
+    Every column is a typed array (run and step names are dictionary
+    encoded), persisted in one file under the cache directory: a JSON header
+    line followed by the raw column bytes. Runs are (re)analyzed only when
+    their signature -- run directory mtime and master log size -- changes.
+    """
+
+    VERSION = 1
+    COLUMNS = (
+        ("run", "I"),
+        ("step", "I"),
+        ("duration", "d"),  # seconds, NaN if unknown
+        ("total", "i"),  # test counts are -1 without an "Overall result:" line
+        ("failures", "i"),
+        ("errors", "i"),
+        ("skipped", "i"),
+        ("status", "B"),
+    )
+    STATUSES = ["PASSED", "FAILED", "COMPLETED", "UNKNOWN", "ERROR", "MISSING"]
+
+    def __init__(
+        self,
+        sanity_dir: Path,
+        store_file: Optional[Path] = None,
+        persistent: bool = True,
+    ):
+        self.store_file = store_file or cache_file("step_stats", sanity_dir, ".bin")
+        self.persistent = persistent
+        self.columns = {name: array(code) for name, code in self.COLUMNS}
+        self.runs: List[str] = []
+        self.run_signatures: List[Optional[List[int]]] = []
+        self.steps: List[str] = []
+        self.dirty = False
+        if persistent:
+            self._load()
+        self._run_ids = {name: i for i, name in enumerate(self.runs)}
+        self._step_ids = {name: i for i, name in enumerate(self.steps)}
+
+    def _load(self) -> None:
+        try:
+            with open(self.store_file, "rb") as f:
+                header = json.loads(f.readline())
+                if header.get("version") != self.VERSION:
+                    return
+                columns = {name: array(code) for name, code in self.COLUMNS}
+                for name, column in columns.items():
+                    column.fromfile(f, header["rows"])
+        except (OSError, ValueError, EOFError, KeyError):
+            return
+        self.columns = columns
+        self.runs = header["runs"]
+        self.run_signatures = header["run_signatures"]
+        self.steps = header["steps"]
+
+    def __len__(self) -> int:
+        return len(self.columns["run"])
+
+    @staticmethod
+    def run_signature(run: SanityRun) -> Optional[List[int]]:
+        try:
+            master_size = run.master_log.stat().st_size
+        except OSError:
+            master_size = -1
+        if run.mtime_ns is None:
+            return None
+        return [run.mtime_ns, master_size]
+
+    def refresh(self, runs: List[SanityRun]) -> int:
+        """Analyze runs that are new or changed since they were stored.
+
+        Returns the number of runs that had to be (re)analyzed.
+        """
+        stale = []
+        for run in runs:
+            signature = self.run_signature(run)
+            run_id = self._run_ids.get(run.name)
+            if (
+                run_id is None
+                or signature is None
+                or self.run_signatures[run_id] != signature
+            ):
+                stale.append((run, signature))
+        if not stale:
+            return 0
+
+        stale_ids = {
+            self._run_ids[run.name] for run, _ in stale if run.name in self._run_ids
+        }
+        if stale_ids:
+            keep = [
+                i
+                for i, run_id in enumerate(self.columns["run"])
+                if run_id not in stale_ids
+            ]
+            for name, code in self.COLUMNS:
+                column = self.columns[name]
+                self.columns[name] = array(code, (column[i] for i in keep))
+
+        for run, signature in stale:
+            run_id = self._intern_run(run.name)
+            self.run_signatures[run_id] = signature
+            for step in run.step_logs:
+                self._append(run_id, self._intern_step(step), run.step_analysis(step))
+        self.dirty = True
+        return len(stale)
+
+    def _intern_run(self, name: str) -> int:
+        if name not in self._run_ids:
+            self._run_ids[name] = len(self.runs)
+            self.runs.append(name)
+            self.run_signatures.append(None)
+        return self._run_ids[name]
+
+    def _intern_step(self, name: str) -> int:
+        if name not in self._step_ids:
+            self._step_ids[name] = len(self.steps)
+            self.steps.append(name)
+        return self._step_ids[name]
+
+    def _append(
+        self, run_id: int, step_id: int, analysis: Optional[StepAnalysis]
+    ) -> None:
+        result = analysis.test_result if analysis else None
+        duration = analysis.duration_seconds if analysis else None
+        status = analysis.status if analysis else "MISSING"
+        columns = self.columns
+        columns["run"].append(run_id)
+        columns["step"].append(step_id)
+        columns["duration"].append(math.nan if duration is None else duration)
+        for field in ("total", "failures", "errors", "skipped"):
+            columns[field].append(result[field] if result else -1)
+        columns["status"].append(
+            self.STATUSES.index(status)
+            if status in self.STATUSES
+            else self.STATUSES.index("UNKNOWN")
+        )
+
+    def rows(self, run_names: Optional[List[str]] = None) -> Iterator[dict]:
+        """Yield stored rows as dicts, optionally restricted to some runs."""
+        wanted = None
+        if run_names is not None:
+            wanted = {
+                self._run_ids[name] for name in run_names if name in self._run_ids
+            }
+        columns = [self.columns[name] for name, _ in self.COLUMNS]
+        for run_id, step_id, duration, total, failures, errors, skipped, status in zip(
+            *columns
+        ):
+            if wanted is not None and run_id not in wanted:
+                continue
+            yield {
+                "run": self.runs[run_id],
+                "step": self.steps[step_id],
+                "duration": None if math.isnan(duration) else duration,
+                "total": None if total < 0 else total,
+                "failures": None if failures < 0 else failures,
+                "errors": None if errors < 0 else errors,
+                "skipped": None if skipped < 0 else skipped,
+                "status": self.STATUSES[status],
+            }
+
+    def durations_by_step(
+        self, run_names: List[str]
+    ) -> Dict[str, List[Optional[float]]]:
+        """Per step, durations ordered like run_names (None where unknown)."""
+        positions = {
+            self._run_ids[name]: i
+            for i, name in enumerate(run_names)
+            if name in self._run_ids
+        }
+        series: Dict[str, List[Optional[float]]] = {}
+        for run_id, step_id, duration in zip(
+            self.columns["run"], self.columns["step"], self.columns["duration"]
+        ):
+            position = positions.get(run_id)
+            if position is None:
+                continue
+            values = series.setdefault(self.steps[step_id], [None] * len(run_names))
+            if not math.isnan(duration):
+                values[position] = duration
+        return series
+
+    def step_failures(self, step: str, run_names: List[str]) -> List[Optional[bool]]:
+        """Per run of run_names, whether step failed (None if unknown or absent).
+
+        A step fails on a FAILED or ERROR status or any test failure or error;
+        PASSED and COMPLETED steps without either count as passing.
+        """
+        outcomes: List[Optional[bool]] = [None] * len(run_names)
+        step_id = self._step_ids.get(step)
+        if step_id is None:
+            return outcomes
+        positions = {
+            self._run_ids[name]: i
+            for i, name in enumerate(run_names)
+            if name in self._run_ids
+        }
+        failing = {self.STATUSES.index("FAILED"), self.STATUSES.index("ERROR")}
+        passing = {self.STATUSES.index("PASSED"), self.STATUSES.index("COMPLETED")}
+        columns = self.columns
+        for run_id, row_step, status, failures, errors in zip(
+            columns["run"],
+            columns["step"],
+            columns["status"],
+            columns["failures"],
+            columns["errors"],
+        ):
+            if row_step != step_id:
+                continue
+            position = positions.get(run_id)
+            if position is None:
+                continue
+            if status in failing or failures > 0 or errors > 0:
+                outcomes[position] = True
+            elif status in passing:
+                outcomes[position] = False
+        return outcomes
+
+    def save(self) -> None:
+        """Write the store back if it changed; failures only cost speed."""
+        if not self.dirty or not self.persistent:
+            return
+        header = {
+            "version": self.VERSION,
+            "rows": len(self),
+            "runs": self.runs,
+            "run_signatures": self.run_signatures,
+            "steps": self.steps,
+        }
+        data = json.dumps(header).encode() + b"\n"
+        data += b"".join(self.columns[name].tobytes() for name, _ in self.COLUMNS)
+        try:
+            write_atomically(self.store_file, data)
+            self.dirty = False
+        except OSError:
+            pass
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Linearly interpolated percentile of an already sorted list."""
+    position = (len(sorted_values) - 1) * fraction
+    lower = math.floor(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (
+        position - lower
+    )
+
+
+class LineIndex:
+    """Sampled line number -> byte offset index for a single log file.
+
+    The index is stored in the cache directory, never in the run directory
+    (whose mtime keys the run caches), and is rebuilt whenever the log's mtime
+    or size changes. Lines are numbered like text-mode reading does, so a lone
+    carriage return also ends a line. Offsets are fixed-width records, so looking up
+    a line reads the header plus one entry regardless of the log size.
+
+    For compressed logs the offsets are positions in the decompressed data,
+    and the index also stores the decompression checkpoints (member starts)
+    found while building it, see CompressedLogReader.
+    """
+
+    MAGIC = b"SLVIDX03"
+    # magic, mtime_ns, size, stride, total_lines, checkpoint count
+    HEADER = struct.Struct("<8sqQQQQ")
+    ENTRY = struct.Struct("<Q")
+    CHECKPOINT = struct.Struct("<QQ")  # compressed offset, offset
+    DEFAULT_STRIDE = 1000
+    # Logs smaller than this are cheap enough to scan from the top
+    MIN_LOG_SIZE = 4 * 1024 * 1024
+    MIN_COMPRESSED_LOG_SIZE = 256 * 1024
+    LINE_BREAK = re.compile(rb"\r\n?|\n")
+
+    def __init__(
+        self,
+        index_path: Path,
+        stride: int,
+        total_lines: int,
+        checkpoint_count: int = 0,
+    ):
+        self.index_path = index_path
+        self.stride = stride
+        self.total_lines = total_lines
+        self.checkpoint_count = checkpoint_count
+
+    @staticmethod
+    def path_for(log_file: Path) -> Path:
+        """Location of the index of log_file."""
+        return cache_file("line_index", log_file, ".idx")
+
+    @classmethod
+    def open_for(cls, log_file: Path, stride: Optional[int] = None) -> "LineIndex":
+        """Return a valid index for log_file, building it if needed."""
+        stride = stride or cls.DEFAULT_STRIDE
+        stat = log_file.stat()
+        index_path = cls.path_for(log_file)
+        index = cls._load(index_path, stat)
+        if index:
+            return index
+
+        offsets, total_lines, checkpoints = cls._build_offsets(log_file, stride)
+        header = cls.HEADER.pack(
+            cls.MAGIC,
+            stat.st_mtime_ns,
+            stat.st_size,
+            stride,
+            total_lines,
+            len(checkpoints),
+        )
+        data = header + offsets.tobytes()
+        data += b"".join(cls.CHECKPOINT.pack(*checkpoint) for checkpoint in checkpoints)
+        write_atomically(index_path, data)
+        return cls(index_path, stride, total_lines, len(checkpoints))
+
+    @classmethod
+    def checkpoints_for(cls, log_file: Path) -> Optional[List[Tuple[int, int]]]:
+        """Decompression checkpoints of a compressed log, indexing it if needed.
+
+        None for uncompressed logs and for compressed logs too small to be
+        worth an index.
+        """
+        try:
+            if (
+                not is_compressed(log_file)
+                or log_file.stat().st_size < cls.MIN_COMPRESSED_LOG_SIZE
+            ):
+                return None
+            return cls.open_for(log_file).checkpoints()
+        except OSError:
+            return None
+
+    @classmethod
+    def _load(cls, index_path: Path, stat: os.stat_result) -> Optional["LineIndex"]:
+        """Load an index header, returning None if missing or stale."""
+        try:
+            with open(index_path, "rb") as f:
+                header = f.read(cls.HEADER.size)
+        except OSError:
+            return None
+        if len(header) != cls.HEADER.size:
+            return None
+        magic, mtime_ns, size, stride, total_lines, checkpoint_count = (
+            cls.HEADER.unpack(header)
+        )
+        if magic != cls.MAGIC or mtime_ns != stat.st_mtime_ns or size != stat.st_size:
+            return None
+        return cls(index_path, stride, total_lines, checkpoint_count)
+
+    @classmethod
+    def _build_offsets(
+        cls, log_file: Path, stride: int
+    ) -> Tuple[array, int, List[Tuple[int, int]]]:
+        """Scan log_file once, recording the byte offset of every stride-th line.
+
+        Also returns the decompression checkpoints of a compressed log.
+        """
+        offsets = array("Q", [0])
+        next_sample = stride  # 0-based number of the next line to record
+        lines_seen = 0
+        position = 0
+        last_byte = b""
+        with Timings.file("line index", log_file) as counters, open_log(log_file) as f:
+            while True:
+                chunk = f.read(1 << 20)
+                if not chunk:
+                    break
+                if chunk.endswith(b"\r"):
+                    # Keep a "\r\n" pair in one chunk so it counts as one break
+                    chunk += f.read(1)
+                has_cr = b"\r" in chunk
+                breaks = chunk.count(b"\n")
+                if has_cr:
+                    breaks += chunk.count(b"\r") - chunk.count(b"\r\n")
+                if lines_seen + breaks >= next_sample:
+                    # ends[i] is the offset just past the i-th line break of this chunk
+                    if has_cr:
+                        ends = [match.end() for match in cls.LINE_BREAK.finditer(chunk)]
+                    else:
+                        parts = chunk.split(b"\n")[:-1]
+                        ends = list(
+                            itertools.accumulate(len(part) + 1 for part in parts)
+                        )
+                    while next_sample <= lines_seen + breaks:
+                        offsets.append(position + ends[next_sample - lines_seen - 1])
+                        next_sample += stride
+                lines_seen += breaks
+                position += len(chunk)
+                last_byte = chunk[-1:]
+            raw = getattr(f, "raw", None)
+            checkpoints = (
+                raw.member_checkpoints() if isinstance(raw, CompressedLogReader) else []
+            )
+            counters.bytes_read = position
+            counters.lines = lines_seen
+
+        total_lines = lines_seen + (1 if last_byte not in (b"", b"\n", b"\r") else 0)
+        # Drop a trailing sample that points at EOF (file ends with a newline)
+        if len(offsets) > 1 and offsets[-1] >= position:
+            offsets.pop()
+        return offsets, total_lines, checkpoints
+
+    def checkpoints(self) -> List[Tuple[int, int]]:
+        """Stored (compressed offset, offset) decompression checkpoints."""
+        if not self.checkpoint_count:
+            return []
+        with open(self.index_path, "rb") as f:
+            f.seek(-self.checkpoint_count * self.CHECKPOINT.size, os.SEEK_END)
+            data = f.read(self.checkpoint_count * self.CHECKPOINT.size)
+        return list(self.CHECKPOINT.iter_unpack(data))
+
+    def locate(self, line_number: int) -> Tuple[int, int]:
+        """Return (byte offset, line number) of the closest sampled line <= line_number."""
+        entry_count = max(1, -(-self.total_lines // self.stride))
+        slot = min(max(line_number - 1, 0) // self.stride, entry_count - 1)
+        with open(self.index_path, "rb") as f:
+            f.seek(self.HEADER.size + slot * self.ENTRY.size)
+            (offset,) = self.ENTRY.unpack(f.read(self.ENTRY.size))
+        return offset, slot * self.stride + 1
+
+
+class LogSearcher:
+    """Regex search over log files that only decodes lines that can match.
+
+    The log is memory-mapped and a bytes version of the pattern runs over the
+    whole buffer; each hit is mapped back to its line, which is then decoded
+    and verified against the original pattern applied to the parsed content,
+    exactly as the line-by-line search does. Compressed logs get the same
+    treatment one decompressed block at a time.
+
+    Some constructs ('.', '\\w', negated classes, case folding) match one
+    byte of a multibyte UTF-8 character where the str pattern matches the
+    whole character, so the bytes pattern could miss lines. For those
+    patterns a buffer holding non-ASCII bytes has every line decoded and
+    verified instead.
+    """
+
+    # Constructs that behave differently once the timestamp prefix and line
+    # terminators are stripped (anchors, lookbehind) use the line-by-line scan
+    _LINE_SENSITIVE = re.compile(r"(?<![\[\\])[\^$]|\\[ABZ]|\(\?<[=!]")
+    # Pattern tokens, so that escaped characters are never mistaken for syntax
+    _PATTERN_TOKEN = re.compile(r"\\.|\[\^|\(\?[a-zA-Z-]*i|.", re.DOTALL)
+    _UNICODE_SENSITIVE = {".", "[^", *(f"\\{c}" for c in "wWsSdDbB")}
+    _NON_ASCII = re.compile(rb"[\x80-\xff]")
+    _EVERY_LINE = re.compile(rb"^", re.MULTILINE)
+
+    def __init__(self, regex: re.Pattern):
+        self.regex = regex
+        self.byte_regex = self._compile_byte_regex(regex)
+        self.unicode_sensitive = self._is_unicode_sensitive(regex)
+
+    @classmethod
+    def _compile_byte_regex(cls, regex: re.Pattern) -> Optional[re.Pattern]:
+        """Build a bytes prefilter for regex, or None if it cannot be exact."""
+        pattern = regex.pattern
+        if not isinstance(pattern, str) or not pattern.isascii():
+            return None
+        if cls._LINE_SENSITIVE.search(pattern):
+            return None
+        flags = re.MULTILINE | (regex.flags & (re.IGNORECASE | re.DOTALL | re.VERBOSE))
+        try:
+            return re.compile(pattern.encode("ascii"), flags)
+        except re.error:
+            return None
+
+    @classmethod
+    def _is_unicode_sensitive(cls, regex: re.Pattern) -> bool:
+        """Whether the bytes form of regex can disagree with it on non-ASCII text."""
+        if regex.flags & re.IGNORECASE:
+            return True
+        return any(
+            token in cls._UNICODE_SENSITIVE or token.startswith("(?")
+            for token in cls._PATTERN_TOKEN.findall(regex.pattern)
+        )
+
+    # Files are only split across workers in pieces of at least this size
+    MIN_CHUNK_SIZE = 32 * 1024 * 1024
+    # Decompressed bytes searched at a time in compressed logs
+    STREAM_BLOCK_SIZE = 16 * 1024 * 1024
+
+    def scan(
+        self, log_file: Path, start: int = 0, end: Optional[int] = None
+    ) -> Iterator[Tuple[int, int, str]]:
+        """Yield (line number, timestamp, content) for every matching line.
+
+        start/end restrict the scan to lines beginning in that byte range;
+        line numbers are then relative to start. Ranges only apply to the
+        memory-mapped path, see plan_chunks().
+        """
+        with Timings.file("search", log_file) as counters:
+            if self.byte_regex is not None and is_compressed(log_file):
+                yield from self._scan_stream(log_file, counters)
+                return
+            if self.byte_regex is not None:
+                with open(log_file, "rb") as f:
+                    if os.fstat(f.fileno()).st_size == 0:
+                        return
+                    try:
+                        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                    except (OSError, ValueError):
+                        buffer = None
+                    if buffer is not None:
+                        with buffer:
+                            yield from self._scan_buffer(buffer, start, end, counters)
+                        return
+            yield from self._scan_lines(log_file, counters)
+
+    def plan_chunks(self, log_file: Path, jobs: int) -> List[Tuple[int, int]]:
+        """Split log_file into line-aligned byte ranges for parallel scanning."""
+        size = log_file.stat().st_size
+        if (
+            self.byte_regex is None
+            or jobs <= 1
+            or size < 2 * self.MIN_CHUNK_SIZE
+            or is_compressed(log_file)
+        ):
+            return [(0, size)]
+
+        chunk_size = max(self.MIN_CHUNK_SIZE, -(-size // jobs))
+        boundaries = [0]
+        with open(log_file, "rb") as f:
+            while boundaries[-1] + chunk_size < size:
+                f.seek(boundaries[-1] + chunk_size)
+                f.readline()
+                if f.tell() >= size:
+                    break
+                boundaries.append(f.tell())
+        boundaries.append(size)
+        return list(zip(boundaries, boundaries[1:]))
+
+    def scan_chunk(
+        self, log_file: Path, start: int, end: int
+    ) -> Tuple[List[Tuple[int, int, str]], int]:
+        """Scan one planned chunk; also return its newline count.
+
+        This is the unit of work for the process pool: the caller adds the
+        newline counts of preceding chunks to make line numbers absolute.
+        """
+        matches = list(self.scan(log_file, start, end))
+        if self.byte_regex is None or is_compressed(log_file):
+            # Such files are never split, so the count is not needed
+            return matches, 0
+        with open(log_file, "rb") as f, mmap.mmap(
+            f.fileno(), 0, access=mmap.ACCESS_READ
+        ) as buffer:
+            return matches, self._count_newlines(buffer, start, end)
+
+    def _scan_lines(
+        self, log_file: Path, counters: Optional[FileCounters] = None
+    ) -> Iterator[Tuple[int, int, str]]:
+        """Decode and test every line (used when no bytes prefilter applies)."""
+        counters = counters or FileCounters()
+        with open_log_text(log_file) as f:
+            for line_number, line in enumerate(f, 1):
+                counters.lines += 1
+                counters.regex += 2
+                timestamp, content = LogParser.parse_log_line(line)
+                if content and self.regex.search(content):
+                    yield line_number, timestamp or 0, content
+            counters.bytes_read += f.buffer.tell()
+
+    def _scan_stream(
+        self, log_file: Path, counters: Optional[FileCounters] = None
+    ) -> Iterator[Tuple[int, int, str]]:
+        """Search a compressed log in line-aligned blocks of decompressed data."""
+        counters = counters or FileCounters()
+        lines_before = 0
+        partial = b""
+        with open_log(log_file) as f:
+            while True:
+                block = f.read(self.STREAM_BLOCK_SIZE)
+                data = partial + block
+                if block:
+                    cut = data.rfind(b"\n") + 1
+                    data, partial = data[:cut], data[cut:]
+                if data:
+                    for line_number, timestamp, content in self._scan_buffer(
+                        data, counters=counters
+                    ):
+                        yield lines_before + line_number, timestamp, content
+                    lines_before += data.count(b"\n")
+                if not block:
+                    return
+
+    def _scan_buffer(
+        self,
+        buffer,
+        start: int = 0,
+        end: Optional[int] = None,
+        counters: Optional[FileCounters] = None,
+    ) -> Iterator[Tuple[int, int, str]]:
+        counters = counters or FileCounters()
+        position = start
+        end = len(buffer) if end is None else end
+        counters.bytes_read += end - start
+        byte_regex = self.byte_regex
+        if self.unicode_sensitive and self._NON_ASCII.search(buffer, start, end):
+            # Every line is a candidate, verified by the str pattern below
+            byte_regex = self._EVERY_LINE
+        line_number = 1
+        counted_to = start
+        while position < end:
+            counters.regex += 1
+            match = byte_regex.search(buffer, position, end)
+            if not match:
+                break
+            newline = buffer.rfind(b"\n", position, match.start())
+            line_start = newline + 1 if newline >= 0 else position
+            line_end = buffer.find(b"\n", line_start)
+            if line_end < 0:
+                line_end = end
+
+            line_number += self._count_newlines(buffer, counted_to, line_start)
+            counted_to = line_start
+            for line in LogParser.split_universal_newlines(
+                buffer[line_start:line_end].decode("utf-8", "replace")
+            ):
+                counters.lines += 1
+                counters.regex += 2
+                timestamp, content = LogParser.parse_log_line(line)
+                if content and self.regex.search(content):
+                    yield line_number, timestamp or 0, content
+            position = line_end + 1
+
+    @staticmethod
+    def _count_newlines(buffer, start: int, end: int, window: int = 1 << 24) -> int:
+        """Count newlines in buffer[start:end] without copying it all at once."""
+        count = 0
+        for offset in range(start, end, window):
+            count += buffer[offset : min(offset + window, end)].count(b"\n")
+        return count
+
+
+class LogFilter:
+    """Select log lines by level and timestamp window in a single pass.
+
+    levels None accepts any line (with or without a level); since/until
+    bound the numeric line timestamp inclusively and drop lines without one.
+    Instances are picklable, so scan() can run in a process pool.
+    """
+
+    def __init__(
+        self,
+        levels: Optional[List[str]] = None,
+        since: Optional[int] = None,
+        until: Optional[int] = None,
+    ):
+        self.levels = {level.strip().upper() for level in levels} if levels else None
+        self.since = since
+        self.until = until
+        self._marker = LogParser.LEVEL_MARKER.encode()
+
+    def matches(self, timestamp: Optional[int], level: Optional[str]) -> bool:
+        if self.levels is not None and (not level or level.upper() not in self.levels):
+            return False
+        if self.since is not None or self.until is not None:
+            if timestamp is None:
+                return False
+            if self.since is not None and timestamp < self.since:
+                return False
+            if self.until is not None and timestamp > self.until:
+                return False
+        return True
+
+    def scan(
+        self, log_file: Path
+    ) -> Iterator[Tuple[Optional[int], Optional[str], str]]:
+        """Yield (timestamp, level, content) of every selected line of log_file."""
+        with Timings.file("filter", log_file) as counters, open_log(log_file) as f:
+            for raw in f:
+                # Lines without an ANSI level marker cannot have a level
+                if self.levels is not None and self._marker not in raw:
+                    continue
+                # LogParser.parse only runs its level regex on marked lines
+                if self._marker in raw:
+                    counters.regex += 1
+                for line in LogParser.split_universal_newlines(
+                    raw.rstrip(b"\n").decode("utf-8", "replace")
+                ):
+                    counters.lines += 1
+                    timestamp, level, content = LogParser.parse(line)
+                    if content and self.matches(timestamp, level):
+                        yield timestamp, level, content
+            counters.bytes_read = f.tell()
+
+    def scan_all(
+        self, log_file: Path
+    ) -> List[Tuple[Optional[int], Optional[str], str]]:
+        """scan() collected into a list, the unit of work for the process pool."""
+        return list(self.scan(log_file))
+
+
+class DirectoryWatcher:
+    """Wait for changes in a directory, using inotify where available.
+
+    inotify is reached through ctypes so no extra package is needed. On
+    other platforms, or when inotify cannot be set up, wait() simply sleeps
+    for the poll interval. With inotify the interval still bounds each wait,
+    which keeps network filesystems (whose remote writes raise no events)
+    working.
+    """
+
+    IN_MODIFY = 0x00000002
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+
+    def __init__(self, directory: Path, poll_interval: float = 1.0):
+        self.poll_interval = poll_interval
+        self.fd: Optional[int] = None
+        try:
+            libc = ctypes.CDLL(
+                ctypes.util.find_library("c") or "libc.so.6", use_errno=True
+            )
+            fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+            if fd < 0:
+                return
+            mask = (
+                self.IN_MODIFY | self.IN_CLOSE_WRITE | self.IN_MOVED_TO | self.IN_CREATE
+            )
+            if libc.inotify_add_watch(fd, os.fsencode(directory), mask) < 0:
+                os.close(fd)
+                return
+            self.fd = fd
+        except (OSError, AttributeError):
+            self.fd = None
+
+    @property
+    def uses_inotify(self) -> bool:
+        return self.fd is not None
+
+    def wait(self) -> bool:
+        """Block until something changes or the poll interval elapses.
+
+        Returns whether inotify reported a change; without inotify it cannot
+        tell and returns False after the interval.
+        """
+        if self.fd is None:
+            time.sleep(self.poll_interval)
+            return False
+        readable, _, _ = select.select([self.fd], [], [], self.poll_interval)
+        if readable:
+            # Drain the queued events; callers re-check the files themselves
+            try:
+                while os.read(self.fd, 64 * 1024):
+                    pass
+            except BlockingIOError:
+                pass
+        return bool(readable)
+
+    def close(self) -> None:
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+class LogFollower:
+    """Follow the logs of a (running) sanity run, like tail -F.
+
+    Each file's read offset and unfinished last line are kept, so every
+    poll only reads bytes appended since the previous one. New *_log.txt
+    files are picked up as steps start and are read from their beginning.
+    A file that shrinks is treated as truncated and read again from the start.
+    """
+
+    def __init__(
+        self,
+        run: SanityRun,
+        step_name: Optional[str] = None,
+        levels: Optional[List[str]] = None,
+        regex: Optional[re.Pattern] = None,
+        from_start: bool = False,
+    ):
+        self.run = run
+        self.step_name = step_name
+        self.levels = {level.strip().upper() for level in levels} if levels else None
+        self.regex = regex
+        self.offsets: Dict[Path, int] = {}
+        self.partial: Dict[Path, bytes] = {}
+        if not from_start:
+            # Only content written from now on is shown for existing logs
+            for _, log_file in self._log_files():
+                self.offsets[log_file] = log_file.stat().st_size
+
+    def _log_files(self) -> List[Tuple[str, Path]]:
+        # Compressed logs are archives, they do not grow
+        if self.step_name:
+            log_file = self.run.get_step_log_path(self.step_name)
+            if log_file.exists() and not is_compressed(log_file):
+                return [(self.step_name, log_file)]
+            return []
+        log_files = []
+        if self.run.master_log.exists() and not is_compressed(self.run.master_log):
+            log_files.append(("master", self.run.master_log))
+        for log_file in sorted(self.run.path.glob("*_log.txt")):
+            if log_file.name != "master_log.txt":
+                log_files.append((log_file.stem.replace("_log", ""), log_file))
+        return log_files
+
+    def poll(self) -> Iterator[Tuple[str, str]]:
+        """Yield (step, line) for every complete new line that passes the filters."""
+        for step, log_file in self._log_files():
+            try:
+                size = log_file.stat().st_size
+            except OSError:
+                continue
+            offset = self.offsets.get(log_file, 0)
+            if size < offset:
+                offset = 0
+                self.partial.pop(log_file, None)
+            if size == offset:
+                self.offsets[log_file] = offset
+                continue
+
+            with open(log_file, "rb") as f:
+                f.seek(offset)
+                data = self.partial.pop(log_file, b"") + f.read(size - offset)
+            self.offsets[log_file] = size
+
+            *complete, remainder = data.split(b"\n")
+            if remainder:
+                self.partial[log_file] = remainder
+            for raw in complete:
+                for line in LogParser.split_universal_newlines(
+                    raw.decode("utf-8", "replace")
+                ):
+                    if self._matches(line):
+                        yield step, line
+
+    def _matches(self, line: str) -> bool:
+        if self.levels is None and self.regex is None:
+            return True
+        _, level, content = LogParser.parse(line)
+        if self.levels is not None and (not level or level.upper() not in self.levels):
+            return False
+        if self.regex is not None and not self.regex.search(content):
+            return False
+        return True
+
+    def follow(self, watcher: DirectoryWatcher) -> Iterator[Tuple[str, str]]:
+        """Poll forever, waiting on watcher between polls."""
+        while True:
+            yield from self.poll()
+            watcher.wait()
+
+
+class SearchIndex:
+    """Inverted index over the logs of one run: token -> (line, offset) postings.
+
+    Tokens are lowercased runs of [a-z0-9_]; purely numeric tokens
+    (timestamps, counters) are not indexed, and tokens longer than
+    MAX_TOKEN_LENGTH (long identifiers, paths, hex blobs) are all posted
+    under LONG_TOKENS, whose lines are candidates for every literal. Each
+    token's postings are stored per log file, in blocks of at most
+    MAX_PENDING_POSTINGS, as delta-encoded line numbers and byte offsets
+    compressed with zlib, behind a JSON header holding the vocabulary. The
+    index is only used while every indexed log still has the recorded size
+    and mtime.
+
+    Queries made of literals (optionally joined by ".*") are answered by
+    looking up every vocabulary token that contains each literal's word
+    characters, then verifying the candidate lines with the real regex, so
+    results are identical to a scan. Queries matching more than
+    MAX_CANDIDATE_RATIO of a run's lines are left to the scan, which is
+    faster than seeking to every line.
+    """
+
+    VERSION = 2
+    TOKEN_PATTERN = re.compile(rb"[a-z0-9_]+")
+    WORD_PATTERN = re.compile(r"[A-Za-z0-9_]+")
+    MAX_TOKEN_LENGTH = 64
+    LONG_TOKENS = "#long"  # Cannot collide with TOKEN_PATTERN matches
+    MAX_PENDING_POSTINGS = 1 << 20
+    METACHARACTERS = frozenset(".^$*+?{}[]\\|()")
+    MAX_CANDIDATE_RATIO = 0.05
+
+    def __init__(
+        self,
+        run_path: Path,
+        index_file: Path,
+        files: List[list],
+        tokens: Dict[str, list],
+        line_counts: List[int],
+    ):
+        self.run_path = run_path
+        self.index_file = index_file
+        self.files = files  # [step, file name, size, mtime_ns]
+        self.line_counts = line_counts
+        # token -> [[file id, blob offset, blob length, line count], ...]
+        self.tokens = tokens
+        self.blob_start = 0
+
+    @staticmethod
+    def index_file_for(run: SanityRun) -> Path:
+        return cache_file("search_index", run.path, ".idx")
+
+    @classmethod
+    def load(cls, run: SanityRun) -> Optional["SearchIndex"]:
+        """Load the run's index if it exists and is up to date."""
+        index_file = cls.index_file_for(run)
+        try:
+            with open(index_file, "rb") as f:
+                header = json.loads(f.readline())
+                blob_start = f.tell()
+        except (OSError, ValueError):
+            return None
+        if header.get("version") != cls.VERSION:
+            return None
+        if header.get("files") != run.log_states():
+            return None
+        index = cls(
+            run.path,
+            index_file,
+            header["files"],
+            header["tokens"],
+            header["line_counts"],
+        )
+        index.blob_start = blob_start
+        return index
+
+    @classmethod
+    def build(cls, run: SanityRun) -> "SearchIndex":
+        """Tokenize every log of the run and write its index."""
+        files = run.log_states()
+        tokens: Dict[str, list] = {}
+        line_counts = []
+        long_tokens = cls.LONG_TOKENS.encode()
+        index_file = cls.index_file_for(run)
+        index_file.parent.mkdir(parents=True, exist_ok=True)
+        # Postings go to disk per block so memory does not grow with the logs
+        with tempfile.TemporaryFile(dir=index_file.parent) as blob:
+            for file_id, (_, file_name, _, _) in enumerate(files):
+                postings: Dict[bytes, Tuple[array, array]] = {}
+                pending = 0
+                offset = 0
+                line_number = 0
+                with open_log(run.path / file_name) as f:
+                    for line_number, raw in enumerate(f, 1):
+                        found = {
+                            token if len(token) <= cls.MAX_TOKEN_LENGTH else long_tokens
+                            for token in cls.TOKEN_PATTERN.findall(raw.lower())
+                            if not token.isdigit()
+                        }
+                        for token in found:
+                            entry = postings.get(token)
+                            if entry is None:
+                                entry = postings[token] = (array("Q"), array("Q"))
+                            entry[0].append(line_number)
+                            entry[1].append(offset)
+                        offset += len(raw)
+                        pending += len(found)
+                        if pending >= cls.MAX_PENDING_POSTINGS:
+                            cls._write_postings(file_id, postings, tokens, blob)
+                            postings = {}
+                            pending = 0
+                line_counts.append(line_number)
+                cls._write_postings(file_id, postings, tokens, blob)
+
+            header = {
+                "version": cls.VERSION,
+                "files": files,
+                "line_counts": line_counts,
+                "tokens": tokens,
+            }
+            write_atomically(
+                index_file,
+                json.dumps(header, separators=(",", ":")).encode() + b"\n",
+                blob,
+            )
+        return cls.load(run) or cls(run.path, index_file, files, tokens, line_counts)
 
-    def __init__(self, run_path: Path):
-        self.path = run_path
-        self.name = run_path.name
-        self.timestamp = self._parse_timestamp()
-        self.components = self._load_components()
-        self.step_logs = self._discover_step_logs()
-        self.master_log = run_path / "master_log.txt"
+    @classmethod
+    def _write_postings(
+        cls,
+        file_id: int,
+        postings: Dict[bytes, Tuple[array, array]],
+        tokens: Dict[str, list],
+        blob: BinaryIO,
+    ) -> None:
+        """Append one block of a file's postings to blob and record it in tokens."""
+        for token, (lines, offsets) in postings.items():
+            data = zlib.compress(
+                cls._deltas(lines).tobytes() + cls._deltas(offsets).tobytes()
+            )
+            tokens.setdefault(token.decode("ascii"), []).append(
+                [file_id, blob.tell(), len(data), len(lines)]
+            )
+            blob.write(data)
 
-    def _parse_timestamp(self) -> Optional[datetime.datetime]:
-        """Parse timestamp from directory name (YYYYMMDD_HHMMSS format)."""
-        match = re.match(r"(\d{8})_(\d{6})", self.name)
-        if match:
-            date_str, time_str = match.groups()
-            return datetime.datetime.strptime(f"{date_str}_{time_str}", "%Y%m%d_%H%M%S")
-        return None
+    @staticmethod
+    def _deltas(values: array) -> array:
+        return array(
+            "Q", itertools.chain(values[:1], map(operator.sub, values[1:], values))
+        )
 
-    def _load_components(self) -> Dict[str, str]:
-        """Load component versions from components.txt."""
-        components = {}
-        components_file = self.path / "components.txt"
-        if components_file.exists():
-            with open(components_file, "r") as f:
-                for line in f:
-                    line = line.strip()
-                    if line and not line.startswith("#"):
-                        if "=" in line:
-                            key, value = line.split("=", 1)
-                            components[key.strip()] = value.strip()
-                        elif "[" in line and "revision=" in line:
-                            # Parse git repo info: name [type=src, remote=origin, ...]
-                            parts = line.split("[", 1)
-                            if len(parts) == 2:
-                                name = parts[0].strip()
-                                attrs = parts[1].rstrip("]")
-                                # Extract revision
-                                rev_match = re.search(r"revision=([^,\]]+)", attrs)
-                                if rev_match:
-                                    components[name] = rev_match.group(1).strip()
-        return components
+    @classmethod
+    def required_literals(cls, pattern: str) -> Optional[List[str]]:
+        """Literal pieces every match of pattern contains, or None if not indexable.
 
-    def _discover_step_logs(self) -> List[str]:
-        """Discover all step log files (*_log.txt except master_log.txt)."""
-        step_logs = []
-        for log_file in self.path.glob("*_log.txt"):
-            if log_file.name != "master_log.txt":
-                step_name = log_file.stem.replace("_log", "")
-                step_logs.append(step_name)
-        return sorted(step_logs)
+        Handles plain literals and literals joined by ".*"; anything else
+        needs a regex scan.
+        """
+        if not pattern.isascii():
+            return None
+        pieces = [piece for piece in pattern.split(".*") if piece]
+        if not pieces or any(cls.METACHARACTERS & set(piece) for piece in pieces):
+            return None
+        words = {
+            word.lower()
+            for piece in pieces
+            for word in cls.WORD_PATTERN.findall(piece)
+            if not word.isdigit()
+        }
+        return sorted(words) if words else None
 
-    def get_step_log_path(self, step_name: str) -> Path:
-        """Get the path to a specific step log."""
-        return self.path / f"{step_name}_log.txt"
+    def _postings(
+        self, f, token: str, steps: Optional[set]
+    ) -> Dict[int, Tuple[array, array]]:
+        postings = {}
+        for file_id, blob_offset, blob_length, _ in self.tokens[token]:
+            if steps is not None and self.files[file_id][0] not in steps:
+                continue
+            f.seek(self.blob_start + blob_offset)
+            data = array("Q")
+            data.frombytes(zlib.decompress(f.read(blob_length)))
+            count = len(data) // 2
+            lines = array("Q", itertools.accumulate(data[:count]))
+            offsets = array("Q", itertools.accumulate(data[count:]))
+            if file_id in postings:
+                # Later block of the same file, in line order
+                postings[file_id][0].extend(lines)
+                postings[file_id][1].extend(offsets)
+            else:
+                postings[file_id] = (lines, offsets)
+        return postings
 
-    def __str__(self) -> str:
-        timestamp_str = (
-            self.timestamp.strftime("%Y-%m-%d %H:%M:%S")
-            if self.timestamp
-            else "Unknown"
+    def candidates(
+        self, literals: List[str], steps: Optional[set] = None
+    ) -> Optional[Dict[int, List[Tuple[int, int]]]]:
+        """Per file id, sorted (line number, offset) of lines that may match.
+
+        Returns None when the literals are too common for the index to help,
+        or when one is longer than any indexed token.
+        """
+        if any(len(literal) > self.MAX_TOKEN_LENGTH for literal in literals):
+            return None
+        total_lines = sum(
+            count
+            for (step, *_), count in zip(self.files, self.line_counts)
+            if steps is None or step in steps
         )
-        return f"{self.name} ({timestamp_str}) - {len(self.step_logs)} steps"
+        # Matching tokens per literal, most selective literal first
+        plans = []
+        for literal in literals:
+            matching = [
+                token
+                for token in self.tokens
+                if literal in token and token != self.LONG_TOKENS
+            ]
+            if self.LONG_TOKENS in self.tokens:
+                # Any over-long token may contain the literal
+                matching.append(self.LONG_TOKENS)
+            estimate = sum(
+                count
+                for token in matching
+                for file_id, _, _, count in self.tokens[token]
+                if steps is None or self.files[file_id][0] in steps
+            )
+            plans.append((estimate, matching))
+        plans.sort()
+        if plans[0][0] > self.MAX_CANDIDATE_RATIO * total_lines:
+            return None
 
+        result: Optional[Dict[int, set]] = None
+        with open(self.index_file, "rb") as f:
+            for _, matching in plans:
+                found: Dict[int, set] = {}
+                for token in matching:
+                    for file_id, (lines, offsets) in self._postings(
+                        f, token, steps
+                    ).items():
+                        found.setdefault(file_id, set()).update(zip(lines, offsets))
+                if result is None:
+                    result = found
+                else:
+                    result = {
+                        file_id: result[file_id] & found[file_id]
+                        for file_id in result.keys() & found.keys()
+                    }
+                if not result:
+                    break
+        return {file_id: sorted(lines) for file_id, lines in (result or {}).items()}
 
-class LogParser:
-    """Parser for andromeda log files."""
+    def search(
+        self, regex: re.Pattern, literals: List[str], steps: Optional[set] = None
+    ) -> Optional[Dict[str, List[Tuple[int, int, str]]]]:
+        """Matches per step for every indexed log (restricted to steps).
 
-    @staticmethod
-    def parse_log_line(line: str) -> Tuple[Optional[int], str]:
-        """Parse a log line and extract line number and content."""
-        line = line.rstrip("\n")
-        # Check if line starts with a number (timestamp) followed by log content
-        match = re.match(r"^(\d+)\s+(.*)$", line)
-        if match:
-            timestamp = int(match.group(1))
-            content = match.group(2)
-            return timestamp, content
-        return None, line
+        Returns None when the query should be answered by a scan instead.
+        """
+        candidates = self.candidates(literals, steps)
+        if candidates is None:
+            return None
+        results = {
+            step: [] for step, _, _, _ in self.files if steps is None or step in steps
+        }
+        for file_id, lines in sorted(candidates.items()):
+            step, file_name = self.files[file_id][:2]
+            matches = results[step]
+            log_file = self.run_path / file_name
+            with open_log(log_file, LineIndex.checkpoints_for(log_file)) as f:
+                for line_number, offset in lines:
+                    f.seek(offset)
+                    raw = f.readline().rstrip(b"\n")
+                    for line in LogParser.split_universal_newlines(
+                        raw.decode("utf-8", "replace")
+                    ):
+                        timestamp, content = LogParser.parse_log_line(line)
+                        if content and regex.search(content):
+                            matches.append((line_number, timestamp or 0, content))
+        return results
 
-    @staticmethod
-    def extract_log_level(content: str) -> Optional[str]:
-        """Extract log level from content (INFO, DEBUG, ERROR, etc.)."""
-        # Match ANSI colored log levels like: "194 \x1b[1;32mINFO\x1b[0m"
-        match = re.search(r"\x1b\[1;\d+m(\w+)\x1b\[0m", content)
-        if match:
-            return match.group(1)
-        return None
+
+class ErrorSignatures:
+    """Groups ERROR/FATAL log lines into templates.
+
+    A template is the line content with ANSI codes stripped and paths, hex
+    values, hashes and numbers masked, so repeats of one failure that only
+    differ in timestamps, addresses or file names share a signature, the
+    short hash of the template.
+    """
+
+    LEVELS = frozenset({"ERROR", "FATAL"})
+    # Lines without one of these bytes cannot carry an ERROR/FATAL level
+    MARKERS = (b"ERROR", b"FATAL", b"error", b"fatal", b"Error", b"Fatal")
+    MASKS = [
+        (re.compile(r"\x1b\[[0-9;]*m"), ""),
+        (re.compile(r"(?:[A-Za-z]:)?(?:[\w.~-]*[/\\])+[\w.-]*"), "<path>"),
+        (re.compile(r"\b0[xX][0-9a-fA-F]+\b"), "<hex>"),
+        (
+            re.compile(
+                r"\b(?=[0-9a-fA-F]*\d)(?=[0-9a-fA-F]*[a-fA-F])[0-9a-fA-F]{7,}\b"
+            ),
+            "<hash>",
+        ),
+        (re.compile(r"\d+"), "<n>"),
+        (re.compile(r"\s+"), " "),
+    ]
+
+    @classmethod
+    def normalize(cls, content: str) -> str:
+        """Return the template of a log line's content."""
+        for pattern, replacement in cls.MASKS:
+            content = pattern.sub(replacement, content)
+        return content.strip()
 
     @staticmethod
-    def extract_step_header(content: str) -> Optional[str]:
-        """Extract step name from step header lines."""
-        # Match lines like: "CortiUpdate : $PYTHON310_EXE build.py ..."
-        if ":" in content and not content.startswith(" "):
-            step_name = content.split(":", 1)[0].strip()
-            if step_name and not any(
-                char in step_name for char in ["/", "\\", "[", "]"]
-            ):
-                return step_name
-        return None
+    def signature(template: str) -> str:
+        return hashlib.sha1(template.encode()).hexdigest()[:10]
+
+    @classmethod
+    def scan(cls, log_file: Path) -> Dict[str, list]:
+        """Return {signature: [template, count]} of one log in a single pass."""
+        found: Dict[str, list] = {}
+        with Timings.file("signatures", log_file) as counters, open_log(log_file) as f:
+            for raw in f:
+                if not any(marker in raw for marker in cls.MARKERS):
+                    continue
+                for line in LogParser.split_universal_newlines(
+                    raw.rstrip(b"\n").decode("utf-8", "replace")
+                ):
+                    counters.lines += 1
+                    counters.regex += 1
+                    _, level, content = LogParser.parse(line)
+                    if not level or level.upper() not in cls.LEVELS:
+                        continue
+                    counters.regex += len(cls.MASKS)
+                    template = cls.normalize(content)
+                    signature = cls.signature(template)
+                    if signature in found:
+                        found[signature][1] += 1
+                    else:
+                        found[signature] = [template, 1]
+            counters.bytes_read = f.tell()
+        return found
+
+
+class RecordWriter:
+    """Writes command results as JSON records, one at a time.
+
+    Every record is an object with a "type" field. "ndjson" writes one
+    record per line; "json" writes a single array. Both flush after each
+    record, so consumers can process results while a command still runs.
+    """
+
+    FORMATS = ("json", "ndjson")
+
+    def __init__(self, output_format: str, stream: Optional[TextIO] = None):
+        self.format = output_format
+        self.stream = stream or sys.stdout
+        self.count = 0
+        self.errors = 0
+
+    def write(self, record_type: str, **fields) -> None:
+        data = json.dumps({"type": record_type, **fields}, default=str)
+        if record_type == "error":
+            self.errors += 1
+        if self.format == "ndjson":
+            self.stream.write(data + "\n")
+        else:
+            self.stream.write(("[\n" if self.count == 0 else ",\n") + data)
+        self.count += 1
+        self.stream.flush()
+
+    def close(self) -> None:
+        if self.format == "json":
+            self.stream.write("[]\n" if self.count == 0 else "\n]\n")
+            self.stream.flush()
+
+
+class RunCache:
+    """Thread-safe LRU of SanityRun objects shared by long-lived viewers.
+
+    Runs are keyed by path and directory mtime, so a run whose directory
+    changed is parsed again while an unchanged run keeps its memoized
+    metadata and step analyses. All runs share the owner's RunCatalog.
+    The list of run directories is only read again, and the catalog
+    pruned, when the sanity directory's own mtime changes.
+    """
+
+    def __init__(self, catalog: Optional[RunCatalog], capacity: int = 256):
+        self.capacity = capacity
+        self.catalog = catalog
+        self.hits = 0
+        self.misses = 0
+        self._runs: "OrderedDict[Tuple[str, int], SanityRun]" = OrderedDict()
+        self._listing: Optional[Tuple[Tuple[str, int], List[Path]]] = None
+        self._lock = threading.Lock()
+
+    def run_paths(self, sanity_dir: Path) -> List[Path]:
+        """Run directories in sanity_dir, listed again only after it changed."""
+        try:
+            key = (str(sanity_dir), sanity_dir.stat().st_mtime_ns)
+        except OSError:
+            return []
+        with self._lock:
+            if self._listing is not None and self._listing[0] == key:
+                return self._listing[1]
+
+        with os.scandir(sanity_dir) as entries:
+            paths = [Path(entry.path) for entry in entries if entry.is_dir()]
+        if self.catalog is not None:
+            self.catalog.prune({path.name for path in paths})
+        with self._lock:
+            self._listing = (key, paths)
+        return paths
+
+    def get(self, run_path: Path, mtime_ns: int) -> SanityRun:
+        key = (str(run_path), mtime_ns)
+        with self._lock:
+            run = self._runs.get(key)
+            if run is not None:
+                self._runs.move_to_end(key)
+                self.hits += 1
+                return run
+            self.misses += 1
+            run = SanityRun(run_path, self.catalog)
+            run.mtime_ns = mtime_ns
+            self._runs[key] = run
+            while len(self._runs) > self.capacity:
+                self._runs.popitem(last=False)
+            return run
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "runs": len(self._runs),
+                "capacity": self.capacity,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
 
 
 class SanityLogViewer:
     """Complete log viewer application with all features."""
 
-    def __init__(self, sanity_dir: Optional[Path] = None):
+    def __init__(
+        self,
+        sanity_dir: Optional[Path] = None,
+        use_cache: bool = True,
+        output_format: str = "text",
+        stream: Optional[TextIO] = None,
+        run_cache: Optional[RunCache] = None,
+    ):
         self.sanity_dir = sanity_dir or Path("sanity")
-        self.runs = self._discover_runs()
+        # A shared RunCache brings its own catalog and outlives this viewer
+        self.run_cache = run_cache
+        if run_cache is not None:
+            self.catalog = run_cache.catalog
+        else:
+            with Timings.phase("catalog"):
+                self.catalog = RunCatalog(self.sanity_dir) if use_cache else None
+        # Structured output instead of text, see RecordWriter
+        self.records = (
+            RecordWriter(output_format, stream)
+            if output_format in RecordWriter.FORMATS
+            else None
+        )
+        with Timings.phase("discover runs"):
+            self.runs = self._discover_runs()
 
     def _discover_runs(self) -> List[SanityRun]:
-        """Discover all sanity test runs."""
+        """Discover all sanity test runs (names only; metadata loads lazily)."""
         runs = []
-        if self.sanity_dir.exists():
-            for run_dir in self.sanity_dir.iterdir():
-                if run_dir.is_dir():
-                    runs.append(SanityRun(run_dir))
+        if self.run_cache is not None:
+            for run_path in self.run_cache.run_paths(self.sanity_dir):
+                try:
+                    # Cheap, and picks up logs written to a run in progress
+                    mtime_ns = run_path.stat().st_mtime_ns
+                except OSError:
+                    continue
+                runs.append(self.run_cache.get(run_path, mtime_ns))
+        elif self.sanity_dir.exists():
+            with os.scandir(self.sanity_dir) as entries:
+                for entry in entries:
+                    if entry.is_dir():
+                        runs.append(SanityRun(Path(entry.path), self.catalog))
+            if self.catalog is not None:
+                self.catalog.prune({run.name for run in runs})
         return sorted(
             runs, key=lambda r: r.timestamp or datetime.datetime.min, reverse=True
         )
 
+    @functools.cached_property
+    def step_stats(self) -> StepStatsStore:
+        """Per run x step statistics, persisted between invocations."""
+        return StepStatsStore(self.sanity_dir, persistent=self.catalog is not None)
+
+    def close(self) -> None:
+        """Persist cached metadata gathered while running commands.
+
+        A viewer sharing a RunCache leaves the catalog to its owner, see serve().
+        """
+        if self.records is not None:
+            self.records.close()
+        with Timings.phase("catalog"):
+            if self.catalog is not None and self.run_cache is None:
+                self.catalog.save()
+            if "step_stats" in vars(self):
+                self.step_stats.save()
+
+    def _error(self, message: str) -> None:
+        """Report a problem as text or as an "error" record."""
+        if self.records is not None:
+            self.records.write("error", message=message)
+        else:
+            print(message)
+
+    @staticmethod
+    def _run_record(run: SanityRun) -> dict:
+        return {
+            "run": run.name,
+            "timestamp": run.timestamp.isoformat() if run.timestamp else None,
+        }
+
     def list_runs(self) -> None:
         """List all available sanity runs."""
+        if self.records is not None:
+            for run in self.runs:
+                self.records.write(
+                    "run", **self._run_record(run), steps=len(run.step_logs)
+                )
+            return
+
         if not self.runs:
             print("No sanity runs found.")
             return
@@ -150,7 +2389,16 @@ class SanityLogViewer:
         """Show detailed information about a specific run."""
         run = self._find_run(run_name)
         if not run:
-            print(f'Run "{run_name}" not found.')
+            self._error(f'Run "{run_name}" not found.')
+            return
+
+        if self.records is not None:
+            self.records.write(
+                "run",
+                **self._run_record(run),
+                components=run.components,
+                steps=run.step_logs,
+            )
             return
 
         print(f"Sanity Run: {run.name}")
@@ -178,13 +2426,13 @@ class SanityLogViewer:
         """View a specific log file."""
         run = self._find_run(run_name)
         if not run:
-            print(f'Run "{run_name}" not found.')
+            self._error(f'Run "{run_name}" not found.')
             return
 
         if step_name:
             if step_name not in run.step_logs:
-                print(f'Step "{step_name}" not found in run "{run_name}".')
-                print(f"Available steps: {', '.join(run.step_logs)}")
+                self._error(f'Step "{step_name}" not found in run "{run_name}".')
+                self._error(f"Available steps: {', '.join(run.step_logs)}")
                 return
             log_file = run.get_step_log_path(step_name)
             title = f"Viewing {step_name} log from {run.name}"
@@ -193,13 +2441,15 @@ class SanityLogViewer:
             title = f"Viewing master log from {run.name}"
 
         if not log_file.exists():
-            print(f"Log file not found: {log_file}")
+            self._error(f"Log file not found: {log_file}")
             return
 
         # Parse line range if provided
         start_line, end_line, max_lines = self._parse_line_range(lines)
 
-        if use_pager and lines is None:
+        if self.records is not None:
+            self._display_log_content(log_file, start_line, end_line, max_lines)
+        elif use_pager and lines is None:
             # Use pager for full log viewing
             self._display_log_with_pager(log_file, title)
         else:
@@ -230,53 +2480,72 @@ class SanityLogViewer:
                 max_lines = int(lines)
                 return None, None, max_lines
             except ValueError:
-                print(f"Invalid line specification: {lines}")
+                self._error(f"Invalid line specification: {lines}")
                 return None, None, 50  # Default fallback
 
     def _display_log_with_pager(self, log_file: Path, title: str) -> None:
-        """Display log file using a pager (less/more)."""
+        """Display log file using a pager (less/more).
+
+        Formatted lines are streamed into the pager through a buffered pipe,
+        so the first screen shows up right away and memory use stays flat.
+        """
         try:
             # Try to use 'less' first, fall back to 'more'
             pager_cmd = "less"
             if subprocess.run(["which", "less"], capture_output=True).returncode != 0:
                 pager_cmd = "more"
 
-            # Prepare the content with formatting
-            formatted_content = self._format_log_for_pager(log_file, title)
-
-            # Use pager to display content
             process = subprocess.Popen(
-                [pager_cmd, "-R"], stdin=subprocess.PIPE, text=True
+                [pager_cmd, "-R"],
+                stdin=subprocess.PIPE,
+                text=True,
+                encoding="utf-8",
+                errors="replace",
             )
-            process.communicate(input=formatted_content)
-
         except Exception as e:
             print(f"Error using pager: {e}")
             print("Falling back to direct display...")
             print(title)
             print("=" * 80)
             self._display_log_content(log_file, None, None, None)
+            return
+
+        try:
+            for line in self._format_log_for_pager(log_file, title):
+                process.stdin.write(line)
+                process.stdin.write("\n")
+            process.stdin.close()
+        except BrokenPipeError:
+            # The pager was quit before the end of the log
+            try:
+                process.stdin.close()
+            except BrokenPipeError:
+                pass
+        finally:
+            process.wait()
 
-    def _format_log_for_pager(self, log_file: Path, title: str) -> str:
-        """Format log content for pager display."""
-        lines = [title, "=" * 80, ""]
+    def _format_log_for_pager(self, log_file: Path, title: str) -> Iterator[str]:
+        """Yield formatted log lines for pager display."""
+        yield title
+        yield "=" * 80
+        yield ""
 
         try:
-            with open(log_file, "r", encoding="utf-8", errors="replace") as f:
+            with open_log_text(log_file) as f:
                 for line in f:
-                    timestamp, content = LogParser.parse_log_line(line)
-                    if timestamp:
-                        log_level = LogParser.extract_log_level(content)
-                        if log_level:
-                            lines.append(f"{timestamp:5d} [{log_level:5s}] {content}")
-                        else:
-                            lines.append(f"{timestamp:5d} {content}")
-                    else:
-                        lines.append(content)
+                    yield self._format_log_line(line)
         except Exception as e:
-            lines.append(f"Error reading log file: {e}")
+            yield f"Error reading log file: {e}"
 
-        return "\n".join(lines)
+    @staticmethod
+    def _format_log_line(line: str) -> str:
+        """Format a raw log line with its timestamp and log level."""
+        timestamp, log_level, content = LogParser.parse(line)
+        if timestamp:
+            if log_level:
+                return f"{timestamp:5d} [{log_level:5s}] {content}"
+            return f"{timestamp:5d} {content}"
+        return content
 
     def _display_log_content(
         self,
@@ -287,12 +2556,16 @@ class SanityLogViewer:
     ) -> None:
         """Display log file content with formatting and optional line range."""
         try:
-            with open(log_file, "r", encoding="utf-8", errors="replace") as f:
-                current_line = 0
+            with Timings.file("view", log_file) as counters, self._open_log_at_line(
+                log_file, start_line
+            ) as (f, first_line):
+                current_line = first_line - 1
                 displayed_lines = 0
+                start_offset = f.buffer.tell()
 
                 for line in f:
                     current_line += 1
+                    counters.lines += 1
 
                     # Check if we should skip this line based on start_line
                     if start_line is not None and current_line < start_line:
@@ -304,132 +2577,496 @@ class SanityLogViewer:
 
                     # Check if we've hit the max_lines limit
                     if max_lines is not None and displayed_lines >= max_lines:
-                        print(
-                            f"\n... (showing first {max_lines} lines, use --lines to see more)"
-                        )
+                        if self.records is None:
+                            print(
+                                f"\n... (showing first {max_lines} lines, use --lines to see more)"
+                            )
                         break
 
-                    timestamp, content = LogParser.parse_log_line(line)
-                    if timestamp:
-                        # Format with timestamp
-                        log_level = LogParser.extract_log_level(content)
-                        if log_level:
-                            print(f"{timestamp:5d} [{log_level:5s}] {content}")
-                        else:
-                            print(f"{timestamp:5d} {content}")
+                    if self.records is not None:
+                        timestamp, level, content = LogParser.parse(line)
+                        self.records.write(
+                            "line",
+                            line=current_line,
+                            timestamp=timestamp,
+                            level=level,
+                            content=content,
+                        )
                     else:
-                        print(content)
-
+                        print(self._format_log_line(line))
+                    if LogParser.LEVEL_MARKER in line:
+                        counters.regex += 1
                     displayed_lines += 1
+                counters.bytes_read = f.buffer.tell() - start_offset
 
                 # Show summary if we used line range
-                if start_line is not None or end_line is not None:
+                if self.records is None and (
+                    start_line is not None or end_line is not None
+                ):
                     range_str = f"{start_line or 1}:{end_line or 'end'}"
                     print(f"\n... (showing lines {range_str})")
 
         except Exception as e:
-            print(f"Error reading log file: {e}")
+            self._error(f"Error reading log file: {e}")
+
+    @contextlib.contextmanager
+    def _open_log_at_line(
+        self, log_file: Path, line_number: Optional[int]
+    ) -> Iterator[Tuple[io.TextIOWrapper, int]]:
+        """Open log_file positioned at or shortly before line_number.
+
+        Yields the text stream and the line number of its first line. Large
+        logs are positioned through the persistent LineIndex instead of
+        reading every preceding line; for compressed logs the index also
+        provides the checkpoints to resume decompression from.
+        """
+        offset, first_line, checkpoints = 0, 1, None
+        min_size = (
+            LineIndex.MIN_COMPRESSED_LOG_SIZE
+            if is_compressed(log_file)
+            else LineIndex.MIN_LOG_SIZE
+        )
+        if (
+            line_number is not None
+            and line_number > LineIndex.DEFAULT_STRIDE
+            and log_file.stat().st_size >= min_size
+        ):
+            try:
+                index = LineIndex.open_for(log_file)
+                offset, first_line = index.locate(line_number)
+                checkpoints = index.checkpoints()
+            except OSError:
+                offset, first_line = 0, 1
+        raw = open_log(log_file, checkpoints)
+        try:
+            raw.seek(offset)
+            with io.TextIOWrapper(raw, encoding="utf-8", errors="replace") as f:
+                yield f, first_line
+        finally:
+            raw.close()
 
     def search_logs(
         self,
-        run_name: str,
+        run_name: Optional[str],
         pattern: str,
         step_name: Optional[str] = None,
         case_sensitive: bool = False,
+        jobs: int = 1,
+        use_index: bool = True,
     ) -> None:
-        """Search for a pattern in log files."""
-        run = self._find_run(run_name)
-        if not run:
-            print(f'Run "{run_name}" not found.')
-            return
+        """Search for a pattern in log files.
 
-        if step_name:
-            if step_name not in run.step_logs:
-                print(f'Step "{step_name}" not found.')
-                return
-            log_files = [(step_name, run.get_step_log_path(step_name))]
+        With run_name None every discovered run is searched. jobs > 1 spreads
+        files, and large files split by byte range, over a process pool.
+        Literal patterns are answered from the search index of indexed runs.
+        """
+        if run_name is None:
+            runs = self.runs
         else:
-            log_files = [(step, run.get_step_log_path(step)) for step in run.step_logs]
-            log_files.append(("master", run.master_log))
+            run = self._find_run(run_name)
+            if not run:
+                self._error(f'Run "{run_name}" not found.')
+                return
+            runs = [run]
+
+        targets = []
+        for run in runs:
+            if step_name:
+                if step_name not in run.step_logs:
+                    if run_name is not None:
+                        self._error(f'Step "{step_name}" not found.')
+                        return
+                    continue
+                targets.append((run, step_name, run.get_step_log_path(step_name)))
+            else:
+                for step in run.step_logs:
+                    targets.append((run, step, run.get_step_log_path(step)))
+                targets.append((run, "master", run.master_log))
 
         flags = 0 if case_sensitive else re.IGNORECASE
         regex = re.compile(pattern, flags)
 
         total_matches = 0
-        for step, log_file in log_files:
-            if not log_file.exists():
+        matched_runs = set()
+        for run, step, matches in self._search_files(targets, regex, jobs, use_index):
+            if self.records is not None:
+                count = 0
+                for line_number, timestamp, content in matches:
+                    self.records.write(
+                        "match",
+                        run=run.name,
+                        step=step,
+                        line=line_number,
+                        timestamp=timestamp,
+                        content=content,
+                    )
+                    count += 1
+                total_matches += count
+                if count:
+                    matched_runs.add(run.name)
                 continue
-
-            matches = list(self._search_in_file(log_file, regex))
+            # The header carries the match count, so text output collects a file
+            matches = list(matches)
             if matches:
-                print(f"\n=== {step} log ({len(matches)} matches) ===")
-                for timestamp, content in matches:
+                label = step if run_name is not None else f"{run.name} / {step}"
+                print(f"\n=== {label} log ({len(matches)} matches) ===")
+                for _, timestamp, content in matches:
                     highlighted = regex.sub(lambda m: f"**{m.group()}**", content)
                     print(f"{timestamp:5d}: {highlighted}")
                 total_matches += len(matches)
+                matched_runs.add(run.name)
+
+        if self.records is not None:
+            self.records.write("total", matches=total_matches, runs=len(matched_runs))
+        elif run_name is None:
+            print(f"\nTotal matches: {total_matches} in {len(matched_runs)} run(s)")
+        else:
+            print(f"\nTotal matches: {total_matches}")
+
+    def _search_files(
+        self,
+        targets: List[Tuple[SanityRun, str, Path]],
+        regex: re.Pattern,
+        jobs: int = 1,
+        use_index: bool = True,
+    ) -> Iterator[Tuple[SanityRun, str, Iterable[Tuple[int, int, str]]]]:
+        """Search each (run, step, log file) target, yielding results in order.
+
+        Runs with an up-to-date SearchIndex answer literal queries from the
+        index; everything else is scanned. Each target's matches must be
+        consumed before the next target is requested.
+        """
+        targets = [target for target in targets if target[2].exists()]
+
+        indexed: Dict[Tuple[str, str], List[Tuple[int, int, str]]] = {}
+        literals = None
+        if use_index and self.catalog is not None:
+            literals = SearchIndex.required_literals(regex.pattern)
+        if literals:
+            steps_by_run: Dict[str, Tuple[SanityRun, set]] = {}
+            for run, step, _ in targets:
+                steps_by_run.setdefault(run.name, (run, set()))[1].add(step)
+            with Timings.phase("search index"):
+                for run, steps in steps_by_run.values():
+                    index = SearchIndex.load(run)
+                    if index is None:
+                        continue
+                    results = index.search(regex, literals, steps)
+                    for step, matches in (results or {}).items():
+                        indexed[(run.name, step)] = matches
+
+        remaining = [t for t in targets if (t[0].name, t[1]) not in indexed]
+        scanned = self._scan_files(remaining, LogSearcher(regex), jobs)
+        for run, step, log_file in targets:
+            if (run.name, step) in indexed:
+                yield run, step, indexed[(run.name, step)]
+            else:
+                yield next(scanned)
 
-        print(f"\nTotal matches: {total_matches}")
+    def _scan_files(
+        self,
+        targets: List[Tuple[SanityRun, str, Path]],
+        searcher: LogSearcher,
+        jobs: int,
+    ) -> Iterator[Tuple[SanityRun, str, Iterable[Tuple[int, int, str]]]]:
+        """Scan every target's log file, yielding results in order.
+
+        Without a process pool the matches are streamed from the scan; the
+        pool returns them per file.
+        """
+        if jobs <= 1 or not targets:
+            for run, step, log_file in targets:
+                yield run, step, self._reporting_errors(
+                    searcher.scan(log_file), f"Error searching {log_file}"
+                )
+            return
+
+        with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as pool:
+            pending = []
+            for run, step, log_file in targets:
+                futures = [
+                    pool.submit(searcher.scan_chunk, log_file, start, end)
+                    for start, end in searcher.plan_chunks(log_file, jobs)
+                ]
+                pending.append((run, step, log_file, futures))
+
+            for run, step, log_file, futures in pending:
+                matches = []
+                lines_before = 0
+                try:
+                    for future in futures:
+                        chunk_matches, chunk_lines = future.result()
+                        matches.extend(
+                            (lines_before + line_number, timestamp, content)
+                            for line_number, timestamp, content in chunk_matches
+                        )
+                        lines_before += chunk_lines
+                except Exception as e:
+                    self._error(f"Error searching {log_file}: {e}")
+                    matches = []
+                yield run, step, matches
 
-    def _search_in_file(
-        self, log_file: Path, regex: re.Pattern
-    ) -> Iterator[Tuple[int, str]]:
-        """Search for pattern in a single log file."""
+    def _reporting_errors(self, items: Iterator, message: str) -> Iterator:
+        """Yield from items, reporting an error that ends them early."""
         try:
-            with open(log_file, "r", encoding="utf-8", errors="replace") as f:
-                for line in f:
-                    timestamp, content = LogParser.parse_log_line(line)
-                    if content and regex.search(content):
-                        yield timestamp or 0, content
+            yield from items
         except Exception as e:
-            print(f"Error searching {log_file}: {e}")
+            self._error(f"{message}: {e}")
+
+    def compress_run(
+        self, run_name: str, compression: str = ".gz", remove: bool = False
+    ) -> None:
+        """Compress the logs of a run into seekable .gz/.zst archives.
+
+        Logs that already have a compressed copy are skipped. The original
+        logs are only deleted with remove.
+        """
+        run = self._find_run(run_name)
+        if not run:
+            self._error(f'Run "{run_name}" not found.')
+            return
+
+        logs = [run.get_step_log_path(step) for step in run.step_logs]
+        logs.append(run.master_log)
+        for log_file in logs:
+            if is_compressed(log_file) or not log_file.exists():
+                continue
+            target = log_file.with_name(log_file.name + compression)
+            if target.exists():
+                self._error(f"{target.name} already exists, skipping {log_file.name}")
+                continue
+            try:
+                target = compress_log(log_file, compression)
+            except OSError as e:
+                self._error(f"Error compressing {log_file}: {e}")
+                return
+            size, compressed_size = log_file.stat().st_size, target.stat().st_size
+            if self.records is not None:
+                self.records.write(
+                    "compressed",
+                    run=run.name,
+                    log=log_file.name,
+                    archive=target.name,
+                    size=size,
+                    compressed_size=compressed_size,
+                )
+            else:
+                print(
+                    f"{log_file.name} -> {target.name} "
+                    f"({size / 1e6:.1f} MB -> {compressed_size / 1e6:.1f} MB)"
+                )
+            if remove:
+                log_file.unlink()
+                with contextlib.suppress(OSError):
+                    LineIndex.path_for(log_file).unlink()
+
+    def build_search_index(self, run_names: Optional[List[str]] = None) -> None:
+        """Build or refresh the search index of the given runs (default: all)."""
+        if run_names:
+            runs = []
+            for run_name in run_names:
+                run = self._find_run(run_name)
+                if not run:
+                    self._error(f'Run "{run_name}" not found.')
+                    return
+                runs.append(run)
+        else:
+            runs = self.runs
+
+        built = 0
+        for run in runs:
+            if SearchIndex.load(run) is not None:
+                continue
+            start = time.perf_counter()
+            index = SearchIndex.build(run)
+            built += 1
+            seconds = time.perf_counter() - start
+            if self.records is not None:
+                self.records.write(
+                    "indexed",
+                    run=run.name,
+                    logs=len(index.files),
+                    tokens=len(index.tokens),
+                    seconds=round(seconds, 3),
+                )
+            else:
+                print(
+                    f"Indexed {run.name}: {len(index.files)} log(s), "
+                    f"{len(index.tokens)} tokens in {seconds:.2f}s"
+                )
+        if self.records is not None:
+            self.records.write("total", indexed=built, up_to_date=len(runs) - built)
+        else:
+            print(f"{built} run(s) indexed, {len(runs) - built} already up to date.")
 
     def filter_by_log_level(
-        self, run_name: str, log_level: str, step_name: Optional[str] = None
+        self,
+        run_name: str,
+        log_level: Optional[str],
+        step_name: Optional[str] = None,
+        since: Optional[int] = None,
+        until: Optional[int] = None,
+        all_steps: bool = False,
+        jobs: int = 1,
     ) -> None:
-        """Filter logs by log level (INFO, DEBUG, ERROR, etc.)."""
+        """Filter logs by log level (INFO, DEBUG, ERROR, etc.) and timestamp window.
+
+        log_level may list several levels separated by commas. With
+        all_steps every step log and the master log are filtered; each file
+        is read once, and jobs > 1 spreads the files over a process pool.
+        """
         run = self._find_run(run_name)
         if not run:
-            print(f'Run "{run_name}" not found.')
+            self._error(f'Run "{run_name}" not found.')
             return
 
-        if step_name:
+        if all_steps:
+            targets = [(step, run.get_step_log_path(step)) for step in run.step_logs]
+            targets.append(("master", run.master_log))
+        elif step_name:
             if step_name not in run.step_logs:
-                print(f'Step "{step_name}" not found.')
+                self._error(f'Step "{step_name}" not found.')
                 return
-            log_file = run.get_step_log_path(step_name)
-            print(f"Filtering {step_name} log for {log_level} messages")
+            targets = [(step_name, run.get_step_log_path(step_name))]
         else:
-            log_file = run.master_log
-            print(f"Filtering master log for {log_level} messages")
+            targets = [("master", run.master_log)]
 
-        if not log_file.exists():
-            print(f"Log file not found: {log_file}")
+        levels = [level for level in (log_level or "").split(",") if level.strip()]
+        log_filter = LogFilter(levels, since, until)
+        description = ", ".join(level.strip() for level in levels) or "all"
+        window = ""
+        if since is not None or until is not None:
+            window = f" with timestamps {'' if since is None else since}:{'' if until is None else until}"
+
+        if len(targets) == 1 and not targets[0][1].exists():
+            self._error(f"Log file not found: {targets[0][1]}")
+            return
+        if self.records is not None:
+            count = 0
+            for step, selected in self._filter_files(targets, log_filter, jobs):
+                for timestamp, level, content in selected:
+                    self.records.write(
+                        "message",
+                        run=run.name,
+                        step=step,
+                        timestamp=timestamp,
+                        level=level,
+                        content=content,
+                    )
+                    count += 1
+            self.records.write("total", messages=count, logs=len(targets))
             return
 
+        if len(targets) == 1:
+            print(f"Filtering {targets[0][0]} log for {description} messages{window}")
+        else:
+            print(
+                f"Filtering {len(targets)} logs of {run.name} for "
+                f"{description} messages{window}"
+            )
         print("=" * 80)
+
         count = 0
+        for step, selected in self._filter_files(targets, log_filter, jobs):
+            if len(targets) > 1:
+                # The header carries the message count, so collect the file
+                selected = list(selected)
+                if selected:
+                    print(f"\n=== {step} log ({len(selected)} messages) ===")
+            for timestamp, level, content in selected:
+                stamp = f"{timestamp:5d}" if timestamp is not None else " " * 5
+                print(f"{stamp} [{level or '':5s}] {content}")
+                count += 1
+
+        if len(targets) > 1:
+            print(f"\nFound {count} {description} messages in {len(targets)} logs.")
+        else:
+            print(f"\nFound {count} {description} messages.")
+
+    def _filter_files(
+        self, targets: List[Tuple[str, Path]], log_filter: LogFilter, jobs: int
+    ) -> Iterator[Tuple[str, Iterable[Tuple[Optional[int], Optional[str], str]]]]:
+        """Run log_filter over each (step, log file) target, yielding in order.
+
+        Without a process pool the selected lines are streamed from the scan
+        and must be consumed before the next target is requested; the pool
+        returns them per file.
+        """
+        targets = [(step, log_file) for step, log_file in targets if log_file.exists()]
+        if jobs <= 1 or len(targets) <= 1:
+            for step, log_file in targets:
+                yield step, self._reporting_errors(
+                    log_filter.scan(log_file), "Error reading log file"
+                )
+            return
+
+        with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = [
+                (step, pool.submit(log_filter.scan_all, log_file))
+                for step, log_file in targets
+            ]
+            for step, future in futures:
+                try:
+                    yield step, future.result()
+                except Exception as e:
+                    self._error(f"Error reading log file: {e}")
+
+    def follow_logs(
+        self,
+        run_name: str,
+        step_name: Optional[str] = None,
+        levels: Optional[List[str]] = None,
+        pattern: Optional[str] = None,
+        case_sensitive: bool = False,
+        from_start: bool = False,
+    ) -> None:
+        """Print new log lines of a run as they are written, until Ctrl-C."""
+        run = self._find_run(run_name)
+        if not run:
+            self._error(f'Run "{run_name}" not found.')
+            return
+
+        regex = None
+        if pattern:
+            regex = re.compile(pattern, 0 if case_sensitive else re.IGNORECASE)
+        follower = LogFollower(run, step_name, levels, regex, from_start)
+        watcher = DirectoryWatcher(run.path)
+
+        target = f"{step_name} log" if step_name else "all logs"
+        mode = "inotify" if watcher.uses_inotify else "polling"
+        if self.records is None:
+            print(f"Following {target} of {run.name} ({mode}, Ctrl-C to stop)")
+            print("=" * 80)
         try:
-            with open(log_file, "r", encoding="utf-8", errors="replace") as f:
-                for line in f:
-                    timestamp, content = LogParser.parse_log_line(line)
-                    if content:
-                        detected_level = LogParser.extract_log_level(content)
-                        if (
-                            detected_level
-                            and detected_level.upper() == log_level.upper()
-                        ):
-                            print(f"{timestamp:5d} [{detected_level:5s}] {content}")
-                            count += 1
-
-            print(f"\nFound {count} {log_level} messages.")
-        except Exception as e:
-            print(f"Error reading log file: {e}")
+            for step, line in follower.follow(watcher):
+                if self.records is not None:
+                    timestamp, level, content = LogParser.parse(line)
+                    self.records.write(
+                        "line",
+                        run=run.name,
+                        step=step,
+                        timestamp=timestamp,
+                        level=level,
+                        content=content,
+                    )
+                    continue
+                prefix = "" if step_name else f"[{step}] "
+                print(f"{prefix}{self._format_log_line(line)}", flush=True)
+        except KeyboardInterrupt:
+            if self.records is None:
+                print()
+        finally:
+            watcher.close()
 
     def show_step_summary(self, run_name: str) -> None:
         """Show a summary of all steps with their status."""
         run = self._find_run(run_name)
         if not run:
-            print(f'Run "{run_name}" not found.')
+            self._error(f'Run "{run_name}" not found.')
+            return
+
+        if self.records is not None:
+            self._write_step_summary_records(run)
             return
 
         print(f"Step Summary for {run.name}")
@@ -439,32 +3076,20 @@ class SanityLogViewer:
         steps_with_duration = 0
 
         for step in run.step_logs:
-            log_file = run.get_step_log_path(step)
-            if not log_file.exists():
+            analysis = run.step_analysis(step)
+            if analysis is None:
                 print(f"{step:30s} - Log file missing")
                 continue
 
-            duration = self._extract_step_duration(log_file)
-            test_result = self._extract_test_result(log_file)
+            duration = analysis.duration
+            test_result = analysis.test_result
 
             # Add to total duration if available
-            if duration:
-                try:
-                    # Parse duration like "364.01s" to float
-                    duration_value = float(duration.rstrip("s"))
-                    total_duration_seconds += duration_value
-                    steps_with_duration += 1
-                except ValueError:
-                    pass
+            if analysis.duration_seconds is not None:
+                total_duration_seconds += analysis.duration_seconds
+                steps_with_duration += 1
 
-            # Determine status based on test results if available, otherwise use log analysis
-            if test_result:
-                if test_result["failures"] > 0 or test_result["errors"] > 0:
-                    status = "FAILED"
-                else:
-                    status = "PASSED"
-            else:
-                status = self._analyze_step_status(log_file)
+            status = analysis.status
 
             # Format duration
             duration_str = f"({duration})" if duration else ""
@@ -491,103 +3116,62 @@ class SanityLogViewer:
                 )
             else:
                 print(f"Total Duration: {total_duration_seconds:.2f}s")
-            print(f"Steps with timing: {steps_with_duration}/{len(run.step_logs)}")
-        else:
-            print("Total Duration: No timing information available")
-
-    def _analyze_step_status(self, log_file: Path) -> str:
-        """Analyze step status from log content."""
-        try:
-            with open(log_file, "r", encoding="utf-8", errors="replace") as f:
-                lines = f.readlines()
-
-                # Check the last few lines for completion indicators
-                last_lines = "".join(lines[-10:]).lower()
-
-                # If we have a Total duration line, the step likely completed
-                if "total duration:" in last_lines:
-                    # Look for explicit failure indicators near the end
-                    if any(
-                        phrase in last_lines
-                        for phrase in [
-                            "build failed",
-                            "compilation failed",
-                            "step failed",
-                        ]
-                    ):
-                        return "FAILED"
-                    else:
-                        return "COMPLETED"
-
-                # Look for explicit completion/success indicators
-                if any(
-                    phrase in last_lines
-                    for phrase in ["done", "success", "completed successfully"]
-                ):
-                    return "COMPLETED"
-
-                # Look for explicit failure indicators at the end
-                if any(
-                    phrase in last_lines
-                    for phrase in ["build failed", "compilation failed", "step failed"]
-                ):
-                    return "FAILED"
-
-                # Default to unknown if we can't determine
-                return "UNKNOWN"
-        except Exception:
-            return "ERROR"
+            print(f"Steps with timing: {steps_with_duration}/{len(run.step_logs)}")
+        else:
+            print("Total Duration: No timing information available")
 
-    def _extract_step_duration(self, log_file: Path) -> Optional[str]:
-        """Extract total duration from 'Total duration:' line at end of log file."""
-        try:
-            with open(log_file, "r", encoding="utf-8", errors="replace") as f:
-                lines = f.readlines()
-                # Look for "Total duration:" line from the end
-                for line in reversed(lines):
-                    if line.strip().startswith("Total duration:"):
-                        # Extract duration like "Total duration: 364.01s"
-                        match = re.search(r"Total duration:\s*([0-9]+\.?[0-9]*s)", line)
-                        if match:
-                            return match.group(1)
-        except Exception:
-            pass
-        return None
+    def _write_step_summary_records(self, run: SanityRun) -> None:
+        """Records variant of show_step_summary: one "step" record per step."""
+        total_duration_seconds = 0.0
+        steps_with_duration = 0
+        for step in run.step_logs:
+            analysis = run.step_analysis(step)
+            if analysis is None:
+                self.records.write("step", run=run.name, step=step, status="MISSING")
+                continue
+            if analysis.duration_seconds is not None:
+                total_duration_seconds += analysis.duration_seconds
+                steps_with_duration += 1
+            self.records.write(
+                "step",
+                run=run.name,
+                step=step,
+                status=analysis.status,
+                duration_seconds=analysis.duration_seconds,
+                test_result=analysis.test_result,
+            )
+        self.records.write(
+            "total",
+            run=run.name,
+            duration_seconds=total_duration_seconds if steps_with_duration else None,
+            steps_with_duration=steps_with_duration,
+            steps=len(run.step_logs),
+        )
 
-    def _extract_test_result(self, log_file: Path) -> Optional[dict]:
-        """Extract overall test result and counts from log file."""
-        try:
-            with open(log_file, "r", encoding="utf-8", errors="replace") as f:
-                content = f.read()
-                # Look for "Overall result:" line with ANSI escape sequences
-                match = re.search(
-                    r"Overall result:\s*(\w+)\s+total=(\d+)\s+failures=(\d+)\s+errors=(\d+)\s+skipped=(\d+),?\s*not_applicable=(\d+),?\s*soundCardFailures=(\d+)",
-                    content,
-                )
-                if match:
-                    return {
-                        "status": match.group(1),
-                        "total": int(match.group(2)),
-                        "failures": int(match.group(3)),
-                        "errors": int(match.group(4)),
-                        "skipped": int(match.group(5)),
-                        "not_applicable": int(match.group(6)),
-                        "soundcard_failures": int(match.group(7)),
-                    }
-        except Exception:
-            pass
-        return None
+    def compare_runs(
+        self, run1_name: str, run2_name: str, threshold: float = 10.0
+    ) -> None:
+        """Compare two sanity runs.
 
-    def compare_runs(self, run1_name: str, run2_name: str) -> None:
-        """Compare two sanity runs."""
+        Step durations and test counts of run2 are reported relative to
+        run1; steps slower by more than threshold percent are flagged.
+        """
         run1 = self._find_run(run1_name)
         run2 = self._find_run(run2_name)
 
         if not run1:
-            print(f'Run "{run1_name}" not found.')
+            self._error(f'Run "{run1_name}" not found.')
             return
         if not run2:
-            print(f'Run "{run2_name}" not found.')
+            self._error(f'Run "{run2_name}" not found.')
+            return
+
+        if self.records is not None:
+            self._write_comparison_records(run1, run2)
+            stats = self._step_stats_by_run([run1, run2])
+            self._write_step_delta_records(
+                run1.name, run2.name, stats[run1.name], stats[run2.name], threshold
+            )
             return
 
         print(f"Comparing {run1.name} vs {run2.name}")
@@ -624,6 +3208,518 @@ class SanityLogViewer:
         if not only_in_1 and not only_in_2:
             print("  No step differences found.")
 
+        stats = self._step_stats_by_run([run1, run2])
+        self._print_step_deltas(
+            run1.name, run2.name, stats[run1.name], stats[run2.name], threshold
+        )
+
+    def compare_with_baseline(
+        self, run_name: str, baseline_runs: int = 5, threshold: float = 10.0
+    ) -> None:
+        """Compare a run against the per-step median of the runs before it."""
+        run = self._find_run(run_name)
+        if not run:
+            self._error(f'Run "{run_name}" not found.')
+            return
+
+        # self.runs is sorted newest first, so earlier runs follow this one
+        position = self.runs.index(run)
+        previous = self.runs[position + 1 : position + 1 + baseline_runs]
+        if not previous:
+            self._error(f"No runs before {run.name} to compare against.")
+            return
+
+        if self.records is None:
+            print(f"Comparing {run.name} vs median of {len(previous)} previous run(s)")
+            print("=" * 80)
+            print(f"Baseline runs: {', '.join(r.name for r in previous)}")
+
+        stats = self._step_stats_by_run([run] + previous)
+        baseline = {}
+        for step in set().union(*(stats[r.name] for r in previous)):
+            rows = [stats[r.name][step] for r in previous if step in stats[r.name]]
+            baseline[step] = {}
+            for field in ("duration", "total", "failures", "errors", "skipped"):
+                values = [row[field] for row in rows if row[field] is not None]
+                baseline[step][field] = statistics.median(values) if values else None
+
+        if self.records is not None:
+            self.records.write(
+                "baseline", run=run.name, baseline_runs=[r.name for r in previous]
+            )
+            self._write_step_delta_records(
+                "baseline", run.name, baseline, stats[run.name], threshold
+            )
+        else:
+            self._print_step_deltas(
+                "baseline", run.name, baseline, stats[run.name], threshold
+            )
+
+    def _step_stats_by_run(self, runs: List[SanityRun]) -> Dict[str, Dict[str, dict]]:
+        """Stored step rows of runs, as {run name: {step: row}}."""
+        self.step_stats.refresh(runs)
+        by_run: Dict[str, Dict[str, dict]] = {run.name: {} for run in runs}
+        for row in self.step_stats.rows([run.name for run in runs]):
+            by_run[row["run"]][row["step"]] = row
+        return by_run
+
+    def _write_comparison_records(self, run1: SanityRun, run2: SanityRun) -> None:
+        """Component and step list differences of two runs as records."""
+        for comp in sorted(set(run1.components) | set(run2.components)):
+            ver1 = run1.components.get(comp)
+            ver2 = run2.components.get(comp)
+            if ver1 != ver2:
+                self.records.write(
+                    "component",
+                    component=comp,
+                    versions={run1.name: ver1, run2.name: ver2},
+                )
+        steps1, steps2 = set(run1.step_logs), set(run2.step_logs)
+        for step in sorted(steps1 ^ steps2):
+            self.records.write(
+                "step_presence",
+                step=step,
+                only_in=run1.name if step in steps1 else run2.name,
+            )
+
+    def _write_step_delta_records(
+        self,
+        base_label: str,
+        new_label: str,
+        base: Dict[str, dict],
+        new: Dict[str, dict],
+        threshold: float,
+    ) -> None:
+        """Records variant of _print_step_deltas: one "step_delta" per common step."""
+        for step in sorted(set(base) & set(new)):
+            before, after = base[step]["duration"], new[step]["duration"]
+            change = None
+            if before is not None and after is not None and before > 0:
+                change = (after - before) / before * 100
+            self.records.write(
+                "step_delta",
+                step=step,
+                base=base_label,
+                new=new_label,
+                duration={base_label: before, new_label: after},
+                change_percent=change,
+                slower=change is not None and change > threshold,
+                tests={
+                    field: {base_label: base[step][field], new_label: new[step][field]}
+                    for field in ("total", "failures", "errors", "skipped")
+                },
+            )
+
+    @staticmethod
+    def _print_step_deltas(
+        base_label: str,
+        new_label: str,
+        base: Dict[str, dict],
+        new: Dict[str, dict],
+        threshold: float,
+    ) -> int:
+        """Print duration and test count deltas of steps present on both sides.
+
+        Returns the number of steps slower than the base by more than threshold.
+        """
+        common = sorted(set(base) & set(new))
+
+        print(f"\nStep duration differences (threshold {threshold:g}%):")
+        print(
+            f"  {'Step':30s} {base_label[:15]:>15s} {new_label[:15]:>15s} "
+            f"{'Delta':>10s} {'Change':>8s}"
+        )
+        slower = 0
+        for step in common:
+            before = base[step]["duration"]
+            after = new[step]["duration"]
+            if before is None or after is None:
+                continue
+            delta = after - before
+            change = delta / before * 100 if before > 0 else None
+            flag = ""
+            if change is not None and change > threshold:
+                flag = "  SLOWER"
+                slower += 1
+            elif change is not None and change < -threshold:
+                flag = "  FASTER"
+            change_str = f"{change:+.1f}%" if change is not None else "-"
+            print(
+                f"  {step:30s} {before:14.2f}s {after:14.2f}s "
+                f"{delta:+9.2f}s {change_str:>8s}{flag}"
+            )
+        print(
+            f"  {slower} step(s) slower than {base_label} by more than {threshold:g}%"
+        )
+
+        print("\nTest count differences:")
+        found = False
+        for step in common:
+            changes = []
+            for field in ("total", "failures", "errors", "skipped"):
+                before, after = base[step][field], new[step][field]
+                if before != after:
+                    changes.append(
+                        f"{field} {'-' if before is None else f'{before:g}'}"
+                        f" -> {'-' if after is None else f'{after:g}'}"
+                    )
+            if changes:
+                found = True
+                print(f"  {step}: {', '.join(changes)}")
+        if not found:
+            print("  No test count differences found.")
+        return slower
+
+    def show_trends(
+        self,
+        run_count: int = 200,
+        baseline_runs: int = 10,
+        threshold: float = 20.0,
+        step_name: Optional[str] = None,
+    ) -> None:
+        """Show per-step duration trends over the most recent runs.
+
+        Each step's latest duration is compared with a rolling baseline, the
+        median of its previous baseline_runs durations. Steps slower than
+        the baseline by more than threshold percent are flagged.
+        """
+        runs = self.runs[:run_count]
+        if not runs:
+            self._error("No sanity runs found.")
+            return
+
+        self.step_stats.refresh(runs)
+        run_names = [run.name for run in reversed(runs)]  # oldest first
+        series = self.step_stats.durations_by_step(run_names)
+        if step_name:
+            series = {
+                step: values for step, values in series.items() if step == step_name
+            }
+            if not series:
+                self._error(
+                    f'Step "{step_name}" not found in the last {len(runs)} runs.'
+                )
+                return
+
+        trends = [
+            self._step_trend(step, values, baseline_runs)
+            for step, values in series.items()
+        ]
+        trends = [trend for trend in trends if trend]
+        trends.sort(
+            key=lambda t: t["change"] if t["change"] is not None else -math.inf,
+            reverse=True,
+        )
+
+        if self.records is not None:
+            for trend in trends:
+                changes = trend.pop("changes")
+                self.records.write(
+                    "trend",
+                    **trend,
+                    slow_runs=sum(1 for c in changes if c > threshold),
+                    regression=trend["change"] is not None
+                    and trend["change"] > threshold,
+                )
+            return
+
+        print(
+            f"Step duration trends over {len(runs)} run(s) "
+            f"(baseline: median of previous {baseline_runs} runs, threshold {threshold:g}%)"
+        )
+        print("=" * 100)
+        print(
+            f"{'Step':30s} {'Runs':>5s} {'p50':>9s} {'p90':>9s} {'Latest':>9s} "
+            f"{'Baseline':>9s} {'Change':>8s} {'Slow':>5s}"
+        )
+        for trend in trends:
+            change = f"{trend['change']:+.1f}%" if trend["change"] is not None else "-"
+            baseline = (
+                f"{trend['baseline']:.2f}s" if trend["baseline"] is not None else "-"
+            )
+            flag = (
+                "  REGRESSION"
+                if trend["change"] is not None and trend["change"] > threshold
+                else ""
+            )
+            slow_runs = sum(1 for c in trend["changes"] if c > threshold)
+            print(
+                f"{trend['step']:30s} {trend['runs']:5d} {trend['p50']:8.2f}s {trend['p90']:8.2f}s "
+                f"{trend['latest']:8.2f}s {baseline:>9s} {change:>8s} {slow_runs:5d}{flag}"
+            )
+        print("=" * 100)
+        print(
+            "Slow: runs slower than their rolling baseline by more than the threshold"
+        )
+
+    @staticmethod
+    def _step_trend(
+        step: str, values: List[Optional[float]], baseline_runs: int
+    ) -> Optional[dict]:
+        """Summarize one step's chronological durations."""
+        durations = [value for value in values if value is not None]
+        if not durations:
+            return None
+        ordered = sorted(durations)
+
+        # Change of every run relative to the median of the runs before it
+        changes = []
+        for i in range(1, len(durations)):
+            window = durations[max(0, i - baseline_runs) : i]
+            median = statistics.median(window)
+            if median > 0:
+                changes.append((durations[i] - median) / median * 100)
+
+        baseline = None
+        change = None
+        if len(durations) > 1:
+            baseline = statistics.median(durations[-baseline_runs - 1 : -1])
+            if baseline > 0:
+                change = (durations[-1] - baseline) / baseline * 100
+        return {
+            "step": step,
+            "runs": len(durations),
+            "p50": percentile(ordered, 0.5),
+            "p90": percentile(ordered, 0.9),
+            "latest": durations[-1],
+            "baseline": baseline,
+            "change": change,
+            "changes": changes,
+        }
+
+    def show_signatures(
+        self,
+        run_name: Optional[str] = None,
+        run_count: int = 20,
+        step_name: Optional[str] = None,
+        new_only: bool = False,
+        top: int = 50,
+    ) -> None:
+        """Show ERROR/FATAL templates over recent runs and the ones new in the latest.
+
+        The window is the run_count runs ending at run_name (default: the
+        newest run). A template is new when none of the earlier runs in the
+        window contains it.
+        """
+        if run_name:
+            run = self._find_run(run_name)
+            if not run:
+                self._error(f'Run "{run_name}" not found.')
+                return
+            start = self.runs.index(run)
+        else:
+            start = 0
+        runs = self.runs[start : start + run_count]
+        if not runs:
+            self._error("No sanity runs found.")
+            return
+        latest = runs[0]
+
+        templates: Dict[str, str] = {}
+        totals: Dict[str, int] = {}
+        run_counts: Dict[str, int] = {}
+        first_seen: Dict[str, str] = {}
+        latest_steps: Dict[str, Dict[str, int]] = {}
+        for run in reversed(runs):  # oldest first
+            seen_in_run = set()
+            for step, signatures in run.error_signatures.items():
+                if step_name and step != step_name:
+                    continue
+                for signature, (template, count) in signatures.items():
+                    templates[signature] = template
+                    totals[signature] = totals.get(signature, 0) + count
+                    first_seen.setdefault(signature, run.name)
+                    seen_in_run.add(signature)
+                    if run is latest:
+                        latest_steps.setdefault(signature, {})[step] = count
+            for signature in seen_in_run:
+                run_counts[signature] = run_counts.get(signature, 0) + 1
+
+        new = [
+            signature
+            for signature in latest_steps
+            if first_seen[signature] == latest.name
+        ]
+        if self.records is not None:
+            ranked = sorted(totals, key=lambda signature: -totals[signature])
+            for signature in ranked:
+                if new_only and signature not in new:
+                    continue
+                self.records.write(
+                    "signature",
+                    signature=signature,
+                    template=templates[signature],
+                    count=totals[signature],
+                    runs=run_counts[signature],
+                    first_seen=first_seen[signature],
+                    new=signature in new,
+                    latest_steps=latest_steps.get(signature, {}),
+                )
+            return
+
+        scope = f" in step {step_name}" if step_name else ""
+        print(
+            f"Error signatures{scope} over {len(runs)} run(s), latest {latest.name}: "
+            f"{len(templates)} template(s), {len(new)} new"
+        )
+
+        if not new_only:
+            print("=" * 100)
+            print(
+                f"{'Signature':10s} {'Count':>7s} {'Runs':>5s}  {'First seen':16s} Template"
+            )
+            ranked = sorted(totals, key=lambda signature: -totals[signature])
+            for signature in ranked[:top]:
+                print(
+                    f"{signature:10s} {totals[signature]:7d} {run_counts[signature]:5d}  "
+                    f"{first_seen[signature]:16s} {templates[signature][:120]}"
+                )
+            if len(ranked) > top:
+                print(f"... {len(ranked) - top} more template(s)")
+
+        if new:
+            print("=" * 100)
+            print(f"New in {latest.name}:")
+            for signature in sorted(new, key=lambda signature: -totals[signature]):
+                steps = ", ".join(
+                    f"{step} x{count}"
+                    for step, count in sorted(latest_steps[signature].items())
+                )
+                print(f"{signature:10s} {templates[signature][:120]}")
+                print(f"{'':10s} in {steps}")
+
+    def bisect_components(
+        self, step_name: str, run_count: Optional[int] = None
+    ) -> None:
+        """Find the run where a step started failing and its component changes.
+
+        Step outcomes come from the StepStatsStore and components from the
+        run catalog, so only runs changed since the last invocation are read
+        and components are only loaded for the runs around the failure. The
+        most recent pass -> fail transition is reported; runs without a
+        result for the step are skipped.
+        """
+        runs = self.runs[:run_count] if run_count else self.runs
+        if not runs:
+            self._error("No sanity runs found.")
+            return
+
+        self.step_stats.refresh(runs)
+        chronological = list(reversed(runs))
+        failed = self.step_stats.step_failures(
+            step_name, [run.name for run in chronological]
+        )
+        known = [i for i, outcome in enumerate(failed) if outcome is not None]
+        if not known:
+            self._error(
+                f'Step "{step_name}" has no result in the last {len(runs)} runs.'
+            )
+            return
+
+        failing = [i for i in known if failed[i]]
+        if not failing:
+            if self.records is not None:
+                self.records.write(
+                    "bisect", step=step_name, runs=len(runs), first_bad=None
+                )
+            else:
+                print(
+                    f'Step "{step_name}" passed in all {len(known)} run(s) with a result.'
+                )
+            return
+
+        # Walk back from the latest failure to the last run where the step passed
+        last_bad = failing[-1]
+        good = next(
+            (i for i in reversed(known) if i < last_bad and not failed[i]), None
+        )
+        first_bad = next(i for i in failing if good is None or i > good)
+        streak = [chronological[i] for i in failing if i >= first_bad]
+        recovered = next((chronological[i] for i in known if i > last_bad), None)
+        untested = first_bad - good - 1 if good is not None else 0
+
+        changes = []
+        if good is not None:
+            before = chronological[good].components
+            after = chronological[first_bad].components
+            for component in sorted(set(before) | set(after)):
+                if before.get(component) == after.get(component):
+                    continue
+                kept = sum(
+                    1
+                    for run in streak
+                    if run.components.get(component) == after.get(component)
+                )
+                changes.append(
+                    (component, before.get(component), after.get(component), kept)
+                )
+
+        if self.records is not None:
+            self.records.write(
+                "bisect",
+                step=step_name,
+                runs=len(runs),
+                last_good=chronological[good].name if good is not None else None,
+                first_bad=chronological[first_bad].name,
+                untested_between=untested,
+                failing_runs=len(streak),
+                recovered_in=recovered.name if recovered else None,
+            )
+            for component, old, new, kept in changes:
+                self.records.write(
+                    "component_change",
+                    component=component,
+                    good=old,
+                    bad=new,
+                    kept_in=kept,
+                    failing_runs=len(streak),
+                )
+            return
+
+        print(f'Bisecting "{step_name}" over {len(runs)} run(s)')
+        print("=" * 80)
+        if good is None:
+            print(f"First bad:  {chronological[first_bad].name}")
+            print("The step failed in every run with a result, nothing to compare.")
+            return
+        print(f"Last good:  {chronological[good].name}")
+        print(f"First bad:  {chronological[first_bad].name}")
+        if untested:
+            print(f"            ({untested} run(s) in between without a result)")
+        if recovered:
+            print(
+                f"Passing again in {recovered.name} after {len(streak)} failing run(s)"
+            )
+        else:
+            print(f"Still failing: {len(streak)} failing run(s) since")
+        print()
+        if not changes:
+            print("No component changed between the last good and first bad run.")
+            return
+        print("Component changes:")
+        for component, old, new, kept in changes:
+            print(
+                f"  {component:30s} {old or '-'} -> {new or '-'}  "
+                f"(kept in {kept}/{len(streak)} failing runs)"
+            )
+
+    def serve(self, host: str, port: int, cache_size: int = 256) -> None:
+        """Answer HTTP requests until interrupted, see LogService."""
+        service = LogService(self.sanity_dir, RunCache(self.catalog, cache_size))
+        server = http.server.ThreadingHTTPServer((host, port), LogServiceHandler)
+        server.daemon_threads = True
+        server.service = service
+        print(f"Serving {self.sanity_dir} on http://{host}:{server.server_port}/")
+        print("Press Ctrl+C to stop")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print()
+        finally:
+            server.server_close()
+            if self.catalog is not None:
+                self.catalog.save()
+
     def _find_run(self, run_name: str) -> Optional[SanityRun]:
         """Find a run by name or partial name."""
         # Try exact match first
@@ -636,14 +3732,185 @@ class SanityLogViewer:
         if len(matches) == 1:
             return matches[0]
         elif len(matches) > 1:
-            print(f'Multiple runs match "{run_name}":')
-            for run in matches:
-                print(f"  {run.name}")
+            if self.records is not None:
+                names = ", ".join(run.name for run in matches)
+                self._error(f'Multiple runs match "{run_name}": {names}')
+            else:
+                print(f'Multiple runs match "{run_name}":')
+                for run in matches:
+                    print(f"  {run.name}")
             return None
 
         return None
 
 
+class LogService:
+    """HTTP front end for several users of one sanity directory.
+
+    Every request runs a viewer command whose records become the response
+    body (ndjson, or a JSON array with ?format=json). The viewers share a
+    RunCache, so metadata and step summaries parsed for one request are
+    served from memory to the next.
+
+      GET /runs                   list of runs
+      GET /runs/<run>             components and steps
+      GET /runs/<run>/summary     step summary
+      GET /runs/<run>/view        ?step=&lines=100:200 (at most MAX_VIEW_LINES)
+      GET /runs/<run>/search      ?pattern=&step=&case_sensitive=1
+      GET /search                 ?pattern=&step=&case_sensitive=1, every run
+      GET /stats                  RunCache statistics
+    """
+
+    MAX_VIEW_LINES = 10_000
+
+    def __init__(self, sanity_dir: Path, run_cache: RunCache):
+        self.sanity_dir = sanity_dir
+        self.run_cache = run_cache
+
+    def handle(
+        self, path: str, query: Dict[str, str], stream: TextIO
+    ) -> Tuple[int, str]:
+        """Write the records answering one request, return (status, format)."""
+        output_format = query.get("format", "ndjson")
+        if output_format not in RecordWriter.FORMATS:
+            output_format = "ndjson"
+        viewer = SanityLogViewer(
+            self.sanity_dir,
+            output_format=output_format,
+            stream=stream,
+            run_cache=self.run_cache,
+        )
+        try:
+            status = self._dispatch(viewer, path.strip("/").split("/"), query)
+        except (re.error, ValueError) as e:
+            viewer._error(f"Bad request: {e}")
+            status = 400
+        finally:
+            viewer.close()
+        if status == 200 and viewer.records.errors == viewer.records.count > 0:
+            status = 404
+        return status, output_format
+
+    def _dispatch(
+        self, viewer: SanityLogViewer, parts: List[str], query: Dict[str, str]
+    ) -> int:
+        parts = [urllib.parse.unquote(part) for part in parts]
+        pattern = query.get("pattern")
+        case_sensitive = query.get("case_sensitive", "") not in ("", "0")
+        if parts == ["runs"]:
+            viewer.list_runs()
+        elif parts == ["stats"]:
+            viewer.records.write("cache", **self.run_cache.stats())
+        elif parts == ["search"] and pattern:
+            viewer.search_logs(None, pattern, query.get("step"), case_sensitive)
+        elif len(parts) == 2 and parts[0] == "runs":
+            viewer.show_run_details(parts[1])
+        elif len(parts) == 3 and parts[0] == "runs" and parts[2] == "summary":
+            viewer.show_step_summary(parts[1])
+        elif len(parts) == 3 and parts[0] == "runs" and parts[2] == "view":
+            lines = self._view_range(query.get("lines"))
+            viewer.view_log(parts[1], query.get("step"), lines, use_pager=False)
+        elif (
+            len(parts) == 3 and parts[0] == "runs" and parts[2] == "search" and pattern
+        ):
+            viewer.search_logs(parts[1], pattern, query.get("step"), case_sensitive)
+        else:
+            viewer._error(f"Unknown endpoint: /{'/'.join(parts)}")
+            return 404
+        return 200
+
+    def _view_range(self, lines: Optional[str]) -> str:
+        """Clamp a --lines style range to at most MAX_VIEW_LINES lines."""
+        if lines is None or ":" not in lines:
+            return str(min(int(lines or self.MAX_VIEW_LINES), self.MAX_VIEW_LINES))
+        start_str, end_str = (part.strip() for part in lines.split(":", 1))
+        start = int(start_str) if start_str else 1
+        end = start + self.MAX_VIEW_LINES - 1
+        if end_str:
+            end = min(int(end_str), end)
+        return f"{start}:{end}"
+
+
+class ChunkedResponse(io.TextIOBase):
+    """Text stream writing an HTTP response body as it is produced.
+
+    Output is held back until BUFFER_SIZE bytes have accumulated. A body
+    that stays smaller is sent by finish() with the final status and a
+    Content-Length, so error-only responses still get their 4xx. A larger
+    body is streamed with "Transfer-Encoding: chunked" under a 200, one
+    chunk per BUFFER_SIZE bytes.
+    """
+
+    BUFFER_SIZE = 64 * 1024
+
+    def __init__(
+        self, handler: http.server.BaseHTTPRequestHandler, query: Dict[str, str]
+    ):
+        self.handler = handler
+        self.json = query.get("format") == "json"
+        self.buffer: List[bytes] = []
+        self.buffered = 0
+        self.streaming = False
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        data = text.encode()
+        self.buffer.append(data)
+        self.buffered += len(data)
+        if self.buffered >= self.BUFFER_SIZE:
+            self._send_chunk()
+        return len(text)
+
+    def _send_headers(self, status: int, *headers: Tuple[str, str]) -> None:
+        content_type = "application/json" if self.json else "application/x-ndjson"
+        self.handler.send_response(status)
+        self.handler.send_header("Content-Type", content_type)
+        for keyword, value in headers:
+            self.handler.send_header(keyword, value)
+        self.handler.end_headers()
+
+    def _send_chunk(self) -> None:
+        if not self.streaming:
+            self._send_headers(200, ("Transfer-Encoding", "chunked"))
+            self.streaming = True
+        data = b"".join(self.buffer)
+        self.buffer = []
+        self.buffered = 0
+        if data:
+            self.handler.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+
+    def finish(self, status: int) -> None:
+        """End the response; status only applies if nothing was streamed yet."""
+        if self.streaming:
+            self._send_chunk()
+            self.handler.wfile.write(b"0\r\n\r\n")
+            return
+        data = b"".join(self.buffer)
+        self._send_headers(status, ("Content-Length", str(len(data))))
+        self.handler.wfile.write(data)
+
+
+class LogServiceHandler(http.server.BaseHTTPRequestHandler):
+    """Hands GET requests to the LogService attached to the server."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:
+        url = urllib.parse.urlsplit(self.path)
+        query = {
+            key: values[-1] for key, values in urllib.parse.parse_qs(url.query).items()
+        }
+        body = ChunkedResponse(self, query)
+        try:
+            status, _ = self.server.service.handle(url.path, query, body)
+            body.finish(status)
+        except ConnectionError:
+            # The client went away mid-response
+            self.close_connection = True
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Andromeda Sanity Log Viewer - Analyze and navigate sanity test logs",
@@ -655,8 +3922,20 @@ Examples:
   %(prog)s view 20250825_130529 --step dmtx_simple # View specific step log
   %(prog)s view 20250825_130529 --lines 100:200    # View lines 100-200 of master log
   %(prog)s search 20250825_130529 "ERROR.*timeout" # Search for pattern in logs
+  %(prog)s search --all-runs "ERROR.*timeout" -j 8 # Search every run on 8 cores
+  %(prog)s index                                   # Index new runs for fast literal search
+  %(prog)s compress 20250825_130529 --remove       # Archive a run as seekable .gz logs
   %(prog)s filter 20250825_130529 ERROR            # Filter by log level
+  %(prog)s filter 20250825_130529 --level ERROR,WARNING --all-steps --since 1000
   %(prog)s compare run1 run2                       # Compare two different runs
+  %(prog)s compare run1 --baseline 5               # Compare against previous 5 runs
+  %(prog)s follow 20250825_130529 --level ERROR    # Watch a running sanity job
+  %(prog)s trend --runs 200                        # Which steps got slower recently
+  %(prog)s signatures --new                        # Error templates new in the latest run
+  %(prog)s bisect-components dmtx_simple           # Component change that broke a step
+  %(prog)s summary 20250825_130529 --format json   # Machine-readable output of any command
+  %(prog)s serve --port 8080                       # Share cached views over HTTP
+  %(prog)s --timings summary 20250825_130529       # Where does the time go
         """,
         formatter_class=argparse.RawDescriptionHelpFormatter,
     )
@@ -666,12 +3945,48 @@ Examples:
         default=Path("sanity"),
         help="Path to sanity directory (default: ./sanity)",
     )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Ignore and do not update the cached run catalog",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Profile the command with cProfile and print the top functions "
+        "to stderr",
+    )
+    parser.add_argument(
+        "--profile-output",
+        type=Path,
+        metavar="FILE",
+        help="Save the --profile stats to FILE (for pstats or snakeviz) "
+        "instead of printing them",
+    )
+    parser.add_argument(
+        "--timings",
+        action="store_true",
+        help="Print wall time per phase and bytes read, lines parsed and regex "
+        "evaluations per file to stderr",
+    )
+
+    # Options shared by every command
+    output_options = argparse.ArgumentParser(add_help=False)
+    output_options.add_argument(
+        "--format",
+        dest="output_format",
+        choices=["text", "json", "ndjson"],
+        default="text",
+        help="Output format; json and ndjson stream one record per result "
+        "(default: text)",
+    )
 
     subparsers = parser.add_subparsers(dest="command", help="Available commands")
 
     # List command
     list_parser = subparsers.add_parser(
         "list",
+        parents=[output_options],
         help="List all sanity runs",
         description="Display all available sanity test runs with timestamps and step counts",
     )
@@ -679,6 +3994,7 @@ Examples:
     # Show command
     show_parser = subparsers.add_parser(
         "show",
+        parents=[output_options],
         help="Show run details",
         description="Display detailed information about a specific sanity run including components and test steps",
     )
@@ -690,6 +4006,7 @@ Examples:
     # View command
     view_parser = subparsers.add_parser(
         "view",
+        parents=[output_options],
         help="View log content",
         description="View log file content with proper formatting, ANSI color support, and optional paging",
     )
@@ -715,12 +4032,17 @@ Examples:
     # Search command
     search_parser = subparsers.add_parser(
         "search",
+        parents=[output_options],
         help="Search in logs",
         description="Search for patterns in log files using regular expressions",
     )
-    search_parser.add_argument("run", help="Run name or partial name")
     search_parser.add_argument(
-        "pattern", help='Search pattern (supports regex, e.g., "ERROR.*timeout")'
+        "run", help="Run name or partial name (omit with --all-runs)"
+    )
+    search_parser.add_argument(
+        "pattern",
+        nargs="?",
+        help='Search pattern (supports regex, e.g., "ERROR.*timeout")',
     )
     search_parser.add_argument(
         "--step", help="Specific step to search in (default: all steps)"
@@ -728,24 +4050,101 @@ Examples:
     search_parser.add_argument(
         "--case-sensitive", action="store_true", help="Case-sensitive search"
     )
+    search_parser.add_argument(
+        "--all-runs",
+        action="store_true",
+        help="Search every sanity run instead of a single one",
+    )
+    search_parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of worker processes (default: 1)",
+    )
+    search_parser.add_argument(
+        "--no-index",
+        action="store_true",
+        help="Always scan the logs instead of using the search index",
+    )
+
+    # Index command
+    index_parser = subparsers.add_parser(
+        "index",
+        parents=[output_options],
+        help="Build the search index",
+        description="Build or refresh the on-disk search index used by search for "
+        "literal and prefix patterns. Runs that are already indexed and unchanged "
+        "are skipped, so this is cheap to run after every new sanity run",
+    )
+    index_parser.add_argument(
+        "runs", nargs="*", help="Run names or partial names (default: all runs)"
+    )
+
+    # Compress command
+    compress_parser = subparsers.add_parser(
+        "compress",
+        parents=[output_options],
+        help="Compress the logs of a run",
+        description="Compress the logs of a run into independently decompressible "
+        "members, which every command reads with random access",
+    )
+    compress_parser.add_argument("run", help="Run name or partial name")
+    compress_parser.add_argument(
+        "--compression",
+        choices=["gz", "zst"],
+        default="gz",
+        help="Compression format, zst needs the zstandard package (default: gz)",
+    )
+    compress_parser.add_argument(
+        "--remove", action="store_true", help="Delete the uncompressed logs afterwards"
+    )
 
     # Filter command
     filter_parser = subparsers.add_parser(
         "filter",
+        parents=[output_options],
         help="Filter logs by level",
         description="Filter log entries by log level (INFO, DEBUG, ERROR, WARNING, etc.)",
     )
     filter_parser.add_argument("run", help="Run name or partial name")
     filter_parser.add_argument(
-        "level", help="Log level to filter by (INFO, DEBUG, ERROR, WARNING, etc.)"
+        "level",
+        nargs="?",
+        help="Log level(s) to filter by, comma-separated (INFO, DEBUG, ERROR, WARNING, etc.)",
+    )
+    filter_parser.add_argument(
+        "--level",
+        dest="level_option",
+        metavar="LEVELS",
+        help="Same as the level argument, e.g. --level ERROR,WARNING",
     )
     filter_parser.add_argument(
         "--step", help="Specific step to filter (default: master log)"
     )
+    filter_parser.add_argument(
+        "--all-steps",
+        action="store_true",
+        help="Filter every step log and the master log",
+    )
+    filter_parser.add_argument(
+        "--since", type=int, help="Only lines with a timestamp >= SINCE"
+    )
+    filter_parser.add_argument(
+        "--until", type=int, help="Only lines with a timestamp <= UNTIL"
+    )
+    filter_parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of worker processes for --all-steps (default: 1)",
+    )
 
     # Summary command
     summary_parser = subparsers.add_parser(
         "summary",
+        parents=[output_options],
         help="Show step summary",
         description="""Show comprehensive summary of all test steps including:
   - Step status (PASSED/FAILED/COMPLETED/UNKNOWN)
@@ -758,20 +4157,208 @@ Examples:
     # Compare command
     compare_parser = subparsers.add_parser(
         "compare",
+        parents=[output_options],
         help="Compare two runs",
-        description="Compare two sanity runs side-by-side showing differences in components and steps",
+        description="Compare two sanity runs side-by-side showing differences in components, steps, "
+        "step durations and test counts, or compare one run against the median of the runs before it",
     )
     compare_parser.add_argument("run1", help="First run name or partial name")
-    compare_parser.add_argument("run2", help="Second run name or partial name")
+    compare_parser.add_argument(
+        "run2", nargs="?", help="Second run name or partial name"
+    )
+    compare_parser.add_argument(
+        "--baseline",
+        type=int,
+        metavar="K",
+        help="Compare run1 against the per-step median of the K runs before it",
+    )
+    compare_parser.add_argument(
+        "--threshold",
+        type=float,
+        default=10.0,
+        help="Duration change in percent that is flagged (default: 10)",
+    )
+
+    # Follow command
+    follow_parser = subparsers.add_parser(
+        "follow",
+        parents=[output_options],
+        help="Follow logs of a running job",
+        description="Print new lines of the master and step logs as they are written (like tail -F), "
+        "picking up new step logs as steps start",
+    )
+    follow_parser.add_argument("run", help="Run name or partial name")
+    follow_parser.add_argument(
+        "--step", help="Follow only this step log (default: master and all steps)"
+    )
+    follow_parser.add_argument(
+        "--level",
+        help="Only show these log levels, comma separated (e.g. ERROR,WARNING)",
+    )
+    follow_parser.add_argument(
+        "--pattern", help="Only show lines matching this regular expression"
+    )
+    follow_parser.add_argument(
+        "--case-sensitive", action="store_true", help="Case-sensitive --pattern"
+    )
+    follow_parser.add_argument(
+        "--from-start",
+        action="store_true",
+        help="Print existing content first instead of only new lines",
+    )
+
+    # Trend command
+    trend_parser = subparsers.add_parser(
+        "trend",
+        parents=[output_options],
+        help="Show step duration trends",
+        description="Show per-step duration percentiles over recent runs and flag steps that are "
+        "slower than their rolling baseline",
+    )
+    trend_parser.add_argument(
+        "--runs",
+        type=int,
+        default=200,
+        help="Number of most recent runs to analyze (default: 200)",
+    )
+    trend_parser.add_argument(
+        "--baseline",
+        type=int,
+        default=10,
+        help="Rolling baseline size in runs (default: 10)",
+    )
+    trend_parser.add_argument(
+        "--threshold",
+        type=float,
+        default=20.0,
+        help="Slowdown in percent that counts as a regression (default: 20)",
+    )
+    trend_parser.add_argument("--step", help="Only show this step")
+
+    # Signatures command
+    signatures_parser = subparsers.add_parser(
+        "signatures",
+        parents=[output_options],
+        help="Cluster error lines into templates",
+        description="Group ERROR/FATAL lines into templates (numbers, paths and hashes "
+        "masked), count them per run and step and show templates new in the latest run",
+    )
+    signatures_parser.add_argument(
+        "run", nargs="?", help="Latest run of the window (default: newest run)"
+    )
+    signatures_parser.add_argument(
+        "--runs",
+        type=int,
+        default=20,
+        help="Number of runs to analyze, ending at the latest (default: 20)",
+    )
+    signatures_parser.add_argument("--step", help="Only count this step")
+    signatures_parser.add_argument(
+        "--new", action="store_true", help="Only show templates new in the latest run"
+    )
+    signatures_parser.add_argument(
+        "--top",
+        type=int,
+        default=50,
+        help="Number of most frequent templates to show (default: 50)",
+    )
+
+    # Bisect components command
+    bisect_parser = subparsers.add_parser(
+        "bisect-components",
+        parents=[output_options],
+        help="Find the component change that made a step fail",
+        description="Find the most recent run where a step started failing and "
+        "the components.txt revisions that changed since the last passing run",
+    )
+    bisect_parser.add_argument("step", help="Step name")
+    bisect_parser.add_argument(
+        "--runs", type=int, help="Only consider the latest N runs (default: all)"
+    )
+
+    # Serve command
+    serve_parser = subparsers.add_parser(
+        "serve",
+        help="Serve the viewer over HTTP",
+        description="Answer list, show, summary, search and ranged view requests "
+        "over HTTP as JSON records. Parsed run metadata and step summaries are "
+        "kept in memory and shared between requests.",
+    )
+    serve_parser.add_argument(
+        "--host", default="127.0.0.1", help="Address to bind (default: 127.0.0.1)"
+    )
+    serve_parser.add_argument(
+        "--port", type=int, default=8080, help="Port to listen on (default: 8080)"
+    )
+    serve_parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=256,
+        help="Number of runs kept in memory (default: 256)",
+    )
 
     args = parser.parse_args()
 
+    if args.command == "search":
+        if args.all_runs:
+            if args.pattern is not None:
+                parser.error("search --all-runs takes a pattern but no run")
+            args.run, args.pattern = None, args.run
+        elif args.pattern is None:
+            parser.error("search requires a run and a pattern")
+        if args.jobs < 1:
+            parser.error("--jobs must be at least 1")
+    elif args.command == "filter":
+        if args.level is not None and args.level_option is not None:
+            parser.error("filter takes the level as argument or --level, not both")
+        args.level = args.level or args.level_option
+        if args.level is None and args.since is None and args.until is None:
+            parser.error("filter requires a level or a --since/--until window")
+        if args.step and args.all_steps:
+            parser.error("--step and --all-steps are mutually exclusive")
+        if args.jobs < 1:
+            parser.error("--jobs must be at least 1")
+    elif args.command == "compare":
+        if args.baseline is not None:
+            if args.run2 is not None:
+                parser.error("compare --baseline takes a single run")
+            if args.baseline < 1:
+                parser.error("--baseline must be at least 1")
+        elif args.run2 is None:
+            parser.error("compare requires two runs (or one run with --baseline)")
+
     if not args.command:
         parser.print_help()
         return
 
-    viewer = SanityLogViewer(args.sanity_dir)
+    if args.timings:
+        Timings.active = Timings()
+    profiler = cProfile.Profile() if args.profile or args.profile_output else None
+    if profiler is not None:
+        profiler.enable()
+    try:
+        viewer = SanityLogViewer(
+            args.sanity_dir,
+            use_cache=not args.no_cache,
+            output_format=getattr(args, "output_format", "text"),
+        )
+        try:
+            run_command(viewer, args)
+        finally:
+            viewer.close()
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            if args.profile_output is not None:
+                profiler.dump_stats(args.profile_output)
+            else:
+                stats = pstats.Stats(profiler, stream=sys.stderr)
+                stats.sort_stats("cumulative").print_stats(30)
+        if Timings.active is not None:
+            Timings.active.report(sys.stderr)
+
 
+def run_command(viewer: SanityLogViewer, args: argparse.Namespace) -> None:
     if args.command == "list":
         viewer.list_runs()
     elif args.command == "show":
@@ -779,13 +4366,53 @@ Examples:
     elif args.command == "view":
         viewer.view_log(args.run, args.step, args.lines, not args.no_pager)
     elif args.command == "search":
-        viewer.search_logs(args.run, args.pattern, args.step, args.case_sensitive)
+        viewer.search_logs(
+            args.run,
+            args.pattern,
+            args.step,
+            args.case_sensitive,
+            args.jobs,
+            not args.no_index,
+        )
+    elif args.command == "index":
+        viewer.build_search_index(args.runs)
+    elif args.command == "compress":
+        viewer.compress_run(args.run, f".{args.compression}", args.remove)
     elif args.command == "filter":
-        viewer.filter_by_log_level(args.run, args.level, args.step)
+        viewer.filter_by_log_level(
+            args.run,
+            args.level,
+            args.step,
+            args.since,
+            args.until,
+            args.all_steps,
+            args.jobs,
+        )
     elif args.command == "summary":
         viewer.show_step_summary(args.run)
     elif args.command == "compare":
-        viewer.compare_runs(args.run1, args.run2)
+        if args.baseline is not None:
+            viewer.compare_with_baseline(args.run1, args.baseline, args.threshold)
+        else:
+            viewer.compare_runs(args.run1, args.run2, args.threshold)
+    elif args.command == "trend":
+        viewer.show_trends(args.runs, args.baseline, args.threshold, args.step)
+    elif args.command == "signatures":
+        viewer.show_signatures(args.run, args.runs, args.step, args.new, args.top)
+    elif args.command == "bisect-components":
+        viewer.bisect_components(args.step, args.runs)
+    elif args.command == "serve":
+        viewer.serve(args.host, args.port, args.cache_size)
+    elif args.command == "follow":
+        levels = args.level.split(",") if args.level else None
+        viewer.follow_logs(
+            args.run,
+            args.step,
+            levels,
+            args.pattern,
+            args.case_sensitive,
+            args.from_start,
+        )
 
 
 if __name__ == "__main__":
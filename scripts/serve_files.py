@@ -4,16 +4,53 @@
 from __future__ import annotations
 
 import argparse
+import asyncio
+import contextlib
+import datetime
+import email.message
+import email.utils
 import errno
 import functools
+import gzip
+import hashlib
+import html
+import http.client
 import http.server
+import io
+import json
+import mimetypes
+import os
+import posixpath
+import queue
+import re
+import shutil
 import socket
 import sys
+import tempfile
+import threading
+import time
 from pathlib import Path
-from urllib.parse import quote, unquote, urlsplit
+from collections import OrderedDict
+from typing import BinaryIO, Iterator, NamedTuple
+from urllib.parse import SplitResult, parse_qs, quote, unquote, urlsplit
+
+try:
+    import zstandard
+except ImportError:  # Only needed for zstd responses
+    zstandard = None
 
 DEFAULT_PORT = 8000
 DEFAULT_BIND = "0.0.0.0"
+DEFAULT_MAX_TRANSFERS = 16
+SENDFILE_CHUNK = 1 << 30
+RANGE_PATTERN = re.compile(r"bytes=\s*(\d*)\s*-\s*(\d*)\s*$")
+LISTING_PAGE_SIZE = 1000
+MAX_LISTING_PAGE_SIZE = 10000
+LISTING_CHUNK = 256
+# Not in the mimetypes database, which would make them application/octet-stream
+EXTRA_TYPES = {".log": "text/plain"}
+DEFAULT_CACHE_DIR = Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "serve_files"
+DEFAULT_CACHE_SIZE = 1024  # MiB
 
 
 def parse_args() -> argparse.Namespace:
@@ -41,16 +78,459 @@ def parse_args() -> argparse.Namespace:
         metavar="ADDRESS",
         help=f"address to bind to (default: {DEFAULT_BIND}; use 127.0.0.1 with an SSH tunnel)",
     )
+    parser.add_argument(
+        "--async",
+        dest="async_mode",
+        action="store_true",
+        help="serve all connections from one asyncio event loop with keep-alive instead of a thread per connection",
+    )
+    parser.add_argument(
+        "--max-transfers",
+        type=int,
+        default=DEFAULT_MAX_TRANSFERS,
+        metavar="N",
+        help=f"with --async, file bodies sent at the same time; other requests wait (default: {DEFAULT_MAX_TRANSFERS})",
+    )
+    parser.add_argument(
+        "--no-compression",
+        dest="compression",
+        action="store_false",
+        help="never send gzip or zstd encoded responses, even when the client accepts them",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=DEFAULT_CACHE_DIR,
+        metavar="DIR",
+        help=f"where compressed copies of served files are kept (default: {DEFAULT_CACHE_DIR})",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=DEFAULT_CACHE_SIZE,
+        metavar="MIB",
+        help=f"compressed copies kept before the least recently used are removed (default: {DEFAULT_CACHE_SIZE})",
+    )
     args = parser.parse_args()
     if not 1 <= args.port <= 65535:
         parser.error("port must be between 1 and 65535")
+    if args.max_transfers < 1:
+        parser.error("--max-transfers must be at least 1")
+    if args.cache_size < 0:
+        parser.error("--cache-size cannot be negative")
     return args
 
 
+def not_modified(headers: email.message.Message, etag: str, mtime: float) -> bool:
+    """Evaluate If-None-Match, or If-Modified-Since without it."""
+    if "If-None-Match" in headers:
+        tags = [tag.strip() for tag in headers["If-None-Match"].split(",")]
+        return "*" in tags or etag in tags or f"W/{etag}" in tags
+    if "If-Modified-Since" not in headers:
+        return False
+    try:
+        since = email.utils.parsedate_to_datetime(headers["If-Modified-Since"])
+    except (TypeError, IndexError, OverflowError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=datetime.timezone.utc)
+    modified = datetime.datetime.fromtimestamp(int(mtime), datetime.timezone.utc)
+    return modified <= since
+
+
+def requested_range(
+    headers: email.message.Message, etag: str, last_modified: str, size: int
+) -> tuple[int, int] | tuple[()] | None:
+    """Return the inclusive byte range to send, () if unsatisfiable, None for all.
+
+    Only single ranges are honoured; multiple ranges and malformed headers,
+    including a last byte before the first, get the whole file, which
+    RFC 9110 allows.
+    """
+    header = headers.get("Range")
+    if not header:
+        return None
+    if_range = headers.get("If-Range")
+    if if_range is not None and if_range.strip() not in (etag, last_modified):
+        return None
+    match = RANGE_PATTERN.match(header.strip())
+    if not match or not any(match.groups()):
+        return None
+    first, last = match.groups()
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            return ()
+        return max(0, size - length), size - 1
+    start = int(first)
+    if last and int(last) < start:
+        # Syntactically invalid: ignore the header (RFC 9110, 14.1.1)
+        return None
+    if start >= size:
+        return ()
+    end = min(int(last), size - 1) if last else size - 1
+    return start, end
+
+
+def file_response(
+    headers: email.message.Message,
+    fs: os.stat_result,
+    content_type: str,
+    vary: bool = False,
+    encoded: tuple[str, os.stat_result] | None = None,
+) -> tuple[http.HTTPStatus, list[tuple[str, str]], int, int]:
+    """Status, response headers, body offset and body length for a file request.
+
+    Files carry an ETag and Accept-Ranges; conditional requests get 304 and
+    single byte ranges 206 (or 416), see requested_range(). When encoded
+    names a Content-Encoding and the stat of the compressed copy, the body
+    and its ranges come from that copy and the ETag names the encoding.
+    vary adds "Vary: Accept-Encoding" for files that may be sent encoded.
+    """
+    etag = f'"{fs.st_mtime_ns:x}-{fs.st_size:x}"'
+    size = fs.st_size
+    representation = [("Vary", "Accept-Encoding")] if vary else []
+    if encoded is not None:
+        encoding, body = encoded
+        etag = f'"{fs.st_mtime_ns:x}-{fs.st_size:x}-{encoding}"'
+        size = body.st_size
+        representation.insert(0, ("Content-Encoding", encoding))
+    last_modified = email.utils.formatdate(int(fs.st_mtime), usegmt=True)
+    if not_modified(headers, etag, fs.st_mtime):
+        return http.HTTPStatus.NOT_MODIFIED, [("ETag", etag), *representation], 0, 0
+
+    byte_range = requested_range(headers, etag, last_modified, size)
+    if byte_range == ():
+        response = [("Content-Range", f"bytes */{size}"), ("Content-Length", "0")]
+        return http.HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE, response, 0, 0
+
+    start, end = byte_range or (0, size - 1)
+    response = [("Content-type", content_type), *representation, ("Content-Length", str(end - start + 1))]
+    if byte_range:
+        response.append(("Content-Range", f"bytes {start}-{end}/{size}"))
+    response += [("Accept-Ranges", "bytes"), ("ETag", etag), ("Last-Modified", last_modified)]
+    status = http.HTTPStatus.PARTIAL_CONTENT if byte_range else http.HTTPStatus.OK
+    return status, response, start, end - start + 1
+
+
+class CompressionCache:
+    """Compressed copies of served files, made once and then sent like the files themselves.
+
+    Copies are kept in directory under a name derived from the source path,
+    its mtime and its size, so an edited file is compressed again and its
+    stale copy removed. Small files, files over MAX_SIZE (firmware and disk
+    images keep their resumable sendfile downloads), binary data and media
+    types that are already compressed are always served as they are.
+
+    Files up to SYNC_SIZE are compressed while their first request waits.
+    Larger ones are sent as they are until a background thread has made
+    their copy. Once the copies exceed max_size bytes, the least recently
+    used ones are removed; a copy's mtime records its last use.
+    """
+
+    MIN_SIZE = 1024
+    MAX_SIZE = 256 * 1024 * 1024
+    SYNC_SIZE = 8 * 1024 * 1024
+    GZIP_LEVEL = 6
+    ZSTD_LEVEL = 10
+    SUFFIXES = {"zstd": ".zst", "gzip": ".gz"}
+    UNCOMPRESSIBLE_TYPES = {
+        "application/epub+zip",
+        "application/gzip",
+        "application/java-archive",
+        "application/octet-stream",
+        "application/pdf",
+        "application/vnd.android.package-archive",
+        "application/x-7z-compressed",
+        "application/x-bzip2",
+        "application/x-rar-compressed",
+        "application/x-xz",
+        "application/zip",
+        "application/zstd",
+    }
+
+    def __init__(self, directory: Path, max_size: int = DEFAULT_CACHE_SIZE * 1024 * 1024):
+        self.directory = directory
+        self.max_size = max_size
+        # In order of preference when the client accepts several equally
+        self.encodings = ["zstd", "gzip"] if zstandard is not None else ["gzip"]
+        # Copies being made, in the foreground or queued for the background
+        self.locks: dict[Path, threading.Lock] = {}
+        self.locks_lock = threading.Lock()
+        self.background: queue.Queue[tuple[Path, os.stat_result, str, str, Path]] = queue.Queue()
+        self.worker: threading.Thread | None = None
+
+    def compressible(self, path: Path, content_type: str, size: int) -> bool:
+        if not self.MIN_SIZE <= size <= self.MAX_SIZE or mimetypes.guess_type(path.name)[1] is not None:
+            # Tiny, huge, or itself compressed like logs.tar.gz
+            return False
+        if content_type.split("/", 1)[0] in ("audio", "font", "image", "video"):
+            return content_type == "image/svg+xml"
+        return content_type not in self.UNCOMPRESSIBLE_TYPES
+
+    def accepted(self, accept_encoding: str) -> str | None:
+        """The encoding to use for an Accept-Encoding header, by q-value and then preference."""
+        weights = {}
+        for item in accept_encoding.split(","):
+            coding, *parameters = item.split(";")
+            weight = 1.0
+            for parameter in parameters:
+                name, _, value = parameter.partition("=")
+                if name.strip().lower() == "q":
+                    try:
+                        weight = float(value)
+                    except ValueError:
+                        weight = 0.0
+            coding = coding.strip().lower()
+            weights["gzip" if coding == "x-gzip" else coding] = weight
+
+        best, best_weight = None, 0.0
+        for encoding in self.encodings:
+            weight = weights.get(encoding, weights.get("*", 0.0))
+            if weight > best_weight:
+                best, best_weight = encoding, weight
+        return best
+
+    def negotiate(
+        self, headers: email.message.Message, path: Path, content_type: str, size: int
+    ) -> tuple[bool, str | None]:
+        """Whether the response varies with Accept-Encoding, and the encoding to send."""
+        if not self.compressible(path, content_type, size):
+            return False, None
+        return True, self.accepted(headers.get("Accept-Encoding", ""))
+
+    def variant(self, path: Path, fs: os.stat_result, encoding: str) -> Path | None:
+        """Path of the encoding compressed copy of path, creating it if needed.
+
+        Returns None when path changed from fs while it was being compressed,
+        and while a file over SYNC_SIZE waits for its copy.
+        """
+        key = hashlib.sha256(os.fsencode(path.resolve())).hexdigest()[:32]
+        suffix = self.SUFFIXES[encoding]
+        target = self.directory / f"{key}-{fs.st_mtime_ns:x}-{fs.st_size:x}{suffix}"
+        if target.exists():
+            with contextlib.suppress(OSError):
+                os.utime(target)
+            return target
+        if fs.st_size > self.SYNC_SIZE:
+            self.compress_later(path, fs, encoding, key, target)
+            return None
+
+        with self.locks_lock:
+            lock = self.locks.setdefault(target, threading.Lock())
+        with lock:
+            try:
+                return self.create_variant(path, fs, encoding, key, target)
+            finally:
+                # Requests already waiting hold the lock object; later ones find target
+                with self.locks_lock:
+                    self.locks.pop(target, None)
+
+    def compress_later(self, path: Path, fs: os.stat_result, encoding: str, key: str, target: Path) -> None:
+        """Queue target for the background thread, unless it is already being made."""
+        with self.locks_lock:
+            if target in self.locks:
+                return
+            self.locks[target] = threading.Lock()
+            if self.worker is None:
+                self.worker = threading.Thread(target=self.compress_queued, name="compression", daemon=True)
+                self.worker.start()
+        self.background.put((path, fs, encoding, key, target))
+
+    def compress_queued(self) -> None:
+        while True:
+            path, fs, encoding, key, target = self.background.get()
+            try:
+                with self.locks[target]:
+                    self.create_variant(path, fs, encoding, key, target)
+            except OSError as error:
+                print(f"serve_files.py: could not compress {path}: {error}", file=sys.stderr)
+            finally:
+                with self.locks_lock:
+                    self.locks.pop(target, None)
+                self.background.task_done()
+
+    def create_variant(self, path: Path, fs: os.stat_result, encoding: str, key: str, target: Path) -> Path | None:
+        if target.exists():
+            return target
+        suffix = self.SUFFIXES[encoding]
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd, temporary = tempfile.mkstemp(prefix=".", suffix=suffix, dir=self.directory)
+        try:
+            with open(path, "rb") as source, open(fd, "wb") as output:
+                self.compress(source, output, encoding)
+                current = os.fstat(source.fileno())
+            if (current.st_mtime_ns, current.st_size) != (fs.st_mtime_ns, fs.st_size):
+                os.unlink(temporary)
+                return None
+            os.replace(temporary, target)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.unlink(temporary)
+            raise
+        for stale in self.directory.glob(f"{key}-*{suffix}"):
+            if stale != target:
+                stale.unlink(missing_ok=True)
+        self.evict(target)
+        return target
+
+    def evict(self, keep: Path) -> None:
+        """Remove the least recently used copies other than keep until the cache fits max_size."""
+        copies = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                # Dot files are copies still being written
+                if entry.name.startswith(".") or not entry.is_file(follow_symlinks=False):
+                    continue
+                with contextlib.suppress(OSError):
+                    stat = entry.stat(follow_symlinks=False)
+                    copies.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in copies)
+        for _, size, copy in sorted(copies):
+            if total <= self.max_size:
+                break
+            if copy != str(keep):
+                with contextlib.suppress(OSError):
+                    os.unlink(copy)
+                total -= size
+
+    def open_variant(self, path: Path, fs: os.stat_result, encoding: str) -> BinaryIO | None:
+        """Open the compressed copy of path, or return None to send path as it is."""
+        try:
+            variant = self.variant(path, fs, encoding)
+            return open(variant, "rb") if variant is not None else None
+        except OSError as error:
+            print(f"serve_files.py: could not compress {path}: {error}", file=sys.stderr)
+            return None
+
+    def compress(self, source: BinaryIO, output: BinaryIO, encoding: str) -> None:
+        if encoding == "zstd":
+            zstandard.ZstdCompressor(level=self.ZSTD_LEVEL).copy_stream(source, output)
+            return
+        with gzip.GzipFile(fileobj=output, mode="wb", compresslevel=self.GZIP_LEVEL, mtime=0) as compressed:
+            shutil.copyfileobj(source, compressed, 1 << 20)
+
+
+class RangeRequestHandler(http.server.SimpleHTTPRequestHandler):
+    """SimpleHTTPRequestHandler with resumable, zero-copy file transfers.
+
+    Files are answered by file_response(): ETags, conditional requests and
+    single "Range: bytes=" ranges, unless an If-Range validator no longer
+    matches, in which case the whole file is sent. File bodies go out
+    through os.sendfile() where the platform has it. With a compression
+    cache, clients that accept gzip or zstd get its compressed copy.
+    Directory listings are paged and streamed from a ListingCache.
+    """
+
+    extensions_map = {**http.server.SimpleHTTPRequestHandler.extensions_map, **EXTRA_TYPES}
+
+    def __init__(
+        self,
+        *args,
+        compression: CompressionCache | None = None,
+        listings: ListingCache | None = None,
+        **kwargs,
+    ):
+        self.compression = compression
+        self.listings = listings if listings is not None else ListingCache()
+        super().__init__(*args, **kwargs)
+
+    def send_head(self):  # type annotations in the base class vary by Python version
+        self.body_length = None
+        path = self.translate_path(self.path)
+        if os.path.isdir(path) or path.endswith("/"):
+            return super().send_head()
+        try:
+            f = open(path, "rb")
+        except OSError:
+            self.send_error(http.HTTPStatus.NOT_FOUND, "File not found")
+            return None
+
+        try:
+            fs = os.fstat(f.fileno())
+            content_type = self.guess_type(path)
+            vary, encoding, encoded = False, None, None
+            if self.compression is not None:
+                vary, encoding = self.compression.negotiate(self.headers, Path(path), content_type, fs.st_size)
+            variant = self.compression.open_variant(Path(path), fs, encoding) if encoding else None
+            if variant is not None:
+                f.close()
+                f = variant
+                encoded = encoding, os.fstat(f.fileno())
+            status, headers, offset, length = file_response(self.headers, fs, content_type, vary, encoded)
+            self.send_response(status)
+            for keyword, value in headers:
+                self.send_header(keyword, value)
+            self.end_headers()
+            if status not in (http.HTTPStatus.OK, http.HTTPStatus.PARTIAL_CONTENT):
+                f.close()
+                return None
+            f.seek(offset)
+            self.body_length = length
+            return f
+        except:
+            f.close()
+            raise
+
+    def list_directory(self, path):  # type annotations in the base class vary by Python version
+        """Stream one page of the listing of path; the connection is closed to end it."""
+        url = urlsplit(self.path)
+        try:
+            as_json, page, per_page = listing_request(url.query, self.headers)
+        except ValueError as error:
+            self.send_error(http.HTTPStatus.BAD_REQUEST, str(error))
+            return None
+        try:
+            entries = self.listings.entries(Path(path))
+        except OSError:
+            self.send_error(http.HTTPStatus.NOT_FOUND, "No permission to list directory")
+            return None
+
+        self.send_response(http.HTTPStatus.OK)
+        self.send_header("Content-type", "application/json" if as_json else "text/html; charset=utf-8")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        if self.command != "HEAD":
+            for chunk in listing_chunks(entries, url.path, as_json, page, per_page):
+                self.wfile.write(chunk)
+        return None
+
+    def copyfile(self, source: BinaryIO, outputfile) -> None:
+        """Send body_length bytes of source, with os.sendfile() when possible."""
+        remaining = getattr(self, "body_length", None)
+        if remaining is None:
+            # Directory listings and other in-memory bodies
+            super().copyfile(source, outputfile)
+            return
+        try:
+            in_fd = source.fileno()
+            out_fd = self.connection.fileno()
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            in_fd = out_fd = None
+        if in_fd is not None and hasattr(os, "sendfile") and outputfile is self.wfile:
+            outputfile.flush()
+            offset = source.tell()
+            while remaining > 0:
+                sent = os.sendfile(out_fd, in_fd, offset, min(remaining, SENDFILE_CHUNK))
+                if sent == 0:
+                    break
+                offset += sent
+                remaining -= sent
+            return
+        while remaining > 0:
+            data = source.read(min(remaining, 64 * 1024))
+            if not data:
+                break
+            outputfile.write(data)
+            remaining -= len(data)
+
+
 def single_file_handler(target: Path) -> type[http.server.SimpleHTTPRequestHandler]:
     """Create a handler that exposes only target, not all of its siblings."""
 
-    class SingleFileHandler(http.server.SimpleHTTPRequestHandler):
+    class SingleFileHandler(RangeRequestHandler):
         def send_head(self):  # type annotations in the base class vary by Python version
             request_path = unquote(urlsplit(self.path).path)
             if request_path not in ("/", f"/{target.name}"):
@@ -67,6 +547,383 @@ def single_file_handler(target: Path) -> type[http.server.SimpleHTTPRequestHandl
     return SingleFileHandler
 
 
+def translate_path(directory: Path, url_path: str) -> Path:
+    """Map a URL path below directory like SimpleHTTPRequestHandler.translate_path."""
+    path = Path(directory)
+    for word in posixpath.normpath(unquote(url_path)).split("/"):
+        if word and not os.path.dirname(word) and word not in (os.curdir, os.pardir):
+            path /= word
+    return path
+
+
+def guess_type(path: Path) -> str:
+    extra = EXTRA_TYPES.get(path.suffix.lower())
+    return extra or mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+
+
+class ListingEntry(NamedTuple):
+    name: str
+    is_dir: bool
+    is_symlink: bool
+    size: int | None
+    mtime: float | None
+
+
+class ListingCache:
+    """Sorted os.scandir() results of recently listed directories.
+
+    A directory is scanned again only when its mtime changes, which happens
+    whenever a name in it is added, removed or renamed; sizes and mtimes of
+    the entries are as of that scan. Up to capacity directories are kept,
+    least recently listed first out.
+    """
+
+    def __init__(self, capacity: int = 64):
+        self.capacity = capacity
+        self.scans: OrderedDict[Path, tuple[int, list[ListingEntry]]] = OrderedDict()
+        self.lock = threading.Lock()
+
+    def entries(self, directory: Path) -> list[ListingEntry]:
+        mtime_ns = os.stat(directory).st_mtime_ns
+        with self.lock:
+            cached = self.scans.get(directory)
+            if cached is not None and cached[0] == mtime_ns:
+                self.scans.move_to_end(directory)
+                return cached[1]
+
+        entries = self.scan(directory)
+        with self.lock:
+            self.scans[directory] = mtime_ns, entries
+            self.scans.move_to_end(directory)
+            while len(self.scans) > self.capacity:
+                self.scans.popitem(last=False)
+        return entries
+
+    @staticmethod
+    def scan(directory: Path) -> list[ListingEntry]:
+        entries = []
+        with os.scandir(directory) as iterator:
+            for entry in iterator:
+                try:
+                    fs = entry.stat()
+                    size, mtime = fs.st_size, fs.st_mtime
+                except OSError:
+                    # Dangling symlink
+                    size = mtime = None
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                entries.append(ListingEntry(entry.name, is_dir, entry.is_symlink(), size, mtime))
+        entries.sort(key=lambda entry: entry.name.lower())
+        return entries
+
+
+def listing_request(query: str, headers: email.message.Message) -> tuple[bool, int, int]:
+    """Parse "?page=&per_page=&format=" into (as JSON, page, entries per page).
+
+    JSON is also chosen by an Accept header asking for application/json
+    rather than text/html. Raises ValueError for malformed parameters.
+    """
+    parameters = parse_qs(query)
+    page = int(parameters.get("page", ["1"])[-1])
+    per_page = int(parameters.get("per_page", [str(LISTING_PAGE_SIZE)])[-1])
+    if page < 1 or not 1 <= per_page <= MAX_LISTING_PAGE_SIZE:
+        raise ValueError(f"page must be at least 1 and per_page between 1 and {MAX_LISTING_PAGE_SIZE}")
+    listing_format = parameters.get("format", [""])[-1]
+    if listing_format not in ("", "html", "json"):
+        raise ValueError(f"unknown listing format: {listing_format}")
+    if not listing_format:
+        accept = headers.get("Accept", "")
+        listing_format = "json" if "application/json" in accept and "text/html" not in accept else "html"
+    return listing_format == "json", page, per_page
+
+
+def listing_chunks(
+    entries: list[ListingEntry], url_path: str, as_json: bool, page: int, per_page: int
+) -> Iterator[bytes]:
+    """Yield one page of a directory listing as HTML or JSON, LISTING_CHUNK entries at a time.
+
+    The HTML keeps the format of SimpleHTTPRequestHandler, with links to the
+    neighbouring pages when the listing does not fit on one.
+    """
+    pages = max(1, -(-len(entries) // per_page))
+    first = (page - 1) * per_page
+    selected = entries[first : first + per_page]
+    batches = (selected[start : start + LISTING_CHUNK] for start in range(0, len(selected), LISTING_CHUNK))
+
+    if as_json:
+        head = {"path": unquote(url_path), "total": len(entries), "page": page, "per_page": per_page, "pages": pages}
+        yield (json.dumps(head)[:-1] + ', "entries": [').encode()
+        separator = ""
+        for batch in batches:
+            items = (
+                json.dumps(
+                    {
+                        "name": entry.name,
+                        "type": "directory" if entry.is_dir else "file",
+                        "symlink": entry.is_symlink,
+                        "size": entry.size,
+                        "mtime": entry.mtime,
+                    }
+                )
+                for entry in batch
+            )
+            yield (separator + ", ".join(items)).encode("utf-8", "surrogateescape")
+            separator = ", "
+        yield b"]}\n"
+        return
+
+    title = f"Directory listing for {html.escape(unquote(url_path), quote=False)}"
+    navigation = ""
+    if pages > 1:
+        links = [f"Entries {first + 1}-{first + len(selected)} of {len(entries)}"]
+        suffix = "" if per_page == LISTING_PAGE_SIZE else f"&amp;per_page={per_page}"
+        if page > 1:
+            links.insert(0, f'<a href="?page={page - 1}{suffix}">previous</a>')
+        if page < pages:
+            links.append(f'<a href="?page={page + 1}{suffix}">next</a>')
+        navigation = f"<p>{' | '.join(links)}</p>\n"
+    yield (
+        "<!DOCTYPE HTML>\n"
+        '<html lang="en">\n'
+        "<head>\n"
+        '<meta charset="utf-8">\n'
+        f"<title>{title}</title>\n</head>\n"
+        f"<body>\n<h1>{title}</h1>\n"
+        f"{navigation}<hr>\n<ul>\n"
+    ).encode()
+    for batch in batches:
+        lines = []
+        for entry in batch:
+            display_name = link_name = entry.name
+            if entry.is_dir:
+                display_name = link_name = f"{entry.name}/"
+            if entry.is_symlink:
+                display_name = f"{entry.name}@"
+            lines.append(
+                f'<li><a href="{quote(link_name, errors="surrogatepass")}">{html.escape(display_name, quote=False)}</a></li>\n'
+            )
+        yield "".join(lines).encode("utf-8", "surrogateescape")
+    yield f"</ul>\n<hr>\n{navigation}</body>\n</html>\n".encode()
+
+
+class AsyncFileServer:
+    """HTTP/1.1 file server running every connection on one asyncio event loop.
+
+    Answers the same requests as RangeRequestHandler (see file_response())
+    without a thread per connection. Connections are kept alive between
+    requests. At most max_transfers file bodies are sent at once, through
+    loop.sendfile(); a request waiting for a slot stops reading from its
+    connection, and every write waits for the socket buffer to drain, so
+    slow clients push back instead of growing server memory. Directory
+    listings are scanned off the loop and streamed in chunked encoding.
+    """
+
+    KEEPALIVE_TIMEOUT = 15.0
+    MAX_HEADER_SIZE = 64 * 1024
+    SERVER_VERSION = "serve_files.py asyncio"
+
+    def __init__(
+        self,
+        directory: Path,
+        single_file: Path | None = None,
+        max_transfers: int = DEFAULT_MAX_TRANSFERS,
+        compression: CompressionCache | None = None,
+        listings: ListingCache | None = None,
+    ):
+        self.directory = directory
+        self.single_file = single_file
+        self.max_transfers = max_transfers
+        self.compression = compression
+        self.listings = listings if listings is not None else ListingCache()
+        self.transfers: asyncio.Semaphore | None = None
+
+    async def start(self, bind: str, port: int) -> asyncio.Server:
+        self.transfers = asyncio.Semaphore(self.max_transfers)
+        return await asyncio.start_server(self.handle_connection, bind, port, limit=self.MAX_HEADER_SIZE)
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            keep_alive = True
+            while keep_alive:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), self.KEEPALIVE_TIMEOUT)
+                except asyncio.LimitOverrunError:
+                    await self.send_error(writer, http.HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, False)
+                    break
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError):
+                    break
+                keep_alive = await self.handle_request(head, writer)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+            with contextlib.suppress(ConnectionError):
+                await writer.wait_closed()
+
+    async def handle_request(self, head: bytes, writer: asyncio.StreamWriter) -> bool:
+        """Answer one request; return whether the connection stays open."""
+        request_line, _, header_block = head.partition(b"\r\n")
+        try:
+            method, target, version = request_line.decode("latin-1").split()
+            headers = http.client.parse_headers(io.BytesIO(header_block))
+        except (ValueError, http.client.HTTPException):
+            await self.send_error(writer, http.HTTPStatus.BAD_REQUEST, False)
+            return False
+
+        connection = headers.get("Connection", "").lower()
+        keep_alive = connection == "keep-alive" if version == "HTTP/1.0" else connection != "close"
+        if "Content-Length" in headers or "Transfer-Encoding" in headers:
+            # Request bodies are never read, so the stream cannot be reused
+            keep_alive = False
+
+        if method not in ("GET", "HEAD"):
+            status, length = await self.send_error(writer, http.HTTPStatus.NOT_IMPLEMENTED, keep_alive)
+        else:
+            url = urlsplit(target)
+            status, length = await self.respond(method, url, version == "HTTP/1.1", headers, writer, keep_alive)
+        self.log_request(writer, request_line, status, length)
+        return keep_alive
+
+    async def respond(
+        self,
+        method: str,
+        url: SplitResult,
+        chunked: bool,
+        headers: email.message.Message,
+        writer: asyncio.StreamWriter,
+        keep_alive: bool,
+    ) -> tuple[int, int]:
+        url_path = url.path
+        if self.single_file is not None:
+            if unquote(url_path) not in ("/", f"/{self.single_file.name}"):
+                return await self.send_error(writer, http.HTTPStatus.NOT_FOUND, keep_alive)
+            path = self.single_file
+        else:
+            path = translate_path(self.directory, url_path)
+
+        if path.is_dir():
+            if not url_path.endswith("/"):
+                await self.send_headers(
+                    writer,
+                    http.HTTPStatus.MOVED_PERMANENTLY,
+                    [
+                        ("Location", url._replace(scheme="", netloc="", path=f"{url_path}/").geturl()),
+                        ("Content-Length", "0"),
+                    ],
+                    keep_alive,
+                )
+                return http.HTTPStatus.MOVED_PERMANENTLY, 0
+            for index in ("index.html", "index.htm"):
+                if (path / index).is_file():
+                    path = path / index
+                    break
+            else:
+                return await self.send_listing(method, path, url, chunked, headers, writer, keep_alive)
+        elif url_path.endswith("/"):
+            return await self.send_error(writer, http.HTTPStatus.NOT_FOUND, keep_alive)
+
+        try:
+            f = open(path, "rb")
+        except OSError:
+            return await self.send_error(writer, http.HTTPStatus.NOT_FOUND, keep_alive)
+        with contextlib.ExitStack() as stack:
+            stack.enter_context(f)
+            fs = os.fstat(f.fileno())
+            content_type = guess_type(path)
+            vary, encoding, encoded = False, None, None
+            if self.compression is not None:
+                vary, encoding = self.compression.negotiate(headers, path, content_type, fs.st_size)
+            if encoding:
+                # Compressing a file for the first time takes a while; keep the loop serving
+                variant = await asyncio.to_thread(self.compression.open_variant, path, fs, encoding)
+                if variant is not None:
+                    f = stack.enter_context(variant)
+                    encoded = encoding, os.fstat(f.fileno())
+            status, response, offset, length = file_response(headers, fs, content_type, vary, encoded)
+            await self.send_headers(writer, status, response, keep_alive)
+            if method == "GET" and length:
+                async with self.transfers:
+                    await asyncio.get_running_loop().sendfile(writer.transport, f, offset, length)
+            return status, length
+
+    async def send_listing(
+        self,
+        method: str,
+        path: Path,
+        url: SplitResult,
+        chunked: bool,
+        headers: email.message.Message,
+        writer: asyncio.StreamWriter,
+        keep_alive: bool,
+    ) -> tuple[int, int]:
+        """Send one page of the listing of path, in chunked encoding unless the client predates it."""
+        try:
+            as_json, page, per_page = listing_request(url.query, headers)
+        except ValueError:
+            return await self.send_error(writer, http.HTTPStatus.BAD_REQUEST, keep_alive)
+        try:
+            # Scanning a huge directory takes a while; keep the loop serving
+            entries = await asyncio.to_thread(self.listings.entries, path)
+        except OSError:
+            return await self.send_error(writer, http.HTTPStatus.NOT_FOUND, keep_alive)
+
+        chunks = listing_chunks(entries, url.path, as_json, page, per_page)
+        response = [("Content-type", "application/json" if as_json else "text/html; charset=utf-8")]
+        if not chunked:
+            # A page is bounded by MAX_LISTING_PAGE_SIZE, so HTTP/1.0 clients get it in one piece
+            body = b"".join(chunks)
+            await self.send_headers(
+                writer, http.HTTPStatus.OK, [*response, ("Content-Length", str(len(body)))], keep_alive
+            )
+            if method == "GET":
+                writer.write(body)
+                await writer.drain()
+            return http.HTTPStatus.OK, len(body)
+
+        await self.send_headers(writer, http.HTTPStatus.OK, [*response, ("Transfer-Encoding", "chunked")], keep_alive)
+        length = 0
+        if method == "GET":
+            for chunk in chunks:
+                writer.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+                length += len(chunk)
+                await writer.drain()
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+        return http.HTTPStatus.OK, length
+
+    async def send_headers(
+        self, writer: asyncio.StreamWriter, status: http.HTTPStatus, headers: list[tuple[str, str]], keep_alive: bool
+    ) -> None:
+        lines = [
+            f"HTTP/1.1 {status.value} {status.phrase}",
+            f"Server: {self.SERVER_VERSION}",
+            f"Date: {email.utils.formatdate(usegmt=True)}",
+        ]
+        lines += [f"{keyword}: {value}" for keyword, value in headers]
+        lines.append(f"Connection: {'keep-alive' if keep_alive else 'close'}")
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1", "strict"))
+        await writer.drain()
+
+    async def send_error(
+        self, writer: asyncio.StreamWriter, status: http.HTTPStatus, keep_alive: bool
+    ) -> tuple[int, int]:
+        body = f"<html><body><h1>{status.value} {html.escape(status.phrase)}</h1></body></html>\n".encode()
+        response = [("Content-Type", "text/html;charset=utf-8"), ("Content-Length", str(len(body)))]
+        await self.send_headers(writer, status, response, keep_alive)
+        writer.write(body)
+        await writer.drain()
+        return status, len(body)
+
+    @staticmethod
+    def log_request(writer: asyncio.StreamWriter, request_line: bytes, status: int, length: int) -> None:
+        host = (writer.get_extra_info("peername") or ("-",))[0]
+        date = time.strftime("%d/%b/%Y %H:%M:%S")
+        request = request_line.decode("latin-1", "replace")
+        sys.stderr.write(f'{host} - - [{date}] "{request}" {int(status)} {length}\n')
+
+
 def make_server(
     bind: str,
     first_port: int,
@@ -83,6 +940,19 @@ def make_server(
     raise RuntimeError(f"no available port found from {first_port} through 65535")
 
 
+async def make_async_server(bind: str, first_port: int, file_server: AsyncFileServer) -> tuple[asyncio.Server, int]:
+    """Start file_server like make_server(), on the first free port from first_port."""
+    for port in range(first_port, 65536):
+        try:
+            return await file_server.start(bind, port), port
+        except OSError as error:
+            if error.errno != errno.EADDRINUSE:
+                raise
+            print(f"Port {port} is in use; trying {port + 1}...", file=sys.stderr)
+
+    raise RuntimeError(f"no available port found from {first_port} through 65535")
+
+
 def browser_host(bind: str) -> str:
     if bind in ("0.0.0.0", "::"):
         return socket.getfqdn() or socket.gethostname()
@@ -91,6 +961,40 @@ def browser_host(bind: str) -> str:
     return bind
 
 
+def announce(args: argparse.Namespace, port: int, url_path: str, description: str) -> None:
+    host = browser_host(args.bind)
+    url = f"http://{host}:{port}{url_path}"
+    print(f"Serving {description}")
+    print(f"Listening on {args.bind}:{port}")
+    print(f"Open: {url}")
+    if args.bind == DEFAULT_BIND:
+        print("Warning: this server is accessible from the network; press Ctrl-C when done.")
+    else:
+        print("Press Ctrl-C to stop.")
+
+
+async def serve_async(
+    args: argparse.Namespace, target: Path, url_path: str, description: str, compression: CompressionCache | None
+) -> int:
+    if target.is_file():
+        file_server = AsyncFileServer(target.parent, target, args.max_transfers, compression)
+    else:
+        file_server = AsyncFileServer(
+            target, max_transfers=args.max_transfers, compression=compression, listings=ListingCache()
+        )
+
+    try:
+        server, port = await make_async_server(args.bind, args.port, file_server)
+    except (OSError, RuntimeError) as error:
+        print(f"serve_files.py: could not start server: {error}", file=sys.stderr)
+        return 1
+
+    announce(args, port, url_path, description)
+    async with server:
+        await server.serve_forever()
+    return 0
+
+
 def main() -> int:
     args = parse_args()
     target = args.target.expanduser().resolve()
@@ -102,33 +1006,34 @@ def main() -> int:
         print(f"serve_files.py: target is not a regular file or directory: {target}", file=sys.stderr)
         return 2
 
+    compression = None
+    if args.compression:
+        compression = CompressionCache(args.cache_dir.expanduser(), args.cache_size * 1024 * 1024)
     if target.is_file():
-        handler = functools.partial(single_file_handler(target), directory=str(target.parent))
+        handler = functools.partial(single_file_handler(target), directory=str(target.parent), compression=compression)
         url_path = f"/{quote(target.name)}"
         description = f"file {target}"
     else:
         handler = functools.partial(
-            http.server.SimpleHTTPRequestHandler, directory=str(target)
+            RangeRequestHandler, directory=str(target), compression=compression, listings=ListingCache()
         )
         url_path = "/"
         description = f"directory {target}"
 
+    if args.async_mode:
+        try:
+            return asyncio.run(serve_async(args, target, url_path, description, compression))
+        except KeyboardInterrupt:
+            print("\nStopping server.")
+            return 0
+
     try:
         server, port = make_server(args.bind, args.port, handler)
     except (OSError, RuntimeError) as error:
         print(f"serve_files.py: could not start server: {error}", file=sys.stderr)
         return 1
 
-    host = browser_host(args.bind)
-    url = f"http://{host}:{port}{url_path}"
-    print(f"Serving {description}")
-    print(f"Listening on {args.bind}:{port}")
-    print(f"Open: {url}")
-    if args.bind == DEFAULT_BIND:
-        print("Warning: this server is accessible from the network; press Ctrl-C when done.")
-    else:
-        print("Press Ctrl-C to stop.")
-
+    announce(args, port, url_path, description)
     try:
         server.serve_forever()
     except KeyboardInterrupt:
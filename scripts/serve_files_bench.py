@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""Load-test serve_files.py, comparing the threaded server with --async mode."""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SERVER = Path(__file__).resolve().parent / "serve_files.py"
+MODES = {"threaded": [], "async": ["--async"]}
+SIZE_UNITS = {"": 1, "K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Compare throughput and latency of the serve_files.py server modes.")
+    parser.add_argument("--size", default="64M", help="size of the served file, e.g. 512K, 64M, 1G (default: 64M)")
+    parser.add_argument(
+        "--range-size", default="1M", help="bytes per request as a random Range; 0 fetches the whole file (default: 1M)"
+    )
+    parser.add_argument("-c", "--clients", type=int, default=64, help="concurrent client connections (default: 64)")
+    parser.add_argument("-d", "--duration", type=float, default=10.0, help="seconds to run each mode (default: 10)")
+    parser.add_argument(
+        "--modes", default=",".join(MODES), help=f"comma separated server modes (default: {','.join(MODES)})"
+    )
+    parser.add_argument("--max-transfers", type=int, help="passed to the --async server")
+    parser.add_argument(
+        "-p", "--port", type=int, default=8800, help="first port to try for the servers (default: 8800)"
+    )
+    parser.add_argument("--workdir", type=Path, help="directory for the served file (default: a temporary directory)")
+    args = parser.parse_args()
+
+    try:
+        args.size = parse_size(args.size)
+        args.range_size = parse_size(args.range_size)
+    except ValueError as error:
+        parser.error(str(error))
+    args.modes = [mode.strip() for mode in args.modes.split(",") if mode.strip()]
+    for mode in args.modes:
+        if mode not in MODES:
+            parser.error(f"unknown mode {mode!r}; choose from {', '.join(MODES)}")
+    if args.clients < 1 or args.duration <= 0:
+        parser.error("--clients and --duration must be positive")
+    return args
+
+
+def parse_size(text: str) -> int:
+    text = text.strip().upper().removesuffix("B")
+    unit = text[-1:] if text[-1:] in SIZE_UNITS else ""
+    try:
+        return int(float(text.removesuffix(unit)) * SIZE_UNITS[unit])
+    except ValueError:
+        raise ValueError(f"invalid size: {text!r}") from None
+
+
+def format_size(size: float) -> str:
+    for unit in ("B", "KiB", "MiB"):
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GiB"
+
+
+def write_file(path: Path, size: int) -> None:
+    if path.exists() and path.stat().st_size == size:
+        return
+    block = os.urandom(1 << 20)
+    with open(path, "wb") as f:
+        for offset in range(0, size, len(block)):
+            f.write(block[: size - offset])
+
+
+def start_server(mode: str, path: Path, args: argparse.Namespace) -> tuple[subprocess.Popen, int]:
+    command = [sys.executable, str(SERVER), str(path), "-b", "127.0.0.1", "-p", str(args.port), *MODES[mode]]
+    if mode == "async" and args.max_transfers:
+        command += ["--max-transfers", str(args.max_transfers)]
+    env = dict(os.environ, PYTHONUNBUFFERED="1")
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, env=env)
+    for line in process.stdout:
+        if line.startswith("Listening on "):
+            return process, int(line.rsplit(":", 1)[1])
+    process.wait()
+    raise RuntimeError(f"{mode} server exited with status {process.returncode} before listening")
+
+
+def process_status(pid: int) -> tuple[int, int]:
+    """Return the resident set size in bytes and thread count of pid."""
+    rss = threads = 0
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    rss = int(line.split()[1]) * 1024
+                elif line.startswith("Threads:"):
+                    threads = int(line.split()[1])
+    except OSError:
+        pass
+    return rss, threads
+
+
+class Client:
+    """One simulated user issuing back-to-back requests, reusing its connection when the server allows."""
+
+    def __init__(self, port: int, path: str, size: int, range_size: int, seed: int):
+        self.port = port
+        self.path = path
+        self.size = size
+        self.range_size = range_size
+        self.random = random.Random(seed)
+        self.reader: asyncio.StreamReader | None = None
+        self.writer: asyncio.StreamWriter | None = None
+        self.latencies: list[float] = []
+        self.bytes = 0
+        self.connects = 0
+        self.errors = 0
+
+    def request(self) -> bytes:
+        lines = [f"GET {self.path} HTTP/1.1", "Host: 127.0.0.1", "Connection: keep-alive"]
+        if 0 < self.range_size < self.size:
+            start = self.random.randrange(self.size - self.range_size + 1)
+            lines.append(f"Range: bytes={start}-{start + self.range_size - 1}")
+        return ("\r\n".join(lines) + "\r\n\r\n").encode()
+
+    async def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except ConnectionError:
+                pass
+        self.reader = self.writer = None
+
+    async def fetch(self) -> None:
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection("127.0.0.1", self.port, limit=1 << 20)
+            self.connects += 1
+        self.writer.write(self.request())
+        await self.writer.drain()
+        head = await self.reader.readuntil(b"\r\n\r\n")
+        status_line, *header_lines = head.decode("latin-1").split("\r\n")
+        headers = {}
+        for line in header_lines:
+            if ":" in line:
+                keyword, value = line.split(":", 1)
+                headers[keyword.strip().lower()] = value.strip()
+        status = int(status_line.split()[1])
+        if status not in (200, 206):
+            raise ConnectionError(f"unexpected status {status}")
+        length = int(headers["content-length"])
+        remaining = length
+        while remaining:
+            chunk = await self.reader.read(min(remaining, 1 << 20))
+            if not chunk:
+                raise ConnectionError("connection closed mid-body")
+            remaining -= len(chunk)
+        self.bytes += length
+        if status_line.startswith("HTTP/1.0") or headers.get("connection", "").lower() == "close":
+            await self.close()
+
+    async def run(self, deadline: float) -> None:
+        while time.monotonic() < deadline:
+            started = time.monotonic()
+            try:
+                await self.fetch()
+            except (OSError, asyncio.IncompleteReadError, ValueError, KeyError):
+                self.errors += 1
+                await self.close()
+                continue
+            self.latencies.append(time.monotonic() - started)
+        await self.close()
+
+
+async def sample_server(pid: int, samples: list[tuple[int, int]], interval: float = 0.2) -> None:
+    while True:
+        samples.append(process_status(pid))
+        await asyncio.sleep(interval)
+
+
+async def load(port: int, pid: int, path: str, args: argparse.Namespace) -> dict:
+    clients = [Client(port, path, args.size, args.range_size, seed) for seed in range(args.clients)]
+    samples: list[tuple[int, int]] = []
+    sampler = asyncio.create_task(sample_server(pid, samples))
+    started = time.monotonic()
+    await asyncio.gather(*(client.run(started + args.duration) for client in clients))
+    elapsed = time.monotonic() - started
+    sampler.cancel()
+
+    latencies = [latency for client in clients for latency in client.latencies]
+    if len(latencies) < 2:
+        latencies = (latencies or [0.0]) * 2
+    quantiles = statistics.quantiles(latencies, n=100)
+    return {
+        "requests": len(latencies),
+        "errors": sum(client.errors for client in clients),
+        "connects": sum(client.connects for client in clients),
+        "rate": len(latencies) / elapsed,
+        "throughput": sum(client.bytes for client in clients) / elapsed,
+        "p50": quantiles[49],
+        "p95": quantiles[94],
+        "p99": quantiles[98],
+        "rss": max((rss for rss, _ in samples), default=0),
+        "threads": max((threads for _, threads in samples), default=0),
+    }
+
+
+def bench_mode(mode: str, target: Path, args: argparse.Namespace) -> dict:
+    process, port = start_server(mode, target.parent, args)
+    try:
+        return asyncio.run(load(port, process.pid, f"/{target.name}", args))
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def report(results: dict[str, dict]) -> None:
+    print(
+        f"{'mode':<10} {'requests':>9} {'errors':>7} {'conns':>7} {'req/s':>9} {'throughput':>12} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'peak RSS':>10} {'threads':>8}"
+    )
+    for mode, result in results.items():
+        print(
+            f"{mode:<10} {result['requests']:>9} {result['errors']:>7} {result['connects']:>7} {result['rate']:>9.1f} "
+            f"{format_size(result['throughput']) + '/s':>12} {result['p50'] * 1000:>8.2f} {result['p95'] * 1000:>8.2f} "
+            f"{result['p99'] * 1000:>8.2f} {format_size(result['rss']):>10} {result['threads']:>8}"
+        )
+
+
+def main() -> int:
+    args = parse_args()
+    with tempfile.TemporaryDirectory() as temporary:
+        workdir = args.workdir or Path(temporary)
+        workdir.mkdir(parents=True, exist_ok=True)
+        target = workdir / "serve_files_bench.bin"
+        write_file(target, args.size)
+        print(
+            f"Serving {format_size(args.size)} to {args.clients} clients for {args.duration:g}s per mode, "
+            f"{format_size(args.range_size) + ' ranges' if 0 < args.range_size < args.size else 'whole file'} per request"
+        )
+        results = {}
+        for mode in args.modes:
+            try:
+                results[mode] = bench_mode(mode, target, args)
+            except RuntimeError as error:
+                print(f"serve_files_bench.py: {error}", file=sys.stderr)
+                return 1
+    report(results)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
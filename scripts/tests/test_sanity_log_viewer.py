@@ -0,0 +1,979 @@
+#!/usr/bin/env python3
+
+from __future__ import annotations
+
+import contextlib
+import gzip
+import http.client
+import http.server
+import io
+import json
+import os
+import random
+import re
+import runpy
+import subprocess
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+VIEWER = Path(__file__).resolve().parents[1] / 'sanity_log_viewer.py'
+BENCH = VIEWER.with_name('sanity_log_bench.py')
+CACHE_HOME = tempfile.TemporaryDirectory()
+
+
+def setUpModule() -> None:
+    os.environ['XDG_CACHE_HOME'] = CACHE_HOME.name
+
+
+def tearDownModule() -> None:
+    CACHE_HOME.cleanup()
+
+
+def load_viewer() -> dict:
+    return runpy.run_path(str(VIEWER), run_name='sanity_log_viewer_test')
+
+
+def write_master_log(run_dir: Path, line_count: int) -> Path:
+    log_file = run_dir / 'master_log.txt'
+    with open(log_file, 'w') as f:
+        for i in range(line_count):
+            f.write(f'{i} \x1b[1;32mINFO\x1b[0m line {i + 1} {"x" * (i % 7)}\n')
+    return log_file
+
+
+def create_run(base: Path, name: str = '20250825_130529', line_count: int = 10) -> Path:
+    run_dir = base / 'sanity' / name
+    run_dir.mkdir(parents=True)
+    (run_dir / 'components.txt').write_text('toolchain=1.2.3\n')
+    write_master_log(run_dir, line_count)
+    (run_dir / 'build_log.txt').write_text(
+        '1 \x1b[1;32mINFO\x1b[0m building\n'
+        '2 \x1b[1;31mERROR\x1b[0m compile timeout in foo.c\n'
+        'Total duration: 12.50s\n'
+    )
+    return run_dir
+
+
+def search(viewer, *args, **kwargs) -> list:
+    """Collect SanityLogViewer._search_files(), whose matches are streamed."""
+    return [(run, step, list(matches)) for run, step, matches in viewer._search_files(*args, **kwargs)]
+
+
+def capture(function, *args) -> str:
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        function(*args)
+    return output.getvalue()
+
+
+class LogParserTest(unittest.TestCase):
+    def test_fast_parse_agrees_with_the_two_step_parser(self) -> None:
+        parser = load_viewer()['LogParser']
+        lines = [
+            '194 \x1b[1;32mINFO\x1b[0m Flashing\n',
+            '12  \x1b[1;31mERROR\x1b[0m double space',
+            '12\ttab separated',
+            '12 ',
+            '12',
+            '12abc not a timestamp',
+            '\u0661\u0662 arabic-indic digits',
+            '    indented continuation \x1b[1;33mWARNING\x1b[0m',
+            '',
+        ]
+        for line in lines:
+            with self.subTest(line=line):
+                timestamp, content = parser.parse_log_line(line)
+                self.assertEqual(
+                    parser.parse(line), (timestamp, parser.extract_log_level(content), content)
+                )
+
+
+class LineIndexTest(unittest.TestCase):
+    def test_sampled_offsets_point_at_line_starts(self) -> None:
+        module = load_viewer()
+        with tempfile.TemporaryDirectory() as temporary:
+            run_dir = Path(temporary)
+            log_file = write_master_log(run_dir, 2500)
+            index = module['LineIndex'].open_for(log_file, stride=100)
+            lines = log_file.read_bytes().splitlines(keepends=True)
+
+            self.assertEqual(index.total_lines, 2500)
+            for line_number in (1, 99, 100, 101, 1234, 2500, 4000):
+                offset, sampled = index.locate(line_number)
+                self.assertLessEqual(sampled, line_number)
+                self.assertEqual(offset, sum(len(line) for line in lines[: sampled - 1]))
+
+    def test_stale_index_is_rebuilt_after_log_changes(self) -> None:
+        module = load_viewer()
+        with tempfile.TemporaryDirectory() as temporary:
+            run_dir = Path(temporary)
+            log_file = write_master_log(run_dir, 300)
+            module['LineIndex'].open_for(log_file, stride=100)
+            with open(log_file, 'a') as f:
+                f.write('300 appended\n')
+            os.utime(log_file, ns=(1, 1))
+
+            self.assertEqual(module['LineIndex'].open_for(log_file, stride=100).total_lines, 301)
+
+    def test_ranged_view_matches_linear_scan(self) -> None:
+        module = load_viewer()
+        with tempfile.TemporaryDirectory() as temporary:
+            base = Path(temporary)
+            run_dir = create_run(base, line_count=5000)
+            viewer = module['SanityLogViewer'](base / 'sanity')
+            log_file = run_dir / 'master_log.txt'
+            # Progress output: lone carriage returns end lines too, "\r\n" is one break
+            progress_log = run_dir / 'progress_log.txt'
+            progress_log.write_bytes(
+                b''.join(
+                    b'%d step\r%d half\r%d done\r\n' % (i, i, i) if i % 3 else b'%d plain\n' % i
+                    for i in range(1, 2000)
+                )
+            )
+            run_mtime = run_dir.stat().st_mtime_ns
+            logs = (log_file, progress_log)
+
+            expected = [capture(viewer._display_log_content, log, 4321, 4330, None) for log in logs]
+            module['LineIndex'].MIN_LOG_SIZE = 0
+            module['LineIndex'].DEFAULT_STRIDE = 100
+            indexed = [capture(viewer._display_log_content, log, 4321, 4330, None) for log in logs]
+
+            self.assertEqual(indexed, expected)
+            self.assertIn('line 4321 ', indexed[0])
+            self.assertTrue(indexed[1].startswith(' 1852 half\n'))
+            self.assertTrue(module['LineIndex'].path_for(log_file).exists())
+            self.assertEqual(run_dir.stat().st_mtime_ns, run_mtime)
+            self.assertEqual(list(run_dir.glob('*.idx')), [])
+
+    def test_pager_receives_formatted_lines_as_a_stream(self) -> None:
+        module = load_viewer()
+        with tempfile.TemporaryDirectory() as temporary:
+            base = Path(temporary)
+            run_dir = create_run(base, line_count=3)
+            viewer = module['SanityLogViewer'](base / 'sanity')
+            lines = viewer._format_log_for_pager(run_dir / 'master_log.txt', 'Title')
+
+            self.assertEqual(next(lines), 'Title')
+            self.assertEqual(
+                list(lines),
+                [
+                    '=' * 80,
+                    '',
+                    '\x1b[1;32mINFO\x1b[0m line 1 ',
+                    '    1 [INFO ] \x1b[1;32mINFO\x1b[0m line 2 x',
+                    '    2 [INFO ] \x1b[1;32mINFO\x1b[0m line 3 xx',
+                ],
+            )
+
+
+class ReverseLineReaderTest(unittest.TestCase):
+    def test_lines_come_back_in_reverse_text_mode_order(self) -> None:
+        module = load_viewer()
+        samples = [
+            b'',
+            b'\n',
+            b'single line without newline',
+            b'a\nb\n',
+            b'a\r\nprogress 1\rprogress 2\n\n\xc3\xa9t\xc3\xa9\nlast',
+            b''.join(b'%d line %s\n' % (i, b'y' * (i % 13)) for i in range(200)),
+        ]
+        with tempfile.TemporaryDirectory() as temporary:
+            log_file = Path(temporary) / 'build_log.txt'
+            for sample in samples:
+                log_file.write_bytes(sample)
+                with open(log_file, encoding='utf-8', errors='replace') as f:
+                    expected = [line.rstrip('\n') for line in f][::-1]
+                for block_size in (1, 7, 4096):
+                    with self.subTest(sample=sample[:20], block_size=block_size):
+                        reader = module['ReverseLineReader'](log_file, block_size)
+                        self.assertEqual(list(reader), expected)
+
+
+class CompressedLogTest(unittest.TestCase):
+    def test_random_reads_match_the_decompressed_data(self) -> None:
+        module = load_viewer()
+        reader = module['CompressedLogReader']
+        reader.SNAPSHOT_SPACING = 20_000
+        reader.MAX_SNAPSHOTS = 4
+        with tempfile.TemporaryDirectory() as temporary:
+            log_file = write_master_log(Path(temporary), 20000)
+            data = log_file.read_bytes()
+            single = log_file.with_name('single_log.txt.gz')
+            single.write_bytes(gzip.compress(data))
+            members = module['compress_log'](log_file, member_size=50_000)
+
+            rng = random.Random(0)
+            for compressed in (single, members):
+                with self.subTest(compressed=compressed.name), module['open_log'](compressed) as f:
+                    self.assertEqual(f.read(), data)
+                    for _ in range(100):
+                        offset, size = rng.randrange(len(data) + 10), rng.randrange(3000)
+                        f.seek(offset)
+                        self.assertEqual(f.read(size), data[offset : offset + size])
+                    self.assertEqual(f.seek(-10, os.SEEK_END), len(data) - 10)
+            with module['open_log'](members) as f:
+                f.read()
+                self.assertGreater(len(f.raw.member_checkpoints()), 5)
+
+    def test_commands_read_compressed_runs_like_plain_ones(self) -> None:
+        module = load_viewer()
+        module['LineIndex'].MIN_COMPRESSED_LOG_SIZE = 0
+        with tempfile.TemporaryDirectory() as temporary:
+            base = Path(temporary)
+            plain = create_run(base, '20250825_130529', line_count=3000)
+            archived = create_run(base, '20250826_090000', line_count=3000)
+            viewer = module['SanityLogViewer'](base / 'sanity')
+            capture(viewer.compress_run, '20250826_090000', '.gz', True)
+
+            self.assertEqual(
+                sorted(path.name for path in archived.iterdir()),
+                ['build_log.txt.gz', 'components.txt', 'master_log.txt.gz'],
+            )
+            viewer = module['SanityLogViewer'](base / 'sanity')
+            run = viewer._find_run('20250826_090000')
+            self.assertEqual(run.step_logs, ['build'])
+            self.assertEqual(run.step_analysis('build').duration, '12.50s')
+
+            def outputs(run_name: str) -> list:
+                return [
+                    capture(viewer.search_logs, run_name, 'timeout|line 2999 '),
+                    capture(viewer._display_log_content, viewer._find_run(run_name).master_log, 2500, 2502, None),
+                    capture(viewer.filter_by_log_level, run_name, 'ERROR', 'build'),
+                ]
+
+            self.assertEqual(outputs('20250826_090000'), outputs(plain.name))
+
+
+class StepAnalysisTest(unittest.TestCase):
+    def test_single_pass_collects_duration_result_and_status(self) -> None:
+        module = load_viewer()
+        with tempfile.TemporaryDirectory() as temporary:
+            log_file = Path(temporary) / 'dmtx_simple_log.txt'
+            log_file.write_text(
+                'Total duration: 1.00s\n'
+                '1 \x1b[1;32mINFO\x1b[0m Overall result: \x1b[1;31mFAIL\x1b[0m\n'
+                '2 \x1b[1;32mINFO\x1b[0m Overall result: FAIL total=12 failures=2 errors=1 '
+                'skipped=3, not_applicable=0, soundCardFailures=0\n'
+                + ''.join(f'{i} filler\n' for i in range(3, 40))
+                + 'Total duration: 364.01s\n'
+            )
+            analysis = module['StepAnalysis'].from_log(log_file)
+
+            self.assertEqual(analysis.duration, '364.01s')
+            self.assertEqual(analysis.duration_seconds, 364.01)
+            self.assertEqual(analysis.test_result['total'], 12)
+            self.assertEqual(analysis.test_result['skipped'], 3)
+            self.assertEqual(analysis.log_status, 'COMPLETED')
+            self.assertEqual(analysis.status, 'FAILED')
+
+    def test_status_falls_back_to_tail_phrases(self) -> None:
+        module = load_viewer()
+        with tempfile.TemporaryDirectory() as temporary:
+            log_file = Path(temporary) / 'build_log.txt'
+            log_file.write_text('done early\n' + 'x\n' * 20 + 'Compilation failed\n')
+            analysis = module['StepAnalysis'].from_log(log_file)
+
+            self.assertIsNone(analysis.duration)
+            self.assertEqual(analysis.status, 'FAILED')
+            self.assertEqual(module['StepAnalysis'].from_log(log_file.with_name('missing')).status, 'ERROR')
+
+    def test_logs_without_a_result_only_decode_a_bounded_tail(self) -> None:
+        module = load_viewer()
+        analysis_class = module['StepAnalysis']
+        analysis_class.MAX_TAIL_BYTES = 64 * 1024
+        with tempfile.TemporaryDirectory() as temporary:
+            log_file = Path(temporary) / 'flash_log.txt'
+            line = '1 \x1b[1;32mINFO\x1b[0m writing block to flash\n'
+            log_file.write_text(line * 20000 + 'Total duration: 8.00s\n')
+            module['Timings'].active = timings = module['Timings']()
+            try:
+                analysis = analysis_class.from_log(log_file)
+            finally:
+                module['Timings'].active = None
+
+            self.assertEqual(analysis.duration_seconds, 8.0)
+            self.assertIsNone(analysis.test_result)
+            self.assertLess(timings.files[0][3].lines, 20000 // 4)
+
+    def test_markers_beyond_the_tail_are_found_like_a_full_read(self) -> None:
+        module = load_viewer()
+        analysis_class = module['StepAnalysis']
+        analysis_class.MAX_TAIL_BYTES = 64 * 1024
+        analysis_class.FORWARD_BLOCK_SIZE = 4096
+        result = (
+            'Overall result: {} total=10 failures={} errors=0 skipped=0, '
+            'not_applicable=0, soundCardFailures=0\n'
+        )
+        with tempfile.TemporaryDirectory() as temporary:
+            log_file = Path(temporary) / 'test_log.txt'
+            line = '1 \x1b[1;32mINFO\x1b[0m running test\n'
+            log_file.write_text(
+                'Total duration: 1.00s\n'
+                + result.format('FAILED', 2)
+                + line * 5000
+                + result.format('PASSED', 0)
+                + 'Total duration: 9.50s\n'
+                + line * 5000
+            )
+            analysis = analysis_class.from_log(log_file)
+
+            self.assertEqual(analysis.test_result['failures'], 2)
+            self.assertEqual(analysis.duration_seconds, 9.5)
+            self.assertEqual(analysis.status, 'FAILED')
+
+
+class RunCatalogTest(unittest.TestCase):
+    def test_unchanged_runs_are_served_from_the_catalog(self) -> None:
+        module = load_viewer()
+        with tempfile.TemporaryDirectory() as temporary:
+            base = Path(temporary)
+            run_dir = create_run(base)
+
+            def first_run(**kwargs):
+                viewer = module['SanityLogViewer'](base / 'sanity', **kwargs)
+                run = viewer.runs[0]
+                run.components, run.step_logs
+                viewer.close()
+                return run
+
+            first_run()
+            mtime = run_dir.stat().st_mtime_ns
+            (run_dir / 'components.txt').write_text('toolchain=9.9.9\n')
+            os.utime(run_dir, ns=(mtime, mtime))
+            self.assertEqual(first_run().components, {'toolchain': '1.2.3'})
+
+            (run_dir / 'flash_log.txt').write_text('1 flashing\n')
+            refreshed = first_run()
+            self.assertEqual(refreshed.components, {'toolchain': '9.9.9'})
+            self.assertEqual(refreshed.step_logs, ['build', 'flash'])
+            self.assertEqual(first_run(use_cache=False).step_logs, ['build', 'flash'])
+
+    def test_metadata_is_loaded_only_for_runs_that_are_used(self) -> None:
+        module = load_viewer()
+        with tempfile.TemporaryDirectory() as temporary:
+            base = Path(temporary)
+            create_run(base, '20250825_130529')
+            create_run(base, '20250826_090000')
+            viewer = module['SanityLogViewer'](base / 'sanity')
+            run = viewer._find_run('20250826')
+
+            self.assertEqual(run.name, '20250826_090000')
+            self.assertEqual(run.step_logs, ['build'])
+            self.assertIs(run.step_analysis('build'), run.step_analysis('build'))
+            self.assertIsNone(run.step_analysis('missing'))
+            self.assertNotIn('step_logs', vars(viewer.runs[1]))
+            self.assertNotIn('components', vars(viewer.runs[1]))
+
+
+class LogFollowerTest(unittest.TestCase):
+    def test_poll_returns_only_new_complete_lines_including_new_steps(self) -> None:
+        module = load_viewer()
+        with tempfile.TemporaryDirectory() as temporary:
+            base = Path(temporary)
+            run_dir = create_run(base, line_count=5)
+            run = module['SanityRun'](run_dir)
+            follower = module['LogFollower'](run, levels=['error', 'INFO'])
+            self.assertEqual(list(follower.poll()), [])
+
+            with open(run_dir / 'master_log.txt', 'a') as f:
+                f.write('5 \x1b[1;31mERROR\x1b[0m appended\n6 \x1b[1;36mDEBUG\x1b[0m hidden\n')
+            (run_dir / 'flash_log.txt').write_text('1 \x1b[1;32mINFO\x1b[0m flash sta')
+            self.assertEqual(
+                list(follower.poll()), [('master', '5 \x1b[1;31mERROR\x1b[0m appended')]
+            )
+
+            with open(run_dir / 'flash_log.txt', 'a') as f:
+                f.write('rted\n')
+            self.assertEqual(
+                list(follower.poll()), [('flash', '1 \x1b[1;32mINFO\x1b[0m flash started')]
+            )
+
+            (run_dir / 'flash_log.txt').write_text('1 \x1b[1;31mERROR\x1b[0m rerun\n')
+            self.assertEqual(
+                list(follower.poll()), [('flash', '1 \x1b[1;31mERROR\x1b[0m rerun')]
+            )
+
+    def test_watcher_returns_after_the_poll_interval_without_changes(self) -> None:
+        module = load_viewer()
+        with tempfile.TemporaryDirectory() as temporary:
+            watcher = module['DirectoryWatcher'](Path(temporary), poll_interval=0.05)
+            try:
+                started = time.monotonic()
+                self.assertFalse(watcher.wait())
+                elapsed = time.monotonic() - started
+            finally:
+                watcher.close()
+
+            self.assertGreaterEqual(elapsed, 0.05)
+            self.assertLess(elapsed, 2)
+
+    def test_watcher_reports_a_log_being_appended_to(self) -> None:
+        module = load_viewer()
+        with tempfile.TemporaryDirectory() as temporary:
+            log_file = Path(temporary) / 'build_log.txt'
+            log_file.write_text('1 started\n')
+            watcher = module['DirectoryWatcher'](Path(temporary), poll_interval=10)
+            if not watcher.uses_inotify:
+                self.skipTest('inotify is not available')
+
+            def append() -> None:
+                with open(log_file, 'a') as f:
+                    f.write('2 still running\n')
+
+            timer = threading.Timer(0.05, append)
+            try:
+                started = time.monotonic()
+                timer.start()
+                self.assertTrue(watcher.wait())
+                elapsed = time.monotonic() - started
+            finally:
+                timer.join()
+                watcher.close()
+
+            self.assertLess(elapsed, 5)
+
+
+def write_step_log(run_dir: Path, step: str, duration: float, failures: int = 0) -> None:
+    (run_dir / f'{step}_log.txt').write_text(
+        f'1 \x1b[1;32mINFO\x1b[0m Overall result: {"FAIL" if failures else "PASS"} total=10 '
+        f'failures={failures} errors=0 skipped=1, not_applicable=0, soundCardFailures=0\n'
+        f'Total duration: {duration:.2f}s\n'
+    )
+
+
+class StepStatsStoreTest(unittest.TestCase):
+    def test_store_persists_rows_and_only_reanalyzes_changed_runs(self) -> None:
+        module = load_viewer()
+        with tempfile.TemporaryDirectory() as temporary:
+            base = Path(temporary)
+            for day in range(1, 4):
+                run_dir = create_run(base, f'202509{day:02d}_120000')
+                write_step_log(run_dir, 'dmtx_simple', 100.0 * day, failures=int(day == 3))
+
+            viewer = module['SanityLogViewer'](base / 'sanity')
+            self.assertEqual(viewer.step_stats.refresh(viewer.runs), 3)
+            viewer.close()
+
+            viewer = module['SanityLogViewer'](base / 'sanity')
+            self.assertEqual(viewer.step_stats.refresh(viewer.runs), 0)
+            with open(base / 'sanity' / '20250903_120000' / 'master_log.txt', 'a') as f:
+                f.write('99 still running\n')
+            self.assertEqual(viewer.step_stats.refresh(viewer.runs), 1)
+
+            rows = list(viewer.step_stats.rows(['20250903_120000']))
+            self.assertEqual(len(viewer.step_stats), 6)
+            self.assertEqual(
+                rows[1],
+                {
+                    'run': '20250903_120000',
+                    'step': 'dmtx_simple',
+                    'duration': 300.0,
+                    'total': 10,
+                    'failures': 1,
+                    'errors': 0,
+                    'skipped': 1,
+                    'status': 'FAILED',
+                },
+            )
+            self.assertEqual(rows[0]['total'], None)
+            self.assertEqual(
+                viewer.step_stats.durations_by_step(['20250901_120000', '20250903_120000']),
+                {'build': [12.5, 12.5], 'dmtx_simple': [100.0, 300.0]},
+            )
+
+    def test_trend_flags_steps_slower_than_their_rolling_baseline(self) -> None:
+        module = load_viewer()
+        trend = module['SanityLogViewer']._step_trend(
+            'dmtx_simple', [100.0, None, 102.0, 98.0, 100.0, 150.0], baseline_runs=3
+        )
+
+        self.assertEqual(trend['runs'], 5)
+        self.assertEqual(trend['baseline'], 100.0)
+        self.assertAlmostEqual(trend['change'], 50.0)
+        self.assertEqual(trend['p50'], 100.0)
+        self.assertEqual(sum(1 for change in trend['changes'] if change > 20), 1)
+
+
+class CompareTest(unittest.TestCase):
+    def test_step_durations_are_compared_with_the_previous_runs_median(self) -> None:
+        module = load_viewer()
+        with tempfile.TemporaryDirectory() as temporary:
+            base = Path(temporary)
+            for day, duration in enumerate([100.0, 104.0, 98.0, 150.0], 1):
+                run_dir = create_run(base, f'202509{day:02d}_120000')
+                write_step_log(run_dir, 'dmtx_simple', duration, failures=int(day == 4))
+            viewer = module['SanityLogViewer'](base / 'sanity')
+
+            output = capture(viewer.compare_with_baseline, '20250904', 3, 10.0)
+            self.assertIn('Baseline runs: 20250903_120000, 20250902_120000, 20250901_120000', output)
+            self.assertRegex(output, r'dmtx_simple +100\.00s +150\.00s +\+50\.00s +\+50\.0%  SLOWER')
+            self.assertIn('dmtx_simple: failures 0 -> 1', output)
+            self.assertIn('1 step(s) slower than baseline', output)
+
+            output = capture(viewer.compare_runs, '20250901', '20250902', 5.0)
+            self.assertRegex(output, r'dmtx_simple +100\.00s +104\.00s +\+4\.00s +\+4\.0%\n')
+            self.assertIn('No test count differences found.', output)
+
+
+class LogSearcherTest(unittest.TestCase):
+    def test_mmap_scan_matches_line_by_line_scan(self) -> None:
+        module = load_viewer()
+        with tempfile.TemporaryDirectory() as temporary:
+            log_file = Path(temporary) / 'build_log.txt'
+            log_file.write_bytes(
+                b'1 \x1b[1;31mERROR\x1b[0m timeout\r\n'
+                b'2 progress 10%\rprogress 100% timeout\n'
+                b'no timestamp ERROR here\n'
+                b'3 ERROR:\n'
+                b'timeout on the next line\n'
+                b'4 \xff broken bytes error\n'
+                b'5 last line without newline ERROR\n'
+                b'6 temperature 25\xc2\xb0C\n'
+                b'7 caf\xc3\xa9 opened, na\xc3\xafve retry\n'
+                b'8 \xe2\x84\xaaelvin'
+            )
+            patterns = [
+                (pattern, re.IGNORECASE)
+                for pattern in ('error', 'error.*timeout', 'timeout$', '^\\d', 'r:\\s+t', '100%', 'kelvin')
+            ]
+            patterns += [(pattern, 0) for pattern in ('25.C', 'caf\\w', 'na.ve', 'caf[^x] ', 'f\\W')]
+            for pattern, flags in patterns:
+                searcher = module['LogSearcher'](re.compile(pattern, flags))
+                with self.subTest(pattern=pattern):
+                    self.assertEqual(
+                        [match[1:] for match in searcher.scan(log_file)],
+                        [match[1:] for match in searcher._scan_lines(log_file)],
+                    )
+
+    def test_mmap_scan_reports_physical_line_numbers(self) -> None:
+        module = load_viewer()
+        with tempfile.TemporaryDirectory() as temporary:
+            log_file = Path(temporary) / 'build_log.txt'
+            log_file.write_text('1 a\n2 b\n3 needle\n4 c\n5 needle\n')
+            searcher = module['LogSearcher'](re.compile('needle'))
+
+            self.assertIsNotNone(searcher.byte_regex)
+            self.assertEqual(
+                list(searcher.scan(log_file)), [(3, 3, 'needle'), (5, 5, 'needle')]
+            )
+
+    def test_chunked_scan_merges_to_the_whole_file_result(self) -> None:
+        module = load_viewer()
+        with tempfile.TemporaryDirectory() as temporary:
+            log_file = write_master_log(Path(temporary), 3000)
+            searcher = module['LogSearcher'](re.compile('line 1[0-9]*5 '))
+            searcher.MIN_CHUNK_SIZE = 4096
+            chunks = searcher.plan_chunks(log_file, jobs=4)
+
+            merged = []
+            lines_before = 0
+            for start, end in chunks:
+                matches, line_count = searcher.scan_chunk(log_file, start, end)
+                merged.extend((lines_before + line, ts, content) for line, ts, content in matches)
+                lines_before += line_count
+
+            self.assertEqual(len(chunks), 4)
+            self.assertEqual(merged, list(searcher.scan(log_file)))
+
+
+class FilterTest(unittest.TestCase):
+    def test_levels_and_timestamp_window_are_applied_in_one_pass(self) -> None:
+        module = load_viewer()
+        with tempfile.TemporaryDirectory() as temporary:
+            log_file = Path(temporary) / 'build_log.txt'
+            log_file.write_text(
+                '1 \x1b[1;31mERROR\x1b[0m early failure\n'
+                '5 \x1b[1;33mWARNING\x1b[0m retrying\n'
+                '6 \x1b[1;32mINFO\x1b[0m progress\n'
+                'continuation \x1b[1;31mERROR\x1b[0m without timestamp\n'
+                '9 \x1b[1;31mERROR\x1b[0m late failure\n'
+            )
+            log_filter = module['LogFilter'](['error', 'WARNING'], since=2)
+            self.assertEqual(
+                [timestamp for timestamp, _, _ in log_filter.scan(log_file)], [5, 9]
+            )
+            self.assertEqual(len(module['LogFilter'](['ERROR']).scan_all(log_file)), 3)
+
+    def test_single_process_search_and_filter_stream_from_the_scan(self) -> None:
+        module = load_viewer()
+        with tempfile.TemporaryDirectory() as temporary:
+            base = Path(temporary)
+            run_dir = create_run(base)
+            viewer = module['SanityLogViewer'](base / 'sanity')
+            log_file = run_dir / 'build_log.txt'
+
+            [(_, selected)] = viewer._filter_files([('build', log_file)], module['LogFilter'](['ERROR']), 1)
+            searcher = module['LogSearcher'](re.compile('timeout'))
+            [(_, _, matches)] = viewer._scan_files([(viewer.runs[0], 'build', log_file)], searcher, 1)
+
+            self.assertNotIsInstance(selected, list)
+            self.assertNotIsInstance(matches, list)
+            self.assertEqual(list(selected), [(2, 'ERROR', '\x1b[1;31mERROR\x1b[0m compile timeout in foo.c')])
+            self.assertEqual([line for line, _, _ in matches], [2])
+
+    def test_all_steps_filter_is_the_same_with_a_process_pool(self) -> None:
+        with tempfile.TemporaryDirectory() as temporary:
+            run_dir = create_run(Path(temporary))
+            (run_dir / 'flash_log.txt').write_text('3 \x1b[1;31mERROR\x1b[0m flash\n')
+
+            def run_filter(jobs: int) -> str:
+                return subprocess.run(
+                    ['python3', str(VIEWER), '--sanity-dir', str(run_dir.parent), 'filter', run_dir.name,
+                     '--level', 'ERROR,INFO', '--all-steps', '--jobs', str(jobs)],
+                    text=True,
+                    capture_output=True,
+                    check=True,
+                ).stdout
+
+            output = run_filter(1)
+            self.assertEqual(run_filter(2), output)
+            self.assertIn('=== flash log (1 messages) ===', output)
+            self.assertIn('Found 13 ERROR, INFO messages in 3 logs.', output)
+
+
+class SearchIndexTest(unittest.TestCase):
+    def test_only_literal_patterns_are_answered_from_the_index(self) -> None:
+        index = load_viewer()['SearchIndex']
+        self.assertEqual(index.required_literals('ERROR.*Timeout'), ['error', 'timeout'])
+        self.assertEqual(index.required_literals('foo.c'), None)
+        self.assertEqual(index.required_literals('time'), ['time'])
+        self.assertEqual(index.required_literals('12345'), None)
+        self.assertEqual(index.required_literals('timeout$'), None)
+
+    def test_indexed_search_matches_scan_and_ignores_stale_indexes(self) -> None:
+        module = load_viewer()
+        index_class = module['SearchIndex']
+        index_class.MAX_CANDIDATE_RATIO = 1.0
+        with tempfile.TemporaryDirectory() as temporary:
+            run_dir = create_run(Path(temporary), line_count=300)
+            viewer = module['SanityLogViewer'](run_dir.parent)
+            run = viewer.runs[0]
+            targets = [
+                (run, 'build', run.get_step_log_path('build')),
+                (run, 'master', run.master_log),
+            ]
+            index_class.build(run)
+
+            for pattern in ('timeout', 'ERROR.*foo', 'line 12', 'buil', 'x.*xxxxxx'):
+                regex = re.compile(pattern, re.IGNORECASE)
+                literals = index_class.required_literals(pattern)
+                with self.subTest(pattern=pattern):
+                    self.assertIsNotNone(
+                        index_class.load(run).search(regex, literals)
+                    )
+                    self.assertEqual(
+                        search(viewer, targets, regex),
+                        search(viewer, targets, regex, use_index=False),
+                    )
+
+            with open(run.get_step_log_path('build'), 'a') as f:
+                f.write('3 another timeout\n')
+            self.assertIsNone(index_class.load(run))
+            self.assertEqual(len(search(viewer, targets, re.compile('timeout'))[0][2]), 2)
+
+    def test_long_tokens_and_literals_match_a_scan(self) -> None:
+        module = load_viewer()
+        index_class = module['SearchIndex']
+        index_class.MAX_CANDIDATE_RATIO = 1.0
+        index_class.MAX_PENDING_POSTINGS = 3
+        identifier = 'flash_' + 'bank_' * 20 + 'checksum_mismatch'
+        with tempfile.TemporaryDirectory() as temporary:
+            run_dir = create_run(Path(temporary), line_count=50)
+            with open(run_dir / 'build_log.txt', 'a') as f:
+                f.write(f'4 \x1b[1;31mERROR\x1b[0m {identifier} at 0x{"ab" * 40}\n')
+                f.write('5 \x1b[1;32mINFO\x1b[0m checksum ok\n')
+            viewer = module['SanityLogViewer'](run_dir.parent)
+            run = viewer.runs[0]
+            targets = [
+                (run, 'build', run.get_step_log_path('build')),
+                (run, 'master', run.master_log),
+            ]
+            index_class.build(run)
+            index = index_class.load(run)
+            self.assertGreater(len(index.tokens['line']), 1)
+            regex = re.compile('line')
+            self.assertEqual(
+                search(viewer, targets, regex),
+                search(viewer, targets, regex, use_index=False),
+            )
+
+            for pattern in ('checksum_mismatch', 'bank_bank', 'abab', 'ERROR.*checksum', identifier):
+                regex = re.compile(pattern, re.IGNORECASE)
+                with self.subTest(pattern=pattern):
+                    indexed = search(viewer, targets, regex)
+                    self.assertEqual(indexed, search(viewer, targets, regex, use_index=False))
+                    self.assertEqual(len(indexed[0][2]), 1)
+            self.assertIsNone(index.candidates(index_class.required_literals(identifier)))
+
+
+class ErrorSignaturesTest(unittest.TestCase):
+    def test_lines_differing_in_numbers_paths_and_hashes_share_a_template(self) -> None:
+        signatures = load_viewer()['ErrorSignatures']
+        self.assertEqual(
+            signatures.normalize('\x1b[1;31mERROR\x1b[0m read 0x1f00 from /dev/ttyUSB3 in 12ms (3fa9c2e1)'),
+            'ERROR read <hex> from <path> in <n>ms (<hash>)',
+        )
+        self.assertEqual(
+            signatures.normalize('ERROR read 0xbeef from C:\\tmp\\a.bin in 7ms (deadbeef99)'),
+            'ERROR read <hex> from <path> in <n>ms (<hash>)',
+        )
+
+    def test_new_templates_are_reported_for_the_latest_run(self) -> None:
+        module = load_viewer()
+        with tempfile.TemporaryDirectory() as temporary:
+            base = Path(temporary)
+            create_run(base, '20250825_130529')
+            latest = create_run(base, '20250826_090000')
+            with open(latest / 'build_log.txt', 'a') as f:
+                f.write('3 \x1b[1;31mFATAL\x1b[0m linker crashed at 0x1234\n')
+                f.write('4 \x1b[1;31mFATAL\x1b[0m linker crashed at 0x5678\n')
+
+            viewer = module['SanityLogViewer'](base / 'sanity')
+            output = capture(viewer.show_signatures)
+            viewer.close()
+            self.assertIn('2 template(s), 1 new', output)
+            self.assertIn('FATAL linker crashed at <hex>', output.split('New in 20250826_090000:')[1])
+            self.assertNotIn('compile timeout', output.split('New in')[1])
+
+            viewer = module['SanityLogViewer'](base / 'sanity')
+            steps = viewer.runs[0].error_signatures
+            self.assertEqual(sorted(count for _, count in steps['build'].values()), [1, 2])
+
+
+class SearchCommandTest(unittest.TestCase):
+    def test_parallel_all_runs_search_matches_sequential_output(self) -> None:
+        with tempfile.TemporaryDirectory() as temporary:
+            base = Path(temporary)
+            create_run(base, '20250825_130529')
+            create_run(base, '20250826_090000')
+
+            def search(*args: str) -> str:
+                return subprocess.run(
+                    ['python3', str(VIEWER), '--sanity-dir', str(base / 'sanity'), 'search', *args],
+                    text=True,
+                    capture_output=True,
+                    check=True,
+                ).stdout
+
+            sequential = search('--all-runs', 'timeout|line 3 ')
+            self.assertEqual(search('--all-runs', 'timeout|line 3 ', '--jobs', '3'), sequential)
+            self.assertIn('=== 20250826_090000 / build log (1 matches) ===', sequential)
+            self.assertIn('Total matches: 4 in 2 run(s)', sequential)
+
+
+class OutputFormatTest(unittest.TestCase):
+    def test_json_and_ndjson_records(self) -> None:
+        with tempfile.TemporaryDirectory() as temporary:
+            base = Path(temporary)
+            create_run(base, '20250825_130529')
+
+            def run(*args: str) -> str:
+                return subprocess.run(
+                    ['python3', str(VIEWER), '--sanity-dir', str(base / 'sanity'), *args],
+                    text=True,
+                    capture_output=True,
+                    check=True,
+                ).stdout
+
+            records = [json.loads(line) for line in run('search', '20250825_130529', 'timeout', '--format', 'ndjson').splitlines()]
+            self.assertEqual([record['type'] for record in records], ['match', 'total'])
+            self.assertEqual(records[0]['step'], 'build')
+            self.assertEqual(records[1]['matches'], 1)
+
+            summary = json.loads(run('summary', '20250825_130529', '--format', 'json'))
+            self.assertEqual(summary[0]['type'], 'step')
+            self.assertEqual(summary[0]['duration_seconds'], 12.5)
+            self.assertEqual(json.loads(run('show', 'missing', '--format', 'json')), [
+                {'type': 'error', 'message': 'Run "missing" not found.'}
+            ])
+
+
+class LogServiceTest(unittest.TestCase):
+    def test_requests_share_cached_runs_and_see_log_changes(self) -> None:
+        module = load_viewer()
+        with tempfile.TemporaryDirectory() as temporary:
+            run_dir = create_run(Path(temporary))
+            service = module['LogService'](run_dir.parent, module['RunCache'](None, capacity=4))
+
+            def get(path: str, **query: str) -> tuple:
+                body = io.StringIO()
+                status, _ = service.handle(path, query, body)
+                return status, [json.loads(line) for line in body.getvalue().splitlines()]
+
+            status, records = get('/runs/20250825_130529/summary')
+            self.assertEqual(status, 200)
+            self.assertEqual(records[0]['duration_seconds'], 12.5)
+            runs = service.run_cache.stats()
+            self.assertEqual((runs['hits'], runs['misses']), (0, 1))
+
+            with open(run_dir / 'build_log.txt', 'a') as f:
+                f.write('Total duration: 20.00s\n')
+            status, records = get('/runs/20250825_130529/summary')
+            self.assertEqual(records[0]['duration_seconds'], 20.0)
+            self.assertEqual(service.run_cache.stats()['hits'], 1)
+
+            status, records = get('/runs/20250825_130529/view', lines='3:', step='build')
+            self.assertEqual([record['line'] for record in records], [3, 4])
+            self.assertEqual(get('/runs/missing')[0], 404)
+            self.assertEqual(get('/runs/20250825_130529/search', pattern='(')[0], 400)
+            self.assertEqual(service._view_range('5:'), '5:10004')
+
+    def test_concurrent_requests_share_one_scan_and_the_catalog_is_saved(self) -> None:
+        module = load_viewer()
+        with tempfile.TemporaryDirectory() as temporary:
+            base = Path(temporary)
+            for day in range(1, 9):
+                create_run(base, f'202509{day:02d}_000000')
+            sanity_dir = base / 'sanity'
+            catalog = module['RunCatalog'](sanity_dir)
+            run_cache = module['RunCache'](catalog)
+            service = module['LogService'](sanity_dir, run_cache)
+            failures = []
+
+            def worker(index: int) -> None:
+                try:
+                    for run in range(1, 9):
+                        body = io.StringIO()
+                        status, _ = service.handle(f'/runs/202509{run:02d}_000000/summary', {}, body)
+                        if status != 200:
+                            failures.append(body.getvalue())
+                except Exception as error:  # surfaced by the assertion below
+                    failures.append(repr(error))
+
+            with mock.patch.object(os, 'scandir', wraps=os.scandir) as scandir:
+                threads = [threading.Thread(target=worker, args=(index,)) for index in range(8)]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+                scans = [call for call in scandir.call_args_list if call.args == (sanity_dir,)]
+            self.assertEqual(failures, [])
+            self.assertLessEqual(len(scans), 8)
+            self.assertEqual(len(catalog.entries), 8)
+
+            create_run(base, '20250909_000000')
+            status, _ = service.handle('/runs/20250909_000000', {}, io.StringIO())
+            self.assertEqual(status, 200)
+
+            viewer = module['SanityLogViewer'](sanity_dir)
+            viewer.catalog = catalog
+            server_class = module['http'].server.ThreadingHTTPServer
+            with mock.patch.object(server_class, 'serve_forever', side_effect=KeyboardInterrupt):
+                capture(viewer.serve, '127.0.0.1', 0)
+            self.assertEqual(len(json.loads(catalog.catalog_file.read_text())['runs']), 9)
+
+    def test_large_responses_are_streamed_in_chunks(self) -> None:
+        module = load_viewer()
+        module['ChunkedResponse'].BUFFER_SIZE = 1024
+        module['LogServiceHandler'].log_message = lambda *args: None
+        with tempfile.TemporaryDirectory() as temporary:
+            run_dir = create_run(Path(temporary), line_count=500)
+            server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), module['LogServiceHandler'])
+            server.service = module['LogService'](run_dir.parent, module['RunCache'](None))
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            self.addCleanup(server.server_close)
+            self.addCleanup(server.shutdown)
+            connection = http.client.HTTPConnection('127.0.0.1', server.server_port, timeout=5)
+            self.addCleanup(connection.close)
+
+            connection.request('GET', f'/runs/{run_dir.name}/view?format=json')
+            response = connection.getresponse()
+            self.assertEqual(response.status, 200)
+            self.assertEqual(response.getheader('Transfer-Encoding'), 'chunked')
+            self.assertEqual(response.getheader('Content-Type'), 'application/json')
+            self.assertEqual(len(json.loads(response.read())), 500)
+
+            connection.request('GET', '/runs/missing')
+            response = connection.getresponse()
+            self.assertEqual(response.status, 404)
+            self.assertIsNotNone(response.getheader('Content-Length'))
+            self.assertEqual(json.loads(response.read())['type'], 'error')
+
+
+class BenchGeneratorTest(unittest.TestCase):
+    def test_generated_runs_are_understood_by_the_viewer(self) -> None:
+        bench = runpy.run_path(str(BENCH), run_name='sanity_log_bench_test')
+        self.assertEqual(bench['parse_size']('10M'), 10 << 20)
+        with tempfile.TemporaryDirectory() as temporary:
+            sanity_dir = Path(temporary) / 'sanity'
+            names = bench['generate_sanity_dir'](sanity_dir, 256 * 1024, runs=2, steps=10)
+            self.assertEqual(len(names), 2)
+            run_dir = sanity_dir / names[-1]
+            self.assertGreater(sum(f.stat().st_size for f in run_dir.iterdir()), 100_000)
+
+            viewer = load_viewer()['SanityLogViewer'](sanity_dir, use_cache=False)
+            run = viewer.runs[0]
+            self.assertEqual(len(run.step_logs), 10)
+            self.assertIn('sensor_calibration', run.step_logs)
+            self.assertEqual(len(run.components), 6)
+            for step in run.step_logs:
+                analysis = run.step_analysis(step)
+                self.assertIsNotNone(analysis.duration_seconds)
+                self.assertIsNotNone(analysis.test_result)
+
+
+class TimingsTest(unittest.TestCase):
+    def test_counts_work_per_file_and_phase(self) -> None:
+        module = load_viewer()
+        Timings = module['Timings']
+        with tempfile.TemporaryDirectory() as temporary:
+            run_dir = create_run(Path(temporary))
+            Timings.active = timings = Timings()
+            try:
+                viewer = module['SanityLogViewer'](run_dir.parent, use_cache=False)
+                capture(viewer.show_step_summary, run_dir.name)
+                capture(viewer.filter_by_log_level, run_dir.name, 'ERROR', 'build')
+            finally:
+                Timings.active = None
+
+            self.assertIn('discover runs', timings.phases)
+            self.assertEqual([entry[0] for entry in timings.files], ['step analysis', 'filter'])
+            _, log_file, _, counters = timings.files[1]
+            self.assertEqual(log_file, run_dir / 'build_log.txt')
+            self.assertEqual(counters.bytes_read, log_file.stat().st_size)
+            self.assertEqual((counters.lines, counters.regex), (2, 2))
+            output = io.StringIO()
+            timings.report(output)
+            self.assertIn('build_log.txt', output.getvalue())
+
+
+class BisectComponentsTest(unittest.TestCase):
+    def test_finds_first_failing_run_and_component_changes(self) -> None:
+        module = load_viewer()
+        with tempfile.TemporaryDirectory() as temporary:
+            base = Path(temporary)
+            layout = [
+                ('20250901_000000', 'rev1', '1.0', 0),
+                ('20250902_000000', 'rev1', '1.0', 0),
+                ('20250903_000000', 'rev2', '1.1', None),
+                ('20250904_000000', 'rev2', '1.1', 2),
+                ('20250905_000000', 'rev2', '1.0', 1),
+            ]
+            for name, fw, lib, failures in layout:
+                run_dir = create_run(base, name)
+                (run_dir / 'components.txt').write_text(f'fw={fw}\nlib={lib}\n')
+                if failures is not None:
+                    write_step_log(run_dir, 'flash', 10.0, failures)
+
+            viewer = module['SanityLogViewer'](base / 'sanity', output_format='ndjson')
+            viewer.records.stream = io.StringIO()
+            viewer.bisect_components('flash')
+            records = [json.loads(line) for line in viewer.records.stream.getvalue().splitlines()]
+            viewer.close()
+
+            self.assertEqual(records[0]['last_good'], '20250902_000000')
+            self.assertEqual(records[0]['first_bad'], '20250904_000000')
+            self.assertEqual(records[0]['untested_between'], 1)
+            self.assertEqual(records[0]['failing_runs'], 2)
+            self.assertEqual(
+                [(r['component'], r['good'], r['bad'], r['kept_in']) for r in records[1:]],
+                [('fw', 'rev1', 'rev2', 2), ('lib', '1.0', '1.1', 1)],
+            )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,407 @@
+#!/usr/bin/env python3
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import gzip
+import http.client
+import importlib.util
+import json
+import http.server
+import os
+import runpy
+import shutil
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest import mock
+
+SERVER = Path(__file__).resolve().parents[1] / 'serve_files.py'
+
+
+def load_server() -> dict:
+    return runpy.run_path(str(SERVER), run_name='serve_files_test')
+
+
+class ServerTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.module = load_server()
+        self.module['RangeRequestHandler'].log_message = lambda *args: None
+        temporary = tempfile.TemporaryDirectory()
+        self.addCleanup(temporary.cleanup)
+        self.root = Path(temporary.name)
+        self.data = bytes(range(256)) * 4096
+        (self.root / 'image.bin').write_bytes(self.data)
+
+    def start(self, handler) -> None:
+        server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.port = server.server_address[1]
+
+    def get(self, path: str, method: str = 'GET', **headers: str) -> tuple[http.client.HTTPResponse, bytes]:
+        connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=5)
+        self.addCleanup(connection.close)
+        connection.request(method, path, headers={key.replace('_', '-'): value for key, value in headers.items()})
+        response = connection.getresponse()
+        return response, response.read()
+
+
+class RangeRequestTest(ServerTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.start(functools.partial(self.module['RangeRequestHandler'], directory=str(self.root)))
+
+    def test_full_and_partial_transfers(self) -> None:
+        response, body = self.get('/image.bin')
+        self.assertEqual(response.status, 200)
+        self.assertEqual(body, self.data)
+        self.assertEqual(response.getheader('Accept-Ranges'), 'bytes')
+        etag = response.getheader('ETag')
+
+        cases = {
+            'bytes=100-199': (100, 199),
+            'bytes=1000000-': (1000000, len(self.data) - 1),
+            'bytes=-10': (len(self.data) - 10, len(self.data) - 1),
+            'bytes=5-99999999': (5, len(self.data) - 1),
+        }
+        for header, (start, end) in cases.items():
+            with self.subTest(header=header):
+                response, body = self.get('/image.bin', Range=header)
+                self.assertEqual(response.status, 206)
+                self.assertEqual(response.getheader('Content-Range'), f'bytes {start}-{end}/{len(self.data)}')
+                self.assertEqual(body, self.data[start : end + 1])
+
+        response, body = self.get('/image.bin', Range='bytes=10-19', If_Range=etag)
+        self.assertEqual((response.status, body), (206, self.data[10:20]))
+        response, body = self.get('/image.bin', Range='bytes=10-19', If_Range='"stale"')
+        self.assertEqual((response.status, len(body)), (200, len(self.data)))
+        response, body = self.get('/image.bin', Range='bytes=0-1,5-6')
+        self.assertEqual(response.status, 200)
+        response, body = self.get('/image.bin', Range='bytes=500-100')
+        self.assertEqual((response.status, len(body)), (200, len(self.data)))
+
+    def test_unsatisfiable_range_and_validators(self) -> None:
+        response, _ = self.get('/image.bin', Range=f'bytes={len(self.data)}-')
+        self.assertEqual(response.status, 416)
+        self.assertEqual(response.getheader('Content-Range'), f'bytes */{len(self.data)}')
+
+        etag = self.get('/image.bin', 'HEAD')[0].getheader('ETag')
+        self.assertEqual(self.get('/image.bin', If_None_Match=etag)[0].status, 304)
+        os.utime(self.root / 'image.bin', ns=(1, 1))
+        response, _ = self.get('/image.bin', If_None_Match=etag)
+        self.assertEqual(response.status, 200)
+        self.assertNotEqual(response.getheader('ETag'), etag)
+
+    def test_file_bodies_use_sendfile(self) -> None:
+        if not hasattr(os, 'sendfile'):
+            self.skipTest('os.sendfile is not available')
+        with mock.patch.object(os, 'sendfile', wraps=os.sendfile) as sendfile:
+            response, body = self.get('/image.bin', Range='bytes=4096-')
+        self.assertEqual(body, self.data[4096:])
+        self.assertTrue(sendfile.called)
+
+        response, body = self.get('/')
+        self.assertEqual(response.status, 200)
+        self.assertIn(b'image.bin', body)
+
+
+class SingleFileTest(ServerTestCase):
+    def test_only_the_target_is_served_with_ranges(self) -> None:
+        (self.root / 'secret.txt').write_text('hidden')
+        handler = self.module['single_file_handler'](self.root / 'image.bin')
+        self.start(functools.partial(handler, directory=str(self.root)))
+
+        response, body = self.get('/', Range='bytes=0-3')
+        self.assertEqual((response.status, body), (206, self.data[:4]))
+        self.assertEqual(self.get('/image.bin')[1], self.data)
+        self.assertEqual(self.get('/secret.txt')[0].status, 404)
+
+
+class ListingTest(ServerTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.listing = self.root / 'artifacts'
+        self.listing.mkdir()
+        for index in range(25):
+            (self.listing / f'Build_{index:02d}.o').write_bytes(b'x' * index)
+        (self.listing / 'objects').mkdir()
+        self.listings = self.module['ListingCache']()
+
+    def test_scans_are_reused_until_the_directory_changes(self) -> None:
+        with mock.patch.object(self.listings, 'scan', wraps=self.listings.scan) as scan:
+            entries = self.listings.entries(self.listing)
+            self.assertIs(self.listings.entries(self.listing), entries)
+            self.assertEqual(scan.call_count, 1)
+            (self.listing / 'late.o').touch()
+            os.utime(self.listing, ns=(1, 1))
+            self.assertEqual(len(self.listings.entries(self.listing)), 27)
+            self.assertEqual(scan.call_count, 2)
+        self.assertEqual(entries[0].name, 'Build_00.o')
+        self.assertEqual(entries[-1][:3], ('objects', True, False))
+
+        small = self.module['ListingCache'](capacity=1)
+        small.entries(self.listing)
+        small.entries(self.root)
+        self.assertEqual(list(small.scans), [self.root])
+
+    def test_pages_in_html_and_json(self) -> None:
+        handler = self.module['RangeRequestHandler']
+        self.start(functools.partial(handler, directory=str(self.root), listings=self.listings))
+        response, body = self.get('/artifacts/?per_page=10&page=2')
+        self.assertEqual(response.status, 200)
+        self.assertEqual(body.count(b'<li>'), 10)
+        self.assertIn(b'<a href="Build_10.o">Build_10.o</a>', body)
+        self.assertIn(b'Entries 11-20 of 26', body)
+        self.assertIn(b'<a href="?page=1&amp;per_page=10">previous</a>', body)
+        self.assertIn(b'<a href="?page=3&amp;per_page=10">next</a>', body)
+
+        response, body = self.get('/artifacts/?page=3&per_page=10&format=json')
+        self.assertEqual(response.getheader('Content-type'), 'application/json')
+        listing = json.loads(body)
+        self.assertEqual(
+            {key: listing[key] for key in ('path', 'total', 'page', 'per_page', 'pages')},
+            {'path': '/artifacts/', 'total': 26, 'page': 3, 'per_page': 10, 'pages': 3},
+        )
+        self.assertEqual([entry['name'] for entry in listing['entries']][-2:], ['Build_24.o', 'objects'])
+        self.assertEqual(listing['entries'][0]['size'], 20)
+        self.assertEqual(listing['entries'][-1]['type'], 'directory')
+
+        response, body = self.get('/artifacts/', Accept='application/json')
+        self.assertEqual(len(json.loads(body)['entries']), 26)
+
+        (self.listing / os.fsdecode(b'trace_\xff.log')).touch()
+        response, body = self.get('/artifacts/?per_page=50')
+        self.assertEqual(response.status, 200)
+        self.assertIn(b'<a href="trace_%ED%B3%BF.log">trace_\xff.log</a>', body)
+        self.assertTrue(body.endswith(b'</html>\n'))
+        response, body = self.get('/artifacts/?format=json')
+        self.assertIn(os.fsdecode(b'trace_\xff.log'), [entry['name'] for entry in json.loads(body)['entries']])
+        for query in ('page=0', 'per_page=100000', 'page=x', 'format=xml'):
+            with self.subTest(query=query):
+                self.assertEqual(self.get(f'/artifacts/?{query}')[0].status, 400)
+
+
+class CompressionTest(ServerTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.cache_dir = self.root / 'cache'
+        self.compression = self.module['CompressionCache'](self.cache_dir)
+        self.handler = functools.partial(
+            self.module['RangeRequestHandler'], directory=str(self.root), compression=self.compression
+        )
+        self.text = b''.join(b'%d INFO step finished\n' % line for line in range(20000))
+        (self.root / 'build.log').write_bytes(self.text)
+
+    def test_negotiation(self) -> None:
+        accepted = self.compression.accepted
+        self.compression.encodings = ['zstd', 'gzip']
+        self.assertEqual(accepted('gzip, deflate, br, zstd'), 'zstd')
+        self.assertEqual(accepted('gzip;q=1.0, zstd;q=0.5'), 'gzip')
+        self.assertEqual(accepted('x-gzip'), 'gzip')
+        self.assertEqual(accepted('*'), 'zstd')
+        self.assertEqual(accepted('*, zstd;q=0'), 'gzip')
+        self.assertIsNone(accepted(''))
+        self.assertIsNone(accepted('br, identity'))
+
+        compressible = self.compression.compressible
+        self.assertTrue(compressible(Path('build.log'), 'text/plain', 4096))
+        self.assertTrue(compressible(Path('logo.svg'), 'image/svg+xml', 4096))
+        self.assertFalse(compressible(Path('build.log'), 'text/plain', 100))
+        self.assertFalse(compressible(Path('build.log'), 'text/plain', self.compression.MAX_SIZE + 1))
+        self.assertFalse(compressible(Path('firmware.bin'), 'application/octet-stream', 4096))
+        self.assertFalse(compressible(Path('photo.png'), 'image/png', 4096))
+        self.assertFalse(compressible(Path('logs.zip'), 'application/zip', 4096))
+        self.assertFalse(compressible(Path('build.log.gz'), 'text/plain', 4096))
+
+    def test_compressed_copies_are_cached_per_version(self) -> None:
+        self.start(self.handler)
+        response, body = self.get('/build.log', Accept_Encoding='gzip')
+        self.assertEqual(response.getheader('Content-Encoding'), 'gzip')
+        self.assertEqual(response.getheader('Vary'), 'Accept-Encoding')
+        self.assertEqual(response.getheader('Content-type'), 'text/plain')
+        self.assertEqual(gzip.decompress(body), self.text)
+        etag = response.getheader('ETag')
+        self.assertEqual(len(list(self.cache_dir.iterdir())), 1)
+
+        with mock.patch.object(self.compression, 'compress') as compress:
+            response, partial = self.get('/build.log', Accept_Encoding='gzip', Range='bytes=0-99')
+            self.assertEqual(self.get('/build.log', Accept_Encoding='gzip', If_None_Match=etag)[0].status, 304)
+        compress.assert_not_called()
+        self.assertEqual((response.status, partial), (206, body[:100]))
+
+        response, body = self.get('/build.log')
+        self.assertIsNone(response.getheader('Content-Encoding'))
+        self.assertEqual(response.getheader('Vary'), 'Accept-Encoding')
+        self.assertEqual(body, self.text)
+        self.assertNotEqual(response.getheader('ETag'), etag)
+
+        (self.root / 'build.log').write_bytes(self.text * 2)
+        response, body = self.get('/build.log', Accept_Encoding='gzip')
+        self.assertEqual(gzip.decompress(body), self.text * 2)
+        self.assertEqual(len(list(self.cache_dir.iterdir())), 1)
+        self.assertEqual(self.compression.locks, {})
+
+        (self.root / 'photo.jpg').write_bytes(self.data)
+        response, body = self.get('/photo.jpg', Accept_Encoding='gzip')
+        self.assertIsNone(response.getheader('Content-Encoding'))
+        self.assertIsNone(response.getheader('Vary'))
+        self.assertEqual(body, self.data)
+        response, body = self.get('/image.bin', Accept_Encoding='gzip')
+        self.assertIsNone(response.getheader('Content-Encoding'))
+        self.assertEqual(body, self.data)
+
+    def test_large_files_are_compressed_in_the_background(self) -> None:
+        self.compression.SYNC_SIZE = 4096
+        self.start(self.handler)
+        response, body = self.get('/build.log', Accept_Encoding='gzip')
+        self.assertIsNone(response.getheader('Content-Encoding'))
+        self.assertEqual(response.getheader('Vary'), 'Accept-Encoding')
+        self.assertEqual(body, self.text)
+
+        self.compression.background.join()
+        self.assertEqual(self.compression.locks, {})
+        response, body = self.get('/build.log', Accept_Encoding='gzip')
+        self.assertEqual(response.getheader('Content-Encoding'), 'gzip')
+        self.assertEqual(gzip.decompress(body), self.text)
+
+    def test_least_recently_used_copies_are_evicted(self) -> None:
+        self.start(self.handler)
+        for name in ('a.log', 'b.log', 'c.log'):
+            (self.root / name).write_bytes(self.text.replace(b'INFO', name.encode()))
+        self.get('/a.log', Accept_Encoding='gzip')
+        [a_copy] = self.cache_dir.iterdir()
+        self.get('/b.log', Accept_Encoding='gzip')
+        [b_copy] = set(self.cache_dir.iterdir()) - {a_copy}
+        os.utime(a_copy, ns=(10**9, 10**9))
+        os.utime(b_copy, ns=(2 * 10**9, 2 * 10**9))
+        self.compression.max_size = a_copy.stat().st_size + b_copy.stat().st_size + 1024
+
+        # Using a.log makes b.log the least recently used copy
+        self.get('/a.log', Accept_Encoding='gzip')
+        self.get('/c.log', Accept_Encoding='gzip')
+        self.assertTrue(a_copy.exists())
+        self.assertFalse(b_copy.exists())
+        self.assertEqual(len(list(self.cache_dir.iterdir())), 2)
+        response, body = self.get('/b.log', Accept_Encoding='gzip')
+        self.assertEqual(gzip.decompress(body), self.text.replace(b'INFO', b'b.log'))
+
+    @unittest.skipIf(importlib.util.find_spec('zstandard') is None, 'zstandard is not installed')
+    def test_zstd_is_preferred(self) -> None:
+        import zstandard
+
+        self.start(self.handler)
+        response, body = self.get('/build.log', Accept_Encoding='gzip, zstd')
+        self.assertEqual(response.getheader('Content-Encoding'), 'zstd')
+        self.assertEqual(zstandard.ZstdDecompressor().decompressobj().decompress(body), self.text)
+
+
+class AsyncServerTest(ServerTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.module['AsyncFileServer'].log_request = staticmethod(lambda *args: None)
+        self.loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        thread.start()
+        self.addCleanup(self.loop.close)
+        self.addCleanup(thread.join)
+        self.addCleanup(self.loop.call_soon_threadsafe, self.loop.stop)
+        self.addCleanup(self.run_on_loop, self.cancel_connections())
+
+    @staticmethod
+    async def cancel_connections() -> None:
+        tasks = asyncio.all_tasks() - {asyncio.current_task()}
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def run_on_loop(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result(5)
+
+    def start_async(self, **kwargs) -> None:
+        self.file_server = self.module['AsyncFileServer'](self.root, **kwargs)
+        server = self.run_on_loop(self.file_server.start('127.0.0.1', 0))
+        self.addCleanup(self.run_on_loop, server.wait_closed())
+        self.addCleanup(self.loop.call_soon_threadsafe, server.close)
+        self.port = server.sockets[0].getsockname()[1]
+
+    def test_requests_share_a_kept_alive_connection(self) -> None:
+        self.start_async()
+        connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=5)
+        self.addCleanup(connection.close)
+        responses = []
+        for headers in ({}, {'Range': 'bytes=100-199'}, {}):
+            connection.request('GET', '/image.bin', headers=headers)
+            if responses:
+                self.assertIs(connection.sock, sock)
+            sock = connection.sock
+            response = connection.getresponse()
+            responses.append((response.status, response.read()))
+        self.assertEqual([status for status, _ in responses], [200, 206, 200])
+        self.assertEqual(responses[0][1], self.data)
+        self.assertEqual(responses[1][1], self.data[100:200])
+
+        connection.request('GET', '/missing')
+        self.assertEqual(connection.getresponse().status, 404)
+
+    def test_directories_and_unsupported_methods(self) -> None:
+        (self.root / 'sub').mkdir()
+        self.start_async()
+        response, _ = self.get('/sub')
+        self.assertEqual((response.status, response.getheader('Location')), (301, '/sub/'))
+        response, body = self.get('/')
+        self.assertEqual(response.status, 200)
+        self.assertIn(b'image.bin', body)
+        self.assertEqual(self.get('/', 'POST')[0].status, 501)
+        self.assertEqual(self.get('/../image.bin')[0].status, 200)
+        etag = self.get('/image.bin', 'HEAD')[0].getheader('ETag')
+        self.assertEqual(self.get('/image.bin', If_None_Match=etag)[0].status, 304)
+
+    def test_compressed_responses(self) -> None:
+        (self.root / 'build.log').write_bytes(b'step finished\n' * 10000)
+        self.start_async(compression=self.module['CompressionCache'](self.root.parent / f'{self.root.name}-cache'))
+        self.addCleanup(shutil.rmtree, self.root.parent / f'{self.root.name}-cache', True)
+        response, body = self.get('/build.log', Accept_Encoding='gzip')
+        self.assertEqual(response.getheader('Content-Encoding'), 'gzip')
+        self.assertEqual(gzip.decompress(body), b'step finished\n' * 10000)
+        (self.root / 'photo.jpg').write_bytes(self.data)
+        response, body = self.get('/photo.jpg', Accept_Encoding='gzip')
+        self.assertIsNone(response.getheader('Content-Encoding'))
+        self.assertEqual(body, self.data)
+
+    def test_listings_are_chunked_on_kept_alive_connections(self) -> None:
+        for index in range(600):
+            (self.root / f'artifact_{index:03d}.o').touch()
+        self.start_async()
+        connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=5)
+        self.addCleanup(connection.close)
+        connection.request('GET', '/?format=json&per_page=1000')
+        response = connection.getresponse()
+        self.assertEqual(response.getheader('Transfer-Encoding'), 'chunked')
+        listing = json.loads(response.read())
+        self.assertEqual((listing['total'], len(listing['entries'])), (601, 601))
+        sock = connection.sock
+        connection.request('GET', '/?page=2&per_page=500')
+        response = connection.getresponse()
+        self.assertEqual(response.read().count(b'<li>'), 101)
+        self.assertIs(connection.sock, sock)
+
+    def test_transfers_wait_for_a_free_slot(self) -> None:
+        self.start_async(max_transfers=1)
+        self.run_on_loop(self.file_server.transfers.acquire())
+        bodies = []
+        thread = threading.Thread(target=lambda: bodies.append(self.get('/image.bin')[1]))
+        thread.start()
+        thread.join(0.3)
+        self.assertTrue(thread.is_alive())
+        self.loop.call_soon_threadsafe(self.file_server.transfers.release)
+        thread.join(5)
+        self.assertEqual(bodies, [self.data])
+
+
+if __name__ == '__main__':
+    unittest.main()